@@ -0,0 +1,48 @@
+"""
+Compare two benchmark reports written by :mod:`benchmarks.run` or :mod:`benchmarks.loadtest`.
+
+Usage::
+
+    python -m benchmarks.compare before.json after.json
+    python -m benchmarks.compare before.json after.json --metric p95_ms --fail-above 1.10
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def load(path: Path) -> dict:
+    report = json.loads(path.read_text())
+    if isinstance(report, list):
+        return {f"{r['backend']}:{name}": stats for r in report for name, stats in r["results"].items()}
+    return report["results"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before", type=Path)
+    parser.add_argument("after", type=Path)
+    parser.add_argument("--metric", default="median_ms")
+    parser.add_argument("--fail-above", type=float, help="exit with status 1 if any ratio after/before exceeds this")
+    args = parser.parse_args(argv)
+
+    before, after = load(args.before), load(args.after)
+    worst = 0.0
+    print(f"{'scenario':45} {'before':>12} {'after':>12} {'ratio':>8}")
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name].get(args.metric), after[name].get(args.metric)
+        if not old or new is None:
+            continue
+        ratio = new / old
+        worst = max(worst, ratio)
+        print(f"{name:45} {old:12.3f} {new:12.3f} {ratio:8.2f}")
+    for name in sorted(before.keys() ^ after.keys()):
+        print(f"{name:45} only in {'before' if name in before else 'after'}")
+    if args.fail_above is not None and worst > args.fail_above:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+CPU cost against bytes saved for the response encodings of the compression middleware.
+
+Serialises pages of synthetic contacts the way the contacts endpoints do, compresses
+them with every available encoding at a few levels through
+:class:`src.middleware.compression.Encoder`, and reports the compressed size, the ratio
+and the time per body. The report can be compared across commits with
+:mod:`benchmarks.compare`.
+
+Usage::
+
+    python -m benchmarks.compression
+    python -m benchmarks.compression --pages 100,1000 --repeat 50 --output benchmarks/results/compression.json
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks import datagen
+from benchmarks.run import git_revision, summarize
+from src.middleware.compression import LEVELS, Encoder, available_encodings
+
+EXTRA_LEVELS = {"gzip": (1, 9), "br": (1, 6), "zstd": (1, 9)}
+
+
+def page(size: int, seed_value: int) -> bytes:
+    contacts = datagen.generate_contacts(1, size, random.Random(seed_value))
+    return json.dumps([{**contact, "id": i, "date_of_birth": contact["date_of_birth"].isoformat()}
+                       for i, contact in enumerate(contacts, 1)]).encode()
+
+
+def measure(body: bytes, encoding: str, level: int, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        compressed = Encoder(encoding, level).compress_all(body)
+        samples.append(time.perf_counter() - started)
+    stats = summarize(samples)
+    stats.update({
+        "bytes": len(body),
+        "compressed_bytes": len(compressed),
+        "ratio": round(len(body) / len(compressed), 2),
+        "mb_per_s": round(len(body) / 1e6 / (stats["median_ms"] / 1000), 1),
+    })
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default="100,1000,10000", help="contacts per body, comma separated")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for size in map(int, args.pages.split(",")):
+        body = page(size, args.seed)
+        for encoding in available_encodings():
+            for level in sorted({LEVELS[encoding], *EXTRA_LEVELS[encoding]}):
+                name = f"{size}:{encoding}-{level}{'*' if level == LEVELS[encoding] else ''}"
+                stats = results[name] = measure(body, encoding, level, args.repeat)
+                print(f"{name:20} {stats['bytes']:9} -> {stats['compressed_bytes']:8} bytes  "
+                      f"x{stats['ratio']:6.2f}  {stats['median_ms']:9.3f} ms  {stats['mb_per_s']:7.1f} MB/s",
+                      file=sys.stderr)
+    report = {
+        "commit": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "encodings": list(available_encodings()),
+        "default_levels": LEVELS,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
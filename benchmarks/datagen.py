@@ -0,0 +1,93 @@
+"""
+Deterministic synthetic data for the benchmarks.
+
+Seeds ``users`` users with ``contacts_per_user`` contacts each, using bulk
+``INSERT`` statements in batches so that a million rows load in seconds rather than
+through the ORM unit of work.
+"""
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from src.database.models import Base, Contact, User
+
+FIRST_NAMES = ["Anna", "Piotr", "Maria", "Jan", "Katarzyna", "Tomasz", "Agnieszka", "Pawel", "Ewa", "Michal",
+               "Olivia", "Noah", "Emma", "Liam", "Sophia", "Mason", "Isabella", "Lucas", "Mia", "Ethan"]
+LAST_NAMES = ["Nowak", "Kowalski", "Wisniewski", "Wojcik", "Kowalczyk", "Kaminski", "Lewandowski", "Zielinski",
+              "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Martinez", "Lopez"]
+PASSWORD_HASH = "$2b$12$KIXQJf1Q0Z3cKk6b6kXo2eQ0yq3b1S0m4x7Vx8QO3mQJXv3q8b5yK"
+BATCH_SIZE = 10_000
+
+SCALES = {
+    "10k": (100, 100),
+    "100k": (1_000, 100),
+    "1m": (1_000, 1_000),
+}
+
+
+def user_email(user_id: int) -> str:
+    return f"bench{user_id}@example.com"
+
+
+def generate_contacts(user_id: int, count: int, rng: random.Random):
+    """
+    Yield contact rows for one user.
+
+    :param user_id: The owner of the contacts.
+    :type user_id: int
+    :param count: Number of contacts to generate.
+    :type count: int
+    :param rng: Random generator, seeded by the caller for reproducible data.
+    :type rng: random.Random
+    """
+    start = date(1950, 1, 1)
+    for i in range(count):
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        yield {
+            "first_name": first_name,
+            "last_name": last_name,
+            "email": f"{first_name.lower()}.{last_name.lower()}.{user_id}.{i}@example.com",
+            "phone_number": f"+48{rng.randrange(500_000_000, 900_000_000)}",
+            "date_of_birth": start + timedelta(days=rng.randrange(0, 365 * 60)),
+            "user_id": user_id,
+        }
+
+
+def seed(engine: Engine, users: int, contacts_per_user: int, seed_value: int = 42,
+         password_hash: str = PASSWORD_HASH) -> None:
+    """
+    Recreate the schema and fill it with synthetic users and contacts.
+
+    :param engine: The engine of a scratch database; existing tables are dropped.
+    :type engine: Engine
+    :param users: Number of users to create.
+    :type users: int
+    :param contacts_per_user: Number of contacts per user.
+    :type contacts_per_user: int
+    :param seed_value: Seed of the random generator.
+    :type seed_value: int
+    :param password_hash: Password hash stored for every user.
+    :type password_hash: str
+    """
+    rng = random.Random(seed_value)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    now = datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"id": user_id, "username": f"bench{user_id}", "email": user_email(user_id), "confirmed": True,
+             "password": password_hash, "created_at": now, "avatar": "https://example.com/avatar.png"}
+            for user_id in range(1, users + 1)
+        ])
+        batch = []
+        for user_id in range(1, users + 1):
+            for row in generate_contacts(user_id, contacts_per_user, rng):
+                batch.append(row)
+                if len(batch) >= BATCH_SIZE:
+                    connection.execute(insert(Contact), batch)
+                    batch = []
+        if batch:
+            connection.execute(insert(Contact), batch)
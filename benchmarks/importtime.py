@@ -0,0 +1,111 @@
+"""
+Import-time benchmark for the application module.
+
+Runs ``python -X importtime -c "import src.main"`` in fresh interpreters and reports
+the cumulative import time of ``src.main`` together with the slowest packages.
+
+Usage::
+
+    python -m benchmarks.importtime --runs 5 --json benchmarks/results/importtime.json
+    python -m benchmarks.importtime --max-ms 900   # exit with status 1 above the budget
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MODULE = "src.main"
+HEAVY_MODULES = ("cloudinary", "fastapi_mail", "passlib", "bcrypt", "psycopg2", "aiosmtplib")
+
+
+def run_once(module: str = MODULE) -> tuple[dict[str, int], dict[str, int], list[str]]:
+    """
+    Import ``module`` in a fresh interpreter with ``-X importtime``.
+
+    :param module: The module to import.
+    :type module: str
+    :return: Cumulative and self times in microseconds keyed by module, and the heavy modules that got imported.
+    :rtype: tuple[dict[str, int], dict[str, int], list[str]]
+    """
+    probe = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=ROOT, capture_output=True, text=True, env=os.environ.copy(),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr)
+    cumulative, self_time = {}, {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, total, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        self_time[name] = int(own)
+        cumulative[name] = int(total)
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return cumulative, self_time, loaded
+
+
+def measure(runs: int, top: int) -> dict:
+    """
+    Repeat :func:`run_once` and aggregate the results.
+
+    :param runs: Number of fresh interpreters to start.
+    :type runs: int
+    :param top: Number of top-level packages to report.
+    :type top: int
+    :return: A JSON-serialisable report.
+    :rtype: dict
+    """
+    totals = []
+    packages = defaultdict(list)
+    loaded = set()
+    for _ in range(runs):
+        cumulative, self_time, heavy = run_once()
+        totals.append(cumulative[MODULE] / 1000)
+        loaded.update(heavy)
+        per_package = defaultdict(int)
+        for name, us in self_time.items():
+            per_package[name.split(".")[0]] += us
+        for name, us in per_package.items():
+            packages[name].append(us / 1000)
+    ranked = sorted(((statistics.median(v), k) for k, v in packages.items()), reverse=True)[:top]
+    return {
+        "module": MODULE,
+        "runs": runs,
+        "python": sys.version.split()[0],
+        "median_ms": round(statistics.median(totals), 2),
+        "min_ms": round(min(totals), 2),
+        "max_ms": round(max(totals), 2),
+        "heavy_modules_loaded": sorted(loaded),
+        "top_packages_ms": {name: round(ms, 2) for ms, name in ranked},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", type=Path, help="write the report to this file")
+    parser.add_argument("--max-ms", type=float, help="fail when the median import time exceeds this budget")
+    args = parser.parse_args(argv)
+
+    report = measure(args.runs, args.top)
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(output + "\n")
+    if args.max_ms is not None and report["median_ms"] > args.max_ms:
+        print(f"import of {MODULE} took {report['median_ms']} ms, budget is {args.max_ms} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
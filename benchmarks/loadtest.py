@@ -0,0 +1,317 @@
+"""
+HTTP load test for the full ASGI application with local stand-ins.
+
+Redis, SMTP and Cloudinary are replaced by fakeredis, an aiosmtpd sink and a fake
+upload server (see :mod:`benchmarks.standins`), so the whole request path, including
+authentication, rate limiting, the user cache and background emails, runs locally.
+
+The application runs either in-process through ``httpx.ASGITransport``, or in a child
+process under a bare ``uvicorn`` or under the production launcher :mod:`src.serve`.
+Virtual users log in once, then issue a weighted mix of requests for a fixed duration.
+The report contains throughput and latency percentiles per endpoint.
+
+Requires ``pip install -r benchmarks/requirements.txt``.
+
+Usage::
+
+    python -m benchmarks.loadtest --duration 30 --concurrency 50
+    python -m benchmarks.loadtest --server uvicorn --workers 4 --concurrency 200
+    python -m benchmarks.loadtest --mix list=50,search=30,birthdays=20 --output benchmarks/results/load.json
+
+Throughput of the production launcher against the default ``uvicorn`` setup::
+
+    python -m benchmarks.loadtest --server uvicorn --workers 1 --output default.json
+    python -m benchmarks.loadtest --server serve --workers 4 --output serve.json
+    python -m benchmarks.compare default.json serve.json --metric rps
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks import datagen, standins
+from benchmarks.run import git_revision
+
+ROOT = Path(__file__).resolve().parent.parent
+PASSWORD = "benchmark"
+SEARCH_TERMS = ["nowak", "anna", "smith", "example", "zzz-no-match"]
+
+DEFAULT_MIX = {
+    "list": 30,
+    "search": 20,
+    "get": 15,
+    "birthdays": 10,
+    "me": 10,
+    "create": 5,
+    "update": 5,
+    "login": 3,
+    "signup": 1,
+    "avatar": 1,
+}
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r}, choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+class VirtualUser:
+    """
+    One simulated client with its own credentials and the contacts it created.
+    """
+    def __init__(self, client: httpx.AsyncClient, user_id: int, contacts_per_user: int, rng: random.Random):
+        self.client = client
+        self.user_id = user_id
+        self.contacts_per_user = contacts_per_user
+        self.rng = rng
+        self.token = None
+        self.created = []
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def contact_body(self) -> dict:
+        n = uuid.uuid4().int % 10 ** 12
+        return {"first_name": "Load", "last_name": f"Test{n}", "email": f"load.{n}@example.com",
+                "phone_number": f"+48{n % 10 ** 9:09d}", "date_of_birth": "1990-05-17"}
+
+    async def login(self) -> httpx.Response:
+        response = await self.client.post("/api/auth/login", data={"username": datagen.user_email(self.user_id),
+                                                                   "password": PASSWORD})
+        if response.status_code == 200:
+            self.token = response.json()["access_token"]
+        return response
+
+    async def list(self):
+        return await self.client.get("/api/contacts/", params={"skip": 0, "limit": 100}, headers=self.headers)
+
+    async def search(self):
+        return await self.client.get("/api/contacts/search/", params={"query": self.rng.choice(SEARCH_TERMS)},
+                                     headers=self.headers)
+
+    async def get(self):
+        contact_id = (self.user_id - 1) * self.contacts_per_user + self.rng.randint(1, self.contacts_per_user)
+        return await self.client.get(f"/api/contacts/{contact_id}", headers=self.headers)
+
+    async def birthdays(self):
+        return await self.client.get("/api/contacts/upcoming-birthdays/", headers=self.headers)
+
+    async def me(self):
+        return await self.client.get("/api/users/me", headers=self.headers)
+
+    async def create(self):
+        response = await self.client.post("/api/contacts/", json=self.contact_body(), headers=self.headers)
+        if response.status_code == 200:
+            self.created.append(response.json()["id"])
+        return response
+
+    async def update(self):
+        if not self.created:
+            return await self.create()
+        return await self.client.put(f"/api/contacts/{self.rng.choice(self.created)}", json=self.contact_body(),
+                                     headers=self.headers)
+
+    async def signup(self):
+        n = uuid.uuid4().hex[:10]
+        return await self.client.post("/api/auth/signup", json={"username": f"user{n}",
+                                                                "email": f"signup.{n}@example.com",
+                                                                "password": PASSWORD[:10]})
+
+    async def avatar(self):
+        files = {"file": ("avatar.png", b"\x89PNG\r\n\x1a\n" + os.urandom(2048), "image/png")}
+        return await self.client.patch("/api/users/avatar", files=files, headers=self.headers)
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def summarize(latencies: list[float], statuses: dict[int, int], elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if status >= 400)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "rps": round(len(ordered) / elapsed, 2),
+        "median_ms": round(percentile(ordered, 0.5) * 1000, 3),
+        "p90_ms": round(percentile(ordered, 0.9) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+async def drive(client: httpx.AsyncClient, users: int, contacts_per_user: int, concurrency: int,
+                duration: float, mix: dict[str, int], seed_value: int) -> tuple[dict, float]:
+    rng = random.Random(seed_value)
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+
+    virtual_users = [VirtualUser(client, i % users + 1, contacts_per_user, random.Random(rng.random()))
+                     for i in range(concurrency)]
+    tokens = {}
+    for vu in virtual_users:
+        if vu.user_id not in tokens:
+            response = await vu.login()
+            if response.status_code != 200:
+                raise RuntimeError(f"login failed: {response.status_code} {response.text}")
+            tokens[vu.user_id] = vu.token
+        vu.token = tokens[vu.user_id]
+
+    deadline = time.perf_counter() + duration
+
+    async def worker(vu: VirtualUser):
+        while time.perf_counter() < deadline:
+            name = vu.rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await getattr(vu, name)()
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 599
+            latencies[name].append(time.perf_counter() - started)
+            statuses[name][status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(vu) for vu in virtual_users))
+    elapsed = time.perf_counter() - started
+
+    results = {name: summarize(latencies[name], statuses[name], elapsed) for name in names if latencies[name]}
+    everything = [latency for values in latencies.values() for latency in values]
+    merged = defaultdict(int)
+    for per_endpoint in statuses.values():
+        for status, count in per_endpoint.items():
+            merged[status] += count
+    results["total"] = summarize(everything, merged, elapsed)
+    return results, elapsed
+
+
+async def run_in_process(args, mix) -> dict:
+    from benchmarks.loadtest_app import app
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            results, _ = await drive(client, args.users, args.contacts_per_user, args.concurrency, args.duration,
+                                     mix, args.seed)
+    return results
+
+
+async def run_server(args, mix) -> dict:
+    port = standins.free_port()
+    if args.server == "serve":
+        command = [sys.executable, "-m", "src.serve", "--app", "benchmarks.loadtest_app:app", "--host", "127.0.0.1",
+                   "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "benchmarks.loadtest_app:app", "--host", "127.0.0.1",
+                   "--port", str(port), "--workers", str(args.workers), "--log-level", "warning",
+                   *args.uvicorn_arg]
+    server = subprocess.Popen(command, cwd=ROOT, env=os.environ.copy())
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60,
+                                     limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            for _ in range(600):
+                try:
+                    if (await client.get("/api/health/live")).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError(f"{args.server} did not start")
+            results, _ = await drive(client, args.users, args.contacts_per_user, args.concurrency, args.duration,
+                                     mix, args.seed)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=["in-process", "uvicorn", "serve"], default="in-process")
+    parser.add_argument("--workers", type=int, default=1, help="server workers")
+    parser.add_argument("--uvicorn-arg", action="append", default=[], help="extra argument passed to uvicorn")
+    parser.add_argument("--concurrency", type=int, default=20, help="number of virtual users")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load after login")
+    parser.add_argument("--users", type=int, default=20, help="seeded users")
+    parser.add_argument("--contacts-per-user", type=int, default=500)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="weights, e.g. list=50,search=30")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rate-limit", action="store_true", help="enforce the real rate limits")
+    parser.add_argument("--output", type=Path, help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    workdir = Path(tempfile.mkdtemp(prefix="loadtest-"))
+    database_url = f"sqlite:///{workdir / 'loadtest.sqlite'}"
+    smtp_port, cloudinary_port = standins.free_port(), standins.free_port()
+    standins.configure_environment(database_url, smtp_port, cloudinary_port)
+    if args.rate_limit:
+        os.environ["LOADTEST_RATE_LIMIT"] = "1"
+
+    from sqlalchemy import create_engine
+
+    from src.services.auth import auth_service
+
+    engine = create_engine(database_url)
+    datagen.seed(engine, args.users, args.contacts_per_user, args.seed, auth_service.get_password_hash(PASSWORD))
+    engine.dispose()
+
+    smtp = standins.start_smtp_sink(smtp_port)
+    standins.start_fake_cloudinary(cloudinary_port)
+    try:
+        runner = run_in_process if args.server == "in-process" else run_server
+        results = asyncio.run(runner(args, args.mix))
+    finally:
+        smtp.stop()
+
+    for name, stats in results.items():
+        print(f"{name:10} {stats['requests']:7} req {stats['rps']:9.1f} rps  p50 {stats['median_ms']:8.2f} ms  "
+              f"p99 {stats['p99_ms']:8.2f} ms  errors {stats['errors']}", file=sys.stderr)
+    report = {
+        "commit": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "server": args.server,
+        "workers": args.workers,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "users": args.users,
+        "contacts": args.users * args.contacts_per_user,
+        "mix": args.mix,
+        "emails_received": smtp.handler.messages,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
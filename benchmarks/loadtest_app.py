@@ -0,0 +1,58 @@
+"""
+The application wired to local stand-ins, for in-process runs and ``uvicorn``.
+
+Expects the environment prepared by :func:`benchmarks.standins.configure_environment`
+and the SMTP sink and fake Cloudinary server started by the driver in
+:mod:`benchmarks.loadtest`. Each worker gets its own fakeredis server, and with it its
+own job queue, so every worker also runs a job consumer in-process; otherwise the
+verification emails would stay queued and never reach the SMTP sink::
+
+    uvicorn benchmarks.loadtest_app:app --workers 4
+"""
+import asyncio
+import os
+import uuid
+from contextlib import asynccontextmanager
+
+from benchmarks import standins
+
+standins.install_fakeredis()
+standins.use_plain_smtp()
+standins.use_fake_cloudinary(int(os.environ["LOADTEST_CLOUDINARY_PORT"]))
+
+from fastapi_limiter import FastAPILimiter  # noqa: E402
+
+from src.main import app  # noqa: E402
+from src.services.jobs import Worker, job_queue  # noqa: E402
+import src.services.tasks  # noqa: E402,F401 - registers the jobs
+
+if os.environ.get("LOADTEST_RATE_LIMIT") != "1":
+    async def unique_identifier(request):
+        # Every request gets its own bucket: the limiter still runs, but never rejects.
+        return uuid.uuid4().hex
+
+    _init = FastAPILimiter.init
+
+    async def init(redis, **kwargs):
+        await _init(redis, **{**kwargs, "identifier": unique_identifier})
+
+    FastAPILimiter.init = init
+
+_lifespan = app.router.lifespan_context
+
+
+@asynccontextmanager
+async def lifespan_with_worker(app):
+    async with _lifespan(app) as state:
+        worker = Worker(job_queue, poll_timeout=0.2)
+        task = asyncio.create_task(worker.run())
+        try:
+            yield state
+        finally:
+            worker.stop()
+            await task
+
+
+app.router.lifespan_context = lifespan_with_worker
+
+__all__ = ["app"]
@@ -0,0 +1,202 @@
+"""
+Repository and authentication benchmark runner.
+
+Seeds a scratch database with synthetic users and contacts, times every scenario in
+:mod:`benchmarks.scenarios` and writes a JSON report that can be compared across
+commits with :mod:`benchmarks.compare`.
+
+SQLite databases are cached per scale and schema under ``benchmarks/.data``; a model
+change gives a new cache file instead of reusing one with missing columns. PostgreSQL is used
+when ``BENCH_POSTGRES_URL`` points to a reachable scratch database; its tables are
+dropped and recreated.
+
+Usage::
+
+    python -m benchmarks.run --scale 10k
+    python -m benchmarks.run --scale 100k --backend postgresql --output benchmarks/results/100k.json
+    python -m benchmarks.run --scale 1m --repeat 20 --only get_contacts
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import sqlalchemy
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from benchmarks import datagen
+from benchmarks.scenarios import AUTH_SCENARIOS, REPOSITORY_SCENARIOS, BenchContext
+from src.database.models import Base, Contact
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = Path(__file__).resolve().parent / ".data"
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def postgres_engine() -> Engine | None:
+    """
+    Return an engine for ``BENCH_POSTGRES_URL`` if it is set and reachable.
+    """
+    url = os.environ.get("BENCH_POSTGRES_URL")
+    if not url:
+        return None
+    engine = create_engine(url)
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as e:
+        print(f"postgresql unavailable, skipping: {e}", file=sys.stderr)
+        return None
+    return engine
+
+
+def schema_fingerprint() -> str:
+    """
+    Short hash of the DDL of every table and index in the models.
+    """
+    dialect = sqlite.dialect()
+    ddl = []
+    for table in Base.metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(dialect=dialect)))
+        ddl.extend(str(CreateIndex(index).compile(dialect=dialect))
+                   for index in sorted(table.indexes, key=lambda index: index.name))
+    return hashlib.sha256("\n".join(ddl).encode()).hexdigest()[:12]
+
+
+def sqlite_engine(scale: str, seed_value: int) -> tuple[Engine, bool]:
+    """
+    Return an engine for the cached SQLite database of ``scale`` and whether it is already seeded.
+    """
+    DATA_DIR.mkdir(exist_ok=True)
+    path = DATA_DIR / f"bench-{scale}-{seed_value}-{schema_fingerprint()}.sqlite"
+    return create_engine(f"sqlite:///{path}"), path.exists()
+
+
+def prepare(backend: str, scale: str, seed_value: int, reseed: bool) -> Engine | None:
+    users, contacts_per_user = datagen.SCALES[scale]
+    if backend == "sqlite":
+        engine, seeded = sqlite_engine(scale, seed_value)
+    else:
+        engine, seeded = postgres_engine(), False
+        if engine is None:
+            return None
+    if seeded and not reseed:
+        with Session(engine) as session:
+            seeded = session.scalar(select(func.count()).select_from(Contact)) >= users * contacts_per_user
+    if not seeded or reseed:
+        started = time.perf_counter()
+        datagen.seed(engine, users, contacts_per_user, seed_value)
+        print(f"seeded {backend} with {users} users x {contacts_per_user} contacts "
+              f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return engine
+
+
+def summarize(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+        "median_ms": round(statistics.median(ordered) * 1000, 4),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 4),
+        "min_ms": round(ordered[0] * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+    }
+
+
+async def time_scenarios(ctx: BenchContext, scenarios: dict, repeat: int, warmup: int) -> dict:
+    results = {}
+    for name, scenario in scenarios.items():
+        for _ in range(warmup):
+            await scenario(ctx)
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await scenario(ctx)
+            samples.append(time.perf_counter() - started)
+        results[name] = summarize(samples)
+        print(f"{name:45} median {results[name]['median_ms']:10.3f} ms  p95 {results[name]['p95_ms']:10.3f} ms",
+              file=sys.stderr)
+    return results
+
+
+def run(backend: str, scale: str, repeat: int, auth_repeat: int, warmup: int, seed_value: int,
+        only: str | None, reseed: bool) -> dict | None:
+    engine = prepare(backend, scale, seed_value, reseed)
+    if engine is None:
+        return None
+    users, contacts_per_user = datagen.SCALES[scale]
+    repository = {k: v for k, v in REPOSITORY_SCENARIOS.items() if not only or only in k}
+    auth = {k: v for k, v in AUTH_SCENARIOS.items() if not only or only in k}
+    with Session(engine) as session:
+        ctx = BenchContext(session=session, users=users, contacts_per_user=contacts_per_user,
+                           rng=random.Random(seed_value))
+        results = asyncio.run(time_scenarios(ctx, repository, repeat, warmup))
+        results.update(asyncio.run(time_scenarios(ctx, auth, auth_repeat, min(warmup, 1))))
+    engine.dispose()
+    return {
+        "commit": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "backend": backend,
+        "scale": scale,
+        "users": users,
+        "contacts": users * contacts_per_user,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(datagen.SCALES), default="10k")
+    parser.add_argument("--backend", choices=["sqlite", "postgresql", "all"], default="sqlite")
+    parser.add_argument("--repeat", type=int, default=50, help="timed calls per repository scenario")
+    parser.add_argument("--auth-repeat", type=int, default=5, help="timed calls per auth scenario (bcrypt is slow)")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", help="run only scenarios whose name contains this string")
+    parser.add_argument("--reseed", action="store_true", help="rebuild the cached dataset")
+    parser.add_argument("--output", type=Path, help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    backends = ["sqlite", "postgresql"] if args.backend == "all" else [args.backend]
+    reports = []
+    for backend in backends:
+        report = run(backend, args.scale, args.repeat, args.auth_repeat, args.warmup, args.seed, args.only,
+                     args.reseed)
+        if report is not None:
+            reports.append(report)
+    if not reports:
+        return 1
+    output = json.dumps(reports if len(reports) > 1 else reports[0], indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
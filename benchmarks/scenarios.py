@@ -0,0 +1,147 @@
+"""
+Timed scenarios for the repository layer and the authentication flow.
+
+Every scenario is an ``async`` callable taking a :class:`BenchContext`; the runner
+times each call individually so the reports contain latency distributions rather
+than a single average.
+"""
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import date
+
+from sqlalchemy.orm import Session
+
+from benchmarks.datagen import user_email
+from src.database.models import User
+from src.repository.contacts import ContactsRepository
+from src.repository.users import UsersRepository
+from src.schemas.schemas import ContactIn
+from src.services.auth import auth_service
+
+SEARCH_TERMS = ["nowak", "anna", "smith", "example", "zzz-no-match"]
+
+
+@dataclass
+class BenchContext:
+    """
+    State shared by the scenarios of one run.
+    """
+    session: Session
+    users: int
+    contacts_per_user: int
+    rng: random.Random
+    user_cache: dict = field(default_factory=dict)
+    password: str = "benchmark"
+    password_hash: str | None = None
+
+    @property
+    def repository(self) -> ContactsRepository:
+        return ContactsRepository(self.session)
+
+    def random_user(self) -> User:
+        user_id = self.rng.randint(1, self.users)
+        if user_id not in self.user_cache:
+            self.user_cache[user_id] = self.session.get(User, user_id)
+        return self.user_cache[user_id]
+
+    def contact_body(self) -> ContactIn:
+        n = uuid.uuid4().int % 10 ** 12
+        return ContactIn(first_name="Bench", last_name=f"Contact{n}", email=f"bench.{n}@example.com",
+                         phone_number=f"+48{n % 10 ** 9:09d}", date_of_birth=date(1990, 5, 17))
+
+
+async def get_contacts_first_page(ctx: BenchContext):
+    await ctx.repository.get_contacts(0, 100, ctx.random_user())
+
+
+async def get_contacts_deep_page(ctx: BenchContext):
+    skip = max(ctx.contacts_per_user - 100, 0)
+    await ctx.repository.get_contacts(skip, 100, ctx.random_user())
+
+
+async def get_contact(ctx: BenchContext):
+    user = ctx.random_user()
+    contact_id = (user.id - 1) * ctx.contacts_per_user + ctx.rng.randint(1, ctx.contacts_per_user)
+    await ctx.repository.get_contact(contact_id, user)
+
+
+async def get_contacts_by_query(ctx: BenchContext):
+    await ctx.repository.get_contacts_by_query(ctx.rng.choice(SEARCH_TERMS), 0, 100, ctx.random_user())
+
+
+async def get_contacts_with_upcoming_birthdays(ctx: BenchContext):
+    await ctx.repository.get_contacts_with_upcoming_birthdays(ctx.random_user())
+
+
+async def create_contact(ctx: BenchContext):
+    await ctx.repository.create_contact(ctx.contact_body(), ctx.random_user())
+
+
+async def update_contact(ctx: BenchContext):
+    user = ctx.random_user()
+    contact_id = (user.id - 1) * ctx.contacts_per_user + ctx.rng.randint(1, ctx.contacts_per_user)
+    body = ctx.contact_body()
+    contact = await ctx.repository.get_contact(contact_id, user)
+    body.email = contact.email
+    await ctx.repository.update_contact(contact_id, body, user)
+
+
+async def remove_contact(ctx: BenchContext):
+    user = ctx.random_user()
+    contact = await ctx.repository.create_contact(ctx.contact_body(), user)
+    await ctx.repository.remove_contact(contact.id, user)
+
+
+async def auth_get_user_by_email(ctx: BenchContext):
+    await UsersRepository(ctx.session).get_user_by_email(user_email(ctx.rng.randint(1, ctx.users)))
+
+
+async def auth_hash_password(ctx: BenchContext):
+    ctx.password_hash = auth_service.get_password_hash(ctx.password)
+
+
+async def auth_verify_password(ctx: BenchContext):
+    if ctx.password_hash is None:
+        ctx.password_hash = auth_service.get_password_hash(ctx.password)
+    auth_service.verify_password(ctx.password, ctx.password_hash)
+
+
+async def auth_tokens(ctx: BenchContext):
+    email = user_email(ctx.rng.randint(1, ctx.users))
+    await auth_service.create_access_token(data={"sub": email})
+    refresh_token = await auth_service.create_refresh_token(data={"sub": email})
+    await auth_service.decode_refresh_token(refresh_token)
+
+
+async def auth_login(ctx: BenchContext):
+    """
+    The work of ``POST /api/auth/login`` without the HTTP layer.
+    """
+    if ctx.password_hash is None:
+        ctx.password_hash = auth_service.get_password_hash(ctx.password)
+    user = await UsersRepository(ctx.session).get_user_by_email(user_email(ctx.rng.randint(1, ctx.users)))
+    auth_service.verify_password(ctx.password, ctx.password_hash)
+    await auth_service.create_access_token(data={"sub": user.email})
+    refresh_token = await auth_service.create_refresh_token(data={"sub": user.email})
+    await UsersRepository(ctx.session).update_token(user, refresh_token)
+
+
+REPOSITORY_SCENARIOS = {
+    "get_contacts.first_page": get_contacts_first_page,
+    "get_contacts.deep_page": get_contacts_deep_page,
+    "get_contact": get_contact,
+    "get_contacts_by_query": get_contacts_by_query,
+    "get_contacts_with_upcoming_birthdays": get_contacts_with_upcoming_birthdays,
+    "create_contact": create_contact,
+    "update_contact": update_contact,
+    "remove_contact": remove_contact,
+}
+
+AUTH_SCENARIOS = {
+    "auth.get_user_by_email": auth_get_user_by_email,
+    "auth.tokens": auth_tokens,
+    "auth.hash_password": auth_hash_password,
+    "auth.verify_password": auth_verify_password,
+    "auth.login": auth_login,
+}
@@ -0,0 +1,157 @@
+"""
+Local stand-ins for the external services used by the application.
+
+* Redis is replaced by fakeredis: the shared Redis pool creates fakeredis connections to
+  one in-memory server.
+* SMTP is an aiosmtpd sink that accepts and counts every message.
+* Cloudinary is a small HTTP server answering the upload API.
+
+The helpers only patch third-party entry points and environment variables; the
+application code runs unchanged.
+"""
+import os
+import socket
+import threading
+import time
+
+SETTINGS_DEFAULTS = {
+    "SECRET_KEY": "loadtest-secret",
+    "ALGORITHM": "HS256",
+    "POSTGRES_DB": "loadtest",
+    "POSTGRES_USER": "loadtest",
+    "POSTGRES_PASSWORD": "loadtest",
+    "POSTGRES_PORT": "5432",
+    "ORIGINS_URL": "http://localhost",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def configure_environment(database_url: str, smtp_port: int, cloudinary_port: int) -> None:
+    """
+    Point the application settings at the stand-ins.
+
+    :param database_url: SQLAlchemy URL of the load-test database.
+    :type database_url: str
+    :param smtp_port: Port of the SMTP sink.
+    :type smtp_port: int
+    :param cloudinary_port: Port of the fake Cloudinary server.
+    :type cloudinary_port: int
+    """
+    for key, value in SETTINGS_DEFAULTS.items():
+        os.environ.setdefault(key, value)
+    os.environ.update({
+        "SQLALCHEMY_DATABASE_URL": database_url,
+        "MAIL_SERVER": "127.0.0.1",
+        "MAIL_PORT": str(smtp_port),
+        "MAIL_USERNAME": "loadtest",
+        "MAIL_PASSWORD": "loadtest",
+        "MAIL_FROM": "loadtest@example.com",
+        "REDIS_HOST": "127.0.0.1",
+        "REDIS_PORT": "6379",
+        "CLOUDINARY_NAME": "loadtest",
+        "CLOUDINARY_API_KEY": "loadtest",
+        "CLOUDINARY_API_SECRET": "loadtest",
+        "LOADTEST_SMTP_PORT": str(smtp_port),
+        "LOADTEST_CLOUDINARY_PORT": str(cloudinary_port),
+    })
+
+
+def install_fakeredis() -> None:
+    """
+    Make ``redis.asyncio.BlockingConnectionPool`` open fakeredis connections to one server.
+    """
+    import fakeredis
+    import redis.asyncio
+
+    server = fakeredis.FakeServer()
+    pool_class = redis.asyncio.BlockingConnectionPool
+
+    def pool(**kwargs):
+        # fakeredis connections do not answer the health-check PING sent on reuse.
+        kwargs["health_check_interval"] = 0
+        return pool_class(connection_class=fakeredis.FakeAsyncRedisConnection, server=server, **kwargs)
+
+    redis.asyncio.BlockingConnectionPool = pool
+
+
+class CountingSink:
+    """
+    aiosmtpd handler that accepts every message and counts them.
+    """
+    def __init__(self):
+        self.messages = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        return "250 Message accepted for delivery"
+
+
+def start_smtp_sink(port: int):
+    """
+    Start an SMTP sink on ``port`` in a background thread.
+
+    :return: The running aiosmtpd controller; its ``handler`` counts received messages.
+    """
+    from aiosmtpd.controller import Controller
+
+    controller = Controller(CountingSink(), hostname="127.0.0.1", port=port)
+    controller.start()
+    return controller
+
+
+def use_plain_smtp() -> None:
+    """
+    Send mail to the sink without TLS or credentials, which the sink does not offer.
+    """
+    from fastapi_mail import ConnectionConfig
+
+    from src.services import email
+
+    config = email.get_connection_config()
+    plain = ConnectionConfig(**{**config.model_dump(), "MAIL_SSL_TLS": False, "MAIL_STARTTLS": False,
+                                "USE_CREDENTIALS": False})
+    email.get_connection_config = lambda: plain
+
+
+def start_fake_cloudinary(port: int) -> None:
+    """
+    Serve the Cloudinary upload API on ``port`` from a background thread.
+    """
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    async def upload(request):
+        form = await request.form()
+        public_id = form.get("public_id", "upload")
+        version = int(time.time())
+        cloud = request.path_params["cloud"]
+        return JSONResponse({
+            "public_id": public_id,
+            "version": version,
+            "format": "png",
+            "resource_type": "image",
+            "secure_url": f"https://res.cloudinary.com/{cloud}/image/upload/v{version}/{public_id}.png",
+        })
+
+    app = Starlette(routes=[Route("/v1_1/{cloud}/image/upload", upload, methods=["POST"])])
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                           lifespan="off"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+
+
+def use_fake_cloudinary(port: int) -> None:
+    """
+    Send avatar uploads to the fake Cloudinary server.
+    """
+    from src.services.avatars import get_cloudinary
+
+    get_cloudinary().config(upload_prefix=f"http://127.0.0.1:{port}")
@@ -0,0 +1,232 @@
+"""
+Idle capacity and fan-out latency of the contact change stream of one worker.
+
+Starts the application under ``uvicorn`` with one worker and the stand-ins of
+:mod:`benchmarks.standins`, opens ``--connections`` streams to
+``GET /api/contacts/stream`` spread over the seeded users, and keeps them idle for
+``--idle`` seconds. It then creates ``--events`` contacts through the API, one at a
+time, and waits until every stream of the contact's user has received the ``created``
+event. The report contains the resident memory of the worker per open stream, its CPU
+use while the streams are idle, and the fan-out latency from the ``POST`` to the last
+stream of the user. Linux only: the worker is measured through ``/proc``.
+
+Usage::
+
+    python -m benchmarks.stream
+    python -m benchmarks.stream --connections 10000 --users 50 --events 50 --output benchmarks/results/stream.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks import datagen, standins
+from benchmarks.loadtest import PASSWORD, percentile
+from benchmarks.run import git_revision
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmRSS not found")
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class Stream:
+    """
+    One open event stream, counting the ``created`` events it receives.
+    """
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.reader = None
+        self.writer = None
+        self.received = 0
+
+    async def open(self, port: int, token: str) -> None:
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        self.writer.write(f"GET /api/contacts/stream HTTP/1.1\r\nHost: 127.0.0.1\r\n"
+                          f"Authorization: Bearer {token}\r\nAccept: text/event-stream\r\n\r\n".encode())
+        buffered = b""
+        while b"retry:" not in buffered:
+            chunk = await self.reader.read(4096)
+            if not chunk:
+                raise RuntimeError(f"stream closed before it started: {buffered[:200]!r}")
+            buffered += chunk
+        if not buffered.startswith(b"HTTP/1.1 200"):
+            raise RuntimeError(f"stream refused: {buffered[:200]!r}")
+
+    async def listen(self, deliveries: dict) -> None:
+        while chunk := await self.reader.read(65536):
+            created = chunk.count(b"event: created")
+            if created:
+                self.received += created
+                deliveries["times"].append(time.perf_counter() - deliveries["started"])
+                deliveries["pending"] -= 1
+                if deliveries["pending"] == 0:
+                    deliveries["done"].set()
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+async def run(args, port: int, server_pid: int) -> dict:
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+        for _ in range(600):
+            try:
+                if (await client.get("/api/health/live")).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.1)
+        else:
+            raise RuntimeError("the server did not start")
+        tokens = {}
+        for user_id in range(1, args.users + 1):
+            response = await client.post("/api/auth/login", data={"username": datagen.user_email(user_id),
+                                                                  "password": PASSWORD})
+            response.raise_for_status()
+            tokens[user_id] = response.json()["access_token"]
+
+        await asyncio.sleep(1)
+        rss_before = rss_mb(server_pid)
+        streams = [Stream(i % args.users + 1) for i in range(args.connections)]
+        semaphore = asyncio.Semaphore(args.open_concurrency)
+
+        async def open_stream(stream):
+            async with semaphore:
+                await stream.open(port, tokens[stream.user_id])
+
+        started = time.perf_counter()
+        await asyncio.gather(*(open_stream(stream) for stream in streams))
+        open_seconds = time.perf_counter() - started
+        print(f"opened {len(streams)} streams in {open_seconds:.1f} s", file=sys.stderr)
+
+        deliveries = {"times": [], "pending": 0, "started": 0.0, "done": asyncio.Event()}
+        listeners = [asyncio.create_task(stream.listen(deliveries)) for stream in streams]
+        await asyncio.sleep(1)
+        cpu_before = cpu_seconds(server_pid)
+        await asyncio.sleep(args.idle)
+        idle_cpu = (cpu_seconds(server_pid) - cpu_before) / args.idle * 100
+        rss_after = rss_mb(server_pid)
+
+        fan_out = []
+        per_stream = []
+        for i in range(args.events):
+            user_id = i % args.users + 1
+            n = uuid.uuid4().int % 10 ** 9
+            deliveries.update(times=[], pending=sum(1 for stream in streams if stream.user_id == user_id),
+                              started=time.perf_counter(), done=asyncio.Event())
+            response = await client.post("/api/contacts/", headers={"Authorization": f"Bearer {tokens[user_id]}"},
+                                         json={"first_name": "Stream", "last_name": f"Test{n}",
+                                               "email": f"stream.{n}@example.com", "phone_number": f"+48{n:09d}",
+                                               "date_of_birth": "1990-05-17"})
+            response.raise_for_status()
+            await asyncio.wait_for(deliveries["done"].wait(), 60)
+            fan_out.append(max(deliveries["times"]))
+            per_stream.extend(deliveries["times"])
+
+        for stream in streams:
+            stream.close()
+        for listener in listeners:
+            listener.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+
+    fan_out.sort()
+    per_stream.sort()
+    return {
+        "connections": args.connections,
+        "open_seconds": round(open_seconds, 2),
+        "rss_before_mb": round(rss_before, 1),
+        "rss_after_mb": round(rss_after, 1),
+        "rss_per_connection_kb": round((rss_after - rss_before) * 1024 / args.connections, 2),
+        "idle_cpu_percent": round(idle_cpu, 2),
+        "events": args.events,
+        "streams_per_event": args.connections // args.users,
+        "delivery_median_ms": round(percentile(per_stream, 0.5) * 1000, 2),
+        "fan_out_median_ms": round(percentile(fan_out, 0.5) * 1000, 2),
+        "fan_out_p99_ms": round(percentile(fan_out, 0.99) * 1000, 2),
+        "fan_out_max_ms": round(fan_out[-1] * 1000, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=10000, help="streams held open against the worker")
+    parser.add_argument("--users", type=int, default=20, help="seeded users the streams are spread over")
+    parser.add_argument("--events", type=int, default=20, help="contacts created to measure the fan-out")
+    parser.add_argument("--idle", type=float, default=10.0, help="seconds the streams stay idle")
+    parser.add_argument("--open-concurrency", type=int, default=200, help="streams being opened at once")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    # Both processes hold one socket per stream.
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    needed = args.connections + 1000
+    if soft < needed:
+        if hard != resource.RLIM_INFINITY and hard < needed:
+            parser.error(f"--connections {args.connections} needs {needed} file descriptors, the limit is {hard}")
+        resource.setrlimit(resource.RLIMIT_NOFILE, (needed, hard))
+
+    workdir = Path(tempfile.mkdtemp(prefix="stream-"))
+    database_url = f"sqlite:///{workdir / 'stream.sqlite'}"
+    standins.configure_environment(database_url, standins.free_port(), standins.free_port())
+
+    from sqlalchemy import create_engine
+
+    from src.services.auth import auth_service
+
+    engine = create_engine(database_url)
+    datagen.seed(engine, args.users, 10, args.seed, auth_service.get_password_hash(PASSWORD))
+    engine.dispose()
+
+    port = standins.free_port()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "benchmarks.loadtest_app:app", "--host", "127.0.0.1",
+                               "--port", str(port), "--workers", "1", "--log-level", "warning",
+                               "--backlog", str(args.open_concurrency * 4)], cwd=ROOT, env=os.environ.copy())
+    try:
+        results = asyncio.run(run(args, port, server.pid))
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+    print(f"{results['connections']} streams: {results['rss_per_connection_kb']} KB each, "
+          f"{results['idle_cpu_percent']} % CPU idle, fan-out p50 {results['fan_out_median_ms']} ms "
+          f"p99 {results['fan_out_p99_ms']} ms", file=sys.stderr)
+    report = {
+        "commit": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Partition contacts by user_id
+
+Revision ID: a3c9e1d47b52
+Revises: fb46fae32ed3
+Create Date: 2026-10-19 10:12:31.402117
+
+Rebuilds ``contacts`` as a PostgreSQL table hash-partitioned by ``user_id``.
+
+The number of partitions defaults to 16 and can be chosen at upgrade time with
+``alembic -x partitions=64 upgrade head``. It cannot be changed later without another
+rebuild, so size it for the expected table (a few million rows per partition).
+
+A partitioned table cannot enforce uniqueness across partitions, so the primary key
+becomes ``(id, user_id)`` and email uniqueness becomes per user ``(user_id, email)``.
+Contacts without an owner cannot be placed in a partition. The upgrade stops when there
+are any, unless ``-x delete_ownerless=true`` is passed to delete them; they were not
+reachable through the API.
+
+The copy runs inside the migration transaction and holds an exclusive lock on
+``contacts`` until it commits.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e1d47b52'
+down_revision: Union[str, None] = 'fb46fae32ed3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEFAULT_PARTITIONS = 16
+
+INDEXES = [
+    ('ix_contacts_id', ['id'], False),
+    ('ix_contacts_first_name', ['first_name'], False),
+    ('ix_contacts_last_name', ['last_name'], False),
+    ('ix_contacts_email', ['email'], False),
+    ('ix_contacts_phone_number', ['phone_number'], False),
+    ('ix_contacts_user_id_id', ['user_id', 'id'], False),
+    ('ix_contacts_user_id_last_name', ['user_id', 'last_name'], False),
+    ('ix_contacts_user_id_email', ['user_id', 'email'], True),
+]
+
+
+def upgrade() -> None:
+    x_arguments = context.get_x_argument(as_dictionary=True)
+    partitions = int(x_arguments.get('partitions', DEFAULT_PARTITIONS))
+    delete_ownerless = x_arguments.get('delete_ownerless', 'false').lower() == 'true'
+
+    op.execute("LOCK TABLE contacts IN ACCESS EXCLUSIVE MODE")
+    if delete_ownerless:
+        op.execute("DELETE FROM contacts WHERE user_id IS NULL")
+    elif not context.is_offline_mode():
+        ownerless = op.get_bind().scalar(sa.text("SELECT count(*) FROM contacts WHERE user_id IS NULL"))
+        if ownerless:
+            raise RuntimeError(f"{ownerless} contacts have no user_id and cannot be partitioned; give them an "
+                               f"owner, or rerun with -x delete_ownerless=true to delete them")
+    op.execute("ALTER SEQUENCE contacts_id_seq OWNED BY NONE")
+    op.execute("CREATE TABLE contacts_partitioned (LIKE contacts INCLUDING DEFAULTS) PARTITION BY HASH (user_id)")
+    for remainder in range(partitions):
+        op.execute(f"CREATE TABLE contacts_p{remainder} PARTITION OF contacts_partitioned "
+                   f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})")
+    op.execute("INSERT INTO contacts_partitioned SELECT * FROM contacts")
+    op.drop_table('contacts')
+    op.rename_table('contacts_partitioned', 'contacts')
+    op.alter_column('contacts', 'user_id', existing_type=sa.Integer(), nullable=False)
+    op.create_primary_key('contacts_pkey', 'contacts', ['id', 'user_id'])
+    op.execute("ALTER SEQUENCE contacts_id_seq OWNED BY contacts.id")
+    op.create_foreign_key('contacts_user_id_fkey', 'contacts', 'users', ['user_id'], ['id'], ondelete='CASCADE')
+    for name, columns, unique in INDEXES:
+        op.create_index(name, 'contacts', columns, unique=unique)
+    op.execute("ANALYZE contacts")
+
+
+def downgrade() -> None:
+    # Restores the global unique index on email, so this fails (and rolls back) when two
+    # users have stored a contact with the same email since the upgrade.
+    op.execute("LOCK TABLE contacts IN ACCESS EXCLUSIVE MODE")
+    op.execute("ALTER SEQUENCE contacts_id_seq OWNED BY NONE")
+    op.execute("CREATE TABLE contacts_plain (LIKE contacts INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO contacts_plain SELECT * FROM contacts")
+    op.drop_table('contacts')
+    op.rename_table('contacts_plain', 'contacts')
+    op.alter_column('contacts', 'user_id', existing_type=sa.Integer(), nullable=True)
+    op.create_primary_key('contacts_pkey', 'contacts', ['id'])
+    op.execute("ALTER SEQUENCE contacts_id_seq OWNED BY contacts.id")
+    op.create_foreign_key('contacts_user_id_fkey', 'contacts', 'users', ['user_id'], ['id'], ondelete='CASCADE')
+    for name, columns, unique in INDEXES:
+        if name == 'ix_contacts_email':
+            unique = True
+        if name not in ('ix_contacts_user_id_id', 'ix_contacts_user_id_last_name', 'ix_contacts_user_id_email'):
+            op.create_index(name, 'contacts', columns, unique=unique)
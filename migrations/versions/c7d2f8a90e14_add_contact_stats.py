@@ -0,0 +1,39 @@
+"""Add contact_stats
+
+Revision ID: c7d2f8a90e14
+Revises: a3c9e1d47b52
+Create Date: 2026-10-19 11:03:54.218733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2f8a90e14'
+down_revision: Union[str, None] = 'a3c9e1d47b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('contact_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.SmallInteger(), nullable=False),
+    sa.Column('day', sa.SmallInteger(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'month', 'day')
+    )
+    op.execute(
+        "INSERT INTO contact_stats (user_id, month, day, count) "
+        "SELECT user_id, COALESCE(EXTRACT(MONTH FROM date_of_birth), 0), "
+        "COALESCE(EXTRACT(DAY FROM date_of_birth), 0), COUNT(*) "
+        "FROM contacts GROUP BY 1, 2, 3"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('contact_stats')
@@ -0,0 +1,41 @@
+"""Add contact blocking keys
+
+Revision ID: d41e6b0c9f27
+Revises: c7d2f8a90e14
+Create Date: 2026-10-19 12:20:47.551082
+
+Adds the normalised ``email_key``, ``phone_key`` and ``name_key`` columns used to find
+duplicate contacts, each indexed together with ``user_id``. ``email_key`` is filled here;
+the phone and name keys need the normalisation code and are filled by
+``python -m src.commands.backfill_contact_keys``.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41e6b0c9f27'
+down_revision: Union[str, None] = 'c7d2f8a90e14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('email_key', sa.String(), nullable=True))
+    op.add_column('contacts', sa.Column('phone_key', sa.String(length=16), nullable=True))
+    op.add_column('contacts', sa.Column('name_key', sa.String(length=16), nullable=True))
+    op.execute("UPDATE contacts SET email_key = NULLIF(LOWER(TRIM(email)), '')")
+    op.create_index('ix_contacts_user_id_email_key', 'contacts', ['user_id', 'email_key'], unique=False)
+    op.create_index('ix_contacts_user_id_phone_key', 'contacts', ['user_id', 'phone_key'], unique=False)
+    op.create_index('ix_contacts_user_id_name_key', 'contacts', ['user_id', 'name_key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_name_key', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_phone_key', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_email_key', table_name='contacts')
+    op.drop_column('contacts', 'name_key')
+    op.drop_column('contacts', 'phone_key')
+    op.drop_column('contacts', 'email_key')
@@ -0,0 +1,32 @@
+"""
+Compute the duplicate-detection keys of existing contacts.
+
+Usage::
+
+    python -m src.commands.backfill_contact_keys
+    python -m src.commands.backfill_contact_keys --batch-size 5000
+    python -m src.commands.backfill_contact_keys --missing-only --after-id 120000
+"""
+import argparse
+
+from src.database.db import SessionLocal, get_engine
+from src.repository.dedupe import backfill_contact_keys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill email_key, phone_key and name_key on contacts.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="contacts updated per transaction")
+    parser.add_argument("--missing-only", action="store_true", help="only contacts without a phone key")
+    parser.add_argument("--after-id", type=int, default=0, help="resume after this contact ID")
+    args = parser.parse_args(argv)
+
+    def progress(count, last_id):
+        print(f"updated {count} contacts, last id {last_id}", flush=True)
+
+    with SessionLocal(bind=get_engine()) as db:
+        rows = backfill_contact_keys(db, args.batch_size, args.missing_only, args.after_id, progress)
+    print(f"updated {rows} contacts")
+
+
+if __name__ == "__main__":
+    main()
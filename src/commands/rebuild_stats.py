@@ -0,0 +1,26 @@
+"""
+Rebuild the maintained contact counters from the contacts table.
+
+Usage::
+
+    python -m src.commands.rebuild_stats             # every user
+    python -m src.commands.rebuild_stats --user-id 42
+"""
+import argparse
+
+from src.database.db import SessionLocal, get_engine
+from src.repository.stats import rebuild_stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the contact_stats counters.")
+    parser.add_argument("--user-id", type=int, help="rebuild a single user instead of everyone")
+    args = parser.parse_args(argv)
+
+    with SessionLocal(bind=get_engine()) as db:
+        rows = rebuild_stats(db, args.user_id)
+    print(f"rebuilt {rows} counter rows")
+
+
+if __name__ == "__main__":
+    main()
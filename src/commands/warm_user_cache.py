@@ -0,0 +1,47 @@
+"""
+Load users into the Redis user cache ahead of their requests.
+
+Usage::
+
+    python -m src.commands.warm_user_cache                       # every confirmed user
+    python -m src.commands.warm_user_cache --email a@example.com --email b@example.com
+    python -m src.commands.warm_user_cache --batch-size 2000
+"""
+import argparse
+import asyncio
+
+from src.database.db import SessionLocal, get_engine
+from src.database.models import User
+from src.services.auth import auth_service
+from src.services.redis_pool import redis_pool
+
+
+async def warm(emails: list[str] | None, batch_size: int) -> int:
+    auth_service.bind(redis_pool.open())
+    warmed = 0
+    try:
+        with SessionLocal(bind=get_engine()) as db:
+            users = db.query(User).filter(User.confirmed.is_(True))
+            if emails:
+                users = users.filter(User.email.in_(emails))
+            last_id = 0
+            while batch := users.filter(User.id > last_id).order_by(User.id).limit(batch_size).all():
+                warmed += await auth_service.warm_users(batch)
+                last_id = batch[-1].id
+    finally:
+        auth_service.bind(None)
+        await redis_pool.close()
+    return warmed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm the Redis user cache.")
+    parser.add_argument("--email", action="append", help="warm only this user; may be repeated")
+    parser.add_argument("--batch-size", type=int, default=1000, help="users written per pipelined round-trip")
+    args = parser.parse_args(argv)
+
+    print(f"cached {asyncio.run(warm(args.email, args.batch_size))} users")
+
+
+if __name__ == "__main__":
+    main()
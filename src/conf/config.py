@@ -1,11 +1,21 @@
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings
 
+
 class Settings(BaseSettings):
     """
     Settings class for managing application settings.
 
     Attributes:
         sqlalchemy_database_url (str): The URL for connecting to the SQLAlchemy database.
+        sqlalchemy_replica_urls (list[str]): URLs of read replicas used for read-only contact queries.
+        replica_health_check_interval (float): Seconds between health checks of a read replica.
+        read_your_writes_window (float): Seconds a user's reads stay on the primary after a write.
+        db_pool_size (int): Database connections a worker keeps open.
+        db_max_overflow (int): Database connections a worker may open beyond the pool size under load.
+        postgres_max_connections (int): The ``max_connections`` of the PostgreSQL server, shared by every worker.
+        db_reserved_connections (int): Connections left free for job workers, migrations and admin sessions.
         secret_key (str): The secret key used for JWT token encryption.
         algorithm (str): The algorithm used for JWT token encryption.
         mail_username (str): The username for the email server.
@@ -15,6 +25,12 @@ class Settings(BaseSettings):
         mail_server (str): The SMTP server for sending emails.
         redis_host (str): The hostname of the Redis server (default is 'localhost').
         redis_port (int): The port number of the Redis server (default is 6379).
+        redis_max_connections (int): Connections a process opens to Redis at most.
+        redis_pool_timeout (float): Seconds a Redis command waits for a free pooled connection.
+        redis_socket_timeout (float): Seconds a Redis command waits for its reply.
+        redis_socket_connect_timeout (float): Seconds allowed for opening a Redis connection.
+        redis_health_check_interval (int): Seconds a Redis connection may idle before it is pinged on reuse.
+        redis_max_clients (int): The ``maxclients`` of the Redis server, shared by every worker.
         postgres_db (str): The name of the PostgreSQL database.
         postgres_user (str): The username for accessing the PostgreSQL database.
         postgres_password (str): The password for accessing the PostgreSQL database.
@@ -23,9 +39,60 @@ class Settings(BaseSettings):
         cloudinary_api_key (str): The API key for accessing the cloudinary service.
         cloudinary_api_secret (str): The API secret for accessing the cloudinary service.
         origins_url (str): The allowed origins for CORS (Cross-Origin Resource Sharing).
+        db_warmup_connections (int): Number of database connections opened before accepting traffic.
+        redis_warmup_connections (int): Number of Redis connections opened before accepting traffic.
+        shutdown_drain_timeout (float): Seconds to wait for in-flight requests to finish on shutdown.
+        shutdown_grace_period (float): Seconds a worker keeps serving, reported as not ready, after SIGTERM.
+        search_count_cap (int): Maximum number of matches counted for the total of a paginated search.
+        default_phone_country_code (str): Country calling code assumed for phone numbers written without one.
+        autocomplete_max_entries (int): Name entries kept in the in-process autocomplete index before evicting users.
+        autocomplete_ttl (float): Seconds before a user's autocomplete index is rebuilt from the database.
+        birthday_digest_enabled (bool): Run the daily birthday digest scheduler in every worker.
+        birthday_digest_days (int): Number of days ahead counted as upcoming birthdays.
+        birthday_digest_check_interval (float): Seconds between checks whether today's digests exist.
+        birthday_digest_lock_timeout (float): Seconds the digest builder holds the Redis lock without extending it.
+        birthday_digest_batch_size (int): Digests the builder stores per Redis call.
+        birthday_reminder_emails (bool): Email users their upcoming birthdays when the digests are built.
+        job_queue_name (str): Name of the Redis job queue used by the web and worker processes.
+        job_max_retries (int): Retries of a failed job before it is dead-lettered.
+        job_retry_backoff (float): Seconds before the first retry of a failed job; doubled on every retry.
+        job_worker_concurrency (int): Jobs a worker process runs at the same time.
+        server_host (str): Address ``src.serve`` binds to.
+        server_port (int): Port ``src.serve`` listens on.
+        server_workers (int): Web worker processes started by ``src.serve``; 0 means one per CPU.
+        server_backlog (int): Pending connections the listening socket queues.
+        server_keep_alive (int): Seconds an idle keep-alive connection stays open.
+        compression_min_size (int): Response bodies smaller than this many bytes are sent uncompressed.
+        compression_offload_size (int): Bodies or chunks of this many bytes or more are compressed in a thread.
+        slow_query_threshold_ms (float): Statements running at least this many milliseconds are logged.
+        n_plus_one_threshold (int): Executions of one SELECT within a request that are flagged as N+1.
+        query_strict_mode (bool): Raise on N+1 instead of logging it; meant for tests.
+        profiling_token (str): Token required by the profiling header and endpoint; profiling is off while empty.
+        profiling_interval (float): Seconds between stack samples of a single profiled request.
+        profiling_worker_interval (float): Seconds between stack samples of a worker-wide profiling session.
+        profiling_max_seconds (float): Longest worker-wide profiling session.
+        singleflight_shared (bool): Also coalesce identical reads between workers with a short Redis lock.
+        singleflight_lock_ms (int): Milliseconds the Redis lock of a coalesced read is held at most.
+        singleflight_result_ms (int): Milliseconds the result of a coalesced read stays readable by other workers.
+        singleflight_poll_ms (float): Milliseconds between checks for the result of another worker's read.
+        idempotency_ttl (int): Seconds the response of a request with an ``Idempotency-Key`` is replayed for retries.
+        idempotency_lock_timeout (float): Seconds the first attempt of an idempotent request holds its key at most.
+        idempotency_wait_timeout (float): Seconds a retry waits for the first attempt before answering 409.
+        idempotency_poll_interval (float): Seconds between checks whether the first attempt finished.
+        contact_stream_buffer (int): Events a contact stream may fall behind before it is told to resync.
+        contact_stream_heartbeat (float): Seconds without changes after which a contact stream sends a keep-alive.
+        contact_stream_retry_ms (int): Milliseconds a client waits before reconnecting a closed contact stream.
+        batch_max_requests (int): Requests accepted in one call to the batch endpoint.
 
     """
     sqlalchemy_database_url: str
+    sqlalchemy_replica_urls: list[str] = []
+    replica_health_check_interval: float = 5.0
+    read_your_writes_window: float = 5.0
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    postgres_max_connections: int = 100
+    db_reserved_connections: int = 10
     secret_key: str
     algorithm: str
     mail_username: str
@@ -35,6 +102,12 @@ class Settings(BaseSettings):
     mail_server: str
     redis_host: str = 'localhost'
     redis_port: int = 6379
+    redis_max_connections: int = 50
+    redis_pool_timeout: float = 2.0
+    redis_socket_timeout: float = 5.0
+    redis_socket_connect_timeout: float = 2.0
+    redis_health_check_interval: int = 30
+    redis_max_clients: int = 10000
     postgres_db: str
     postgres_user: str
     postgres_password: str
@@ -43,10 +116,78 @@ class Settings(BaseSettings):
     cloudinary_api_key: str
     cloudinary_api_secret: str
     origins_url: str
+    db_warmup_connections: int = 5
+    redis_warmup_connections: int = 5
+    shutdown_drain_timeout: float = 30.0
+    shutdown_grace_period: float = 5.0
+    search_count_cap: int = 1000
+    default_phone_country_code: str = '48'
+    autocomplete_max_entries: int = 1_000_000
+    autocomplete_ttl: float = 300.0
+    birthday_digest_enabled: bool = True
+    birthday_digest_days: int = 7
+    birthday_digest_check_interval: float = 300.0
+    birthday_digest_lock_timeout: float = 600.0
+    birthday_digest_batch_size: int = 500
+    birthday_reminder_emails: bool = False
+    job_queue_name: str = 'default'
+    job_max_retries: int = 3
+    job_retry_backoff: float = 10.0
+    job_worker_concurrency: int = 10
+    server_host: str = '0.0.0.0'
+    server_port: int = 8000
+    server_workers: int = 0
+    server_backlog: int = 2048
+    server_keep_alive: int = 5
+    compression_min_size: int = 1024
+    compression_offload_size: int = 65536
+    slow_query_threshold_ms: float = 100.0
+    n_plus_one_threshold: int = 10
+    query_strict_mode: bool = False
+    profiling_token: str = ''
+    profiling_interval: float = 0.001
+    profiling_worker_interval: float = 0.01
+    profiling_max_seconds: float = 60.0
+    singleflight_shared: bool = False
+    singleflight_lock_ms: int = 2000
+    singleflight_result_ms: int = 1000
+    singleflight_poll_ms: float = 5.0
+    idempotency_ttl: int = 86400
+    idempotency_lock_timeout: float = 30.0
+    idempotency_wait_timeout: float = 10.0
+    idempotency_poll_interval: float = 0.05
+    contact_stream_buffer: int = 100
+    contact_stream_heartbeat: float = 15.0
+    contact_stream_retry_ms: int = 3000
+    batch_max_requests: int = 20
 
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
 
-settings = Settings()
+
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Build the application settings on first use and cache them for the process lifetime.
+
+    :return: The application settings.
+    :rtype: Settings
+    """
+    return Settings()
+
+
+class LazySettings:
+    """
+    Proxy that defers reading the environment until the first attribute access.
+
+    Importing a module that depends on ``settings`` no longer parses ``.env``; the
+    real :class:`Settings` instance is created by :func:`get_settings` when a value
+    is first needed.
+    """
+    def __getattr__(self, name):
+        return getattr(get_settings(), name)
+
+
+settings = LazySettings()
 
@@ -1,12 +1,54 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
 
 from src.conf.config import settings
+from src.database.querylog import instrument
+from src.database.replicas import RoutingSession
+
+
+@lru_cache
+def get_engine() -> Engine:
+    """
+    Creates the SQLAlchemy engine on first use.
+
+    The engine is built lazily so that importing the application does not read the
+    settings or load the database driver. Its statements are timed by
+    :mod:`src.database.querylog`.
+
+    :return: The application-wide engine.
+    :rtype: Engine
+    """
+    return instrument(create_engine(settings.sqlalchemy_database_url, pool_size=settings.db_pool_size,
+                                    max_overflow=settings.db_max_overflow))
+
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
 
-SQLALCHEMY_DATABASE_URL = settings.sqlalchemy_database_url
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+_shared_session: ContextVar[Session | None] = ContextVar("shared_session", default=None)
+
+
+@contextmanager
+def sharing_session(db: Session):
+    """
+    Make :func:`get_db` hand out ``db`` inside the block instead of opening a session.
+
+    The requests run by the batch endpoint use it to share the session of the batch; the
+    session is closed by its owner, not by them.
+
+    :param db: The session to share.
+    :type db: Session
+    """
+    token = _shared_session.set(db)
+    try:
+        yield db
+    finally:
+        _shared_session.reset(token)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
     """
@@ -16,7 +58,11 @@ def get_db():
         Session: The database session object.
 
     """
-    db = SessionLocal()
+    shared = _shared_session.get()
+    if shared is not None:
+        yield shared
+        return
+    db = SessionLocal(bind=get_engine())
     try:
         yield db
     finally:
@@ -1,12 +1,37 @@
-from sqlalchemy import Column, Integer, String, Date, Boolean, func
+from sqlalchemy import DDL, Column, Integer, SmallInteger, String, Date, Boolean, Index, event, func
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.sql.sqltypes import Date
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.sql.schema import ForeignKey
+from sqlalchemy.sql.schema import ForeignKey, PrimaryKeyConstraint
 from sqlalchemy.sql.sqltypes import DateTime
 from sqlalchemy.orm import relationship
 
 Base = declarative_base()
 
+# Partitions of ``contacts`` created with the table; the migration takes the number at upgrade time.
+CONTACT_PARTITIONS = 16
+
+
+class PartitionedPrimaryKey(PrimaryKeyConstraint):
+    """
+    Primary key of a table partitioned on PostgreSQL.
+
+    PostgreSQL requires the primary key of a partitioned table to contain the partition
+    key, so there the columns listed in the ``partition_key`` entry of the table's ``info``
+    are appended; the ORM and the other databases keep the declared columns.
+    """
+
+
+@compiles(PartitionedPrimaryKey, "postgresql")
+def _primary_key_with_partition_key(constraint, compiler, **kw):
+    text = compiler.visit_primary_key_constraint(constraint, **kw)
+    missing = [name for name in constraint.table.info.get("partition_key", ()) if name not in constraint.columns.keys()]
+    if not missing:
+        return text
+    head, _, tail = text.rpartition(")")
+    return f"{head}, {', '.join(compiler.preparer.quote(name) for name in missing)}){tail}"
+
+
 class Contact(Base):
     """
     Model representing a contact.
@@ -15,24 +40,80 @@ class Contact(Base):
         id (int): The primary key ID of the contact.
         first_name (str): The first name of the contact.
         last_name (str): The last name of the contact.
-        email (str): The email address of the contact (must be unique).
+        email (str): The email address of the contact (unique per user).
         phone_number (str): The phone number of the contact.
         date_of_birth (Date): The date of birth of the contact.
+        email_key (str): Lower-cased email, used to find duplicates.
+        phone_key (str): Phone number in E.164 format, used to find duplicates.
+        name_key (str): Phonetic key of the full name, used to find duplicates.
         user_id (int): The ID of the user to whom the contact belongs.
         user (relationship): Relationship with the User model.
 
+    On PostgreSQL the table is hash-partitioned by ``user_id`` into ``CONTACT_PARTITIONS``
+    tables (migration ``a3c9e1d47b52``, or ``metadata.create_all``), so every index below is
+    partition-local and per-user queries prune to one partition. The database primary key
+    is ``(id, user_id)`` there; ``id`` alone stays the ORM identity because it is generated
+    by a single sequence and is therefore unique.
     """
     __tablename__ = "contacts"
+    __table_args__ = (
+        Index('ix_contacts_user_id_id', 'user_id', 'id'),
+        Index('ix_contacts_user_id_last_name', 'user_id', 'last_name'),
+        Index('ix_contacts_user_id_email', 'user_id', 'email', unique=True),
+        Index('ix_contacts_user_id_email_key', 'user_id', 'email_key'),
+        Index('ix_contacts_user_id_phone_key', 'user_id', 'phone_key'),
+        Index('ix_contacts_user_id_name_key', 'user_id', 'name_key'),
+        PartitionedPrimaryKey('id'),
+        {'postgresql_partition_by': 'HASH (user_id)', 'info': {'partition_key': ('user_id',)}},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String, index=True)
     last_name = Column(String, index=True)
-    email = Column(String, unique=True, index=True)
+    email = Column(String, index=True)
     phone_number = Column(String, index=True)
     date_of_birth = Column(Date)
-    user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), default=None)
+    email_key = Column(String)
+    phone_key = Column(String(16))
+    name_key = Column(String(16))
+    user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     user = relationship('User', backref="contacts")
 
+
+@event.listens_for(Contact.__table__, "after_create")
+def _create_contact_partitions(table, connection, **kw):
+    """
+    Create the ``CONTACT_PARTITIONS`` hash partitions of ``contacts`` on PostgreSQL.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    for remainder in range(CONTACT_PARTITIONS):
+        connection.execute(DDL(f"CREATE TABLE {table.name}_p{remainder} PARTITION OF {table.name} "
+                               f"FOR VALUES WITH (MODULUS {CONTACT_PARTITIONS}, REMAINDER {remainder})"))
+
+
+class ContactStat(Base):
+    """
+    Maintained per-user count of contacts sharing a birthday.
+
+    Each row counts the contacts of one user born on one day of the year. Summing the rows of
+    a user gives the total number of contacts; contacts without a date of birth are counted
+    under month and day 0.
+
+    Attributes:
+        user_id (int): The ID of the user owning the contacts.
+        month (int): Month of birth (1-12), or 0 when unknown.
+        day (int): Day of birth (1-31), or 0 when unknown.
+        count (int): Number of the user's contacts born on that day.
+
+    """
+    __tablename__ = "contact_stats"
+
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    month = Column(SmallInteger, primary_key=True)
+    day = Column(SmallInteger, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
 class User(Base):
     """
     Model representing a user.
@@ -0,0 +1,127 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.conf.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class NPlusOneError(AssertionError):
+    """
+    Raised in strict mode when one request repeats the same SELECT too often.
+    """
+
+
+class QueryStats:
+    """
+    The queries run while one request, or one :func:`track_queries` block, was active.
+
+    Attributes:
+        count (int): Number of statements executed.
+        duration (float): Seconds spent executing them.
+        selects (Counter): Executions of every SELECT statement, keyed by its SQL text.
+        repeated (list[str]): SELECT statements flagged as N+1, in the order they were flagged.
+        strict (bool): Raise :class:`NPlusOneError` instead of only logging an N+1.
+    """
+    def __init__(self, strict: bool = False):
+        self.count = 0
+        self.duration = 0.0
+        self.selects = Counter()
+        self.repeated = []
+        self.strict = strict
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        if statement.lstrip()[:6].upper() != "SELECT":
+            return
+        self.selects[statement] += 1
+        if self.selects[statement] == settings.n_plus_one_threshold:
+            self.repeated.append(statement)
+            logger.warning("possible N+1: statement run %s times in one request: %s", self.selects[statement],
+                           statement)
+            if self.strict:
+                raise NPlusOneError(f"statement run {self.selects[statement]} times in one request: {statement}")
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def current_stats() -> QueryStats | None:
+    """
+    Return the stats of the request being handled, or None outside :func:`track_queries`.
+    """
+    return _current.get()
+
+
+@contextmanager
+def track_queries(strict: bool | None = None):
+    """
+    Collect the statements executed inside the block on instrumented engines.
+
+    :param strict: Raise on N+1; defaults to ``settings.query_strict_mode``.
+    :type strict: bool | None
+    :return: The stats, filled in as statements run.
+    :rtype: QueryStats
+    """
+    stats = QueryStats(settings.query_strict_mode if strict is None else strict)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def bind_shape(parameters) -> str:
+    """
+    Describe bound parameters by their types only, so that logs carry no user data.
+
+    :param parameters: The parameters of a cursor execution.
+    :return: For example ``{user_id_1: int, param_1: str}``, or ``250 x {...}`` for executemany.
+    :rtype: str
+    """
+    if isinstance(parameters, list):
+        return f"{len(parameters)} x {bind_shape(parameters[0])}" if parameters else "[]"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, tuple):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    if duration * 1000 >= settings.slow_query_threshold_ms:
+        logger.warning("slow query (%.1f ms) with %s: %s", duration * 1000, bind_shape(parameters), statement)
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, duration)
+
+
+def instrument(engine: Engine) -> Engine:
+    """
+    Time every statement of an engine, log the slow ones and count them for the current request.
+
+    :param engine: The engine to instrument; instrumenting it twice has no effect.
+    :type engine: Engine
+    :return: The engine.
+    :rtype: Engine
+    """
+    if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
@@ -0,0 +1,263 @@
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from src.conf.config import settings
+from src.database.querylog import instrument
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaSet:
+    """
+    Round-robin pool of read replicas with periodic health checks.
+
+    A replica is probed with ``SELECT 1`` before its first use and then again every
+    ``health_check_interval`` seconds in a background thread, so a slow or unreachable
+    replica never holds up a request. It is also marked unhealthy as soon as one of its
+    connections is reported as disconnected. Unhealthy replicas are skipped until the next
+    probe succeeds; when none is healthy, callers fall back to the primary.
+
+    The set also remembers which users wrote recently, so that their reads stay on the
+    primary for ``read_your_writes_window`` seconds while the replicas catch up. Once
+    :meth:`bind` gave it the Redis client, the window is a Redis key with that TTL, so a
+    write handled by one worker pins the reads served by every other worker. Each worker
+    also keeps its own writes in memory, which covers Redis being unavailable.
+    """
+    def __init__(self, urls: list[str], health_check_interval: float = 5.0, read_your_writes_window: float = 5.0,
+                 **engine_kwargs):
+        self.engines = [instrument(create_engine(url, **engine_kwargs)) for url in urls]
+        self.health_check_interval = health_check_interval
+        self.read_your_writes_window = read_your_writes_window
+        self.redis = None
+        self._healthy = {engine: True for engine in self.engines}
+        self._checked_at = {engine: None for engine in self.engines}
+        self._probing = set()
+        self._written_at = OrderedDict()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        for engine in self.engines:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def bind(self, redis) -> None:
+        """
+        Share the read-your-writes windows between workers through Redis.
+
+        :param redis: The async Redis client, or None to keep the windows in this process only.
+        """
+        self.redis = redis
+
+    def _on_error(self, context) -> None:
+        if context.is_disconnect and context.engine in self._healthy:
+            self._healthy[context.engine] = False
+            self._checked_at[context.engine] = time.monotonic()
+            logger.warning("replica %s disconnected, marking unhealthy", context.engine.url)
+
+    def check(self, engine: Engine) -> bool:
+        """
+        Probe a replica and record the result.
+
+        :param engine: The replica engine to probe.
+        :type engine: Engine
+        :return: Whether the replica answered.
+        :rtype: bool
+        """
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            healthy = True
+        except Exception as e:
+            logger.warning("replica %s failed health check: %s", engine.url, e)
+            healthy = False
+        self._healthy[engine] = healthy
+        self._checked_at[engine] = time.monotonic()
+        return healthy
+
+    def is_healthy(self, engine: Engine) -> bool:
+        """
+        Return the cached health of a replica.
+
+        A replica that was never checked is probed first. Once the check interval expired, a
+        new probe starts in the background and the previous result is returned meanwhile.
+        """
+        checked_at = self._checked_at[engine]
+        if checked_at is None:
+            return self.check(engine)
+        if time.monotonic() - checked_at >= self.health_check_interval:
+            with self._lock:
+                start = engine not in self._probing
+                self._probing.add(engine)
+            if start:
+                threading.Thread(target=self._probe, args=(engine,), daemon=True).start()
+        return self._healthy[engine]
+
+    def _probe(self, engine: Engine) -> None:
+        try:
+            self.check(engine)
+        finally:
+            with self._lock:
+                self._probing.discard(engine)
+
+    def next(self) -> Engine | None:
+        """
+        Pick the next healthy replica in round-robin order.
+
+        :return: A replica engine, or None if there are no healthy replicas.
+        :rtype: Engine | None
+        """
+        for _ in range(len(self.engines)):
+            with self._lock:
+                engine = self.engines[next(self._counter) % len(self.engines)]
+            if self.is_healthy(engine):
+                return engine
+        return None
+
+    @staticmethod
+    def pin_key(user_id: int) -> str:
+        return f"replica-pin:{user_id}"
+
+    async def mark_written(self, user_id: int) -> None:
+        """
+        Pin the reads of a user to the primary for the read-your-writes window.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._written_at[user_id] = now
+            self._written_at.move_to_end(user_id)
+            # Entries are in write order, so the expired ones are at the front.
+            while self._written_at and now - next(iter(self._written_at.values())) >= self.read_your_writes_window:
+                self._written_at.popitem(last=False)
+        if self.redis is not None:
+            try:
+                await self.redis.set(self.pin_key(user_id), 1, px=max(1, int(self.read_your_writes_window * 1000)))
+            except Exception as e:
+                logger.warning("storing the read-your-writes pin failed: %s", e)
+
+    async def is_pinned(self, user_id: int) -> bool:
+        """
+        Return whether a user wrote within the read-your-writes window, on any worker.
+        """
+        written_at = self._written_at.get(user_id)
+        if written_at is not None and time.monotonic() - written_at < self.read_your_writes_window:
+            return True
+        if self.redis is None:
+            return False
+        try:
+            return bool(await self.redis.exists(self.pin_key(user_id)))
+        except Exception as e:
+            logger.warning("reading the read-your-writes pin failed: %s", e)
+            return False
+
+    def status(self) -> list[dict]:
+        """
+        Report the health of every replica.
+        """
+        return [{"url": engine.url.render_as_string(hide_password=True), "healthy": self._healthy[engine]}
+                for engine in self.engines]
+
+    def dispose(self) -> None:
+        for engine in self.engines:
+            engine.dispose()
+
+
+@lru_cache
+def get_replicas() -> ReplicaSet:
+    """
+    Build the replica set from the settings on first use.
+
+    :return: The replica set; empty when no replica URLs are configured.
+    :rtype: ReplicaSet
+    """
+    return ReplicaSet(settings.sqlalchemy_replica_urls, settings.replica_health_check_interval,
+                      settings.read_your_writes_window, pool_size=settings.db_pool_size,
+                      max_overflow=settings.db_max_overflow)
+
+
+class RoutingSession(Session):
+    """
+    Session that sends opted-in reads to a read replica.
+
+    Statements go to the primary bind unless they run inside :meth:`replica_reads`.
+    Even then, flushes, sessions that have already written and users inside their
+    read-your-writes window stay on the primary.
+    """
+    def __init__(self, *args, replicas: ReplicaSet | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._replicas = replicas
+        self._replica_reads = False
+        self._wrote = False
+
+    @property
+    def replicas(self) -> ReplicaSet:
+        if self._replicas is None:
+            self._replicas = get_replicas()
+        return self._replicas
+
+    def get_bind(self, mapper=None, **kw):
+        if self._replica_reads and not self._flushing and not self._wrote:
+            replica = self.replicas.next()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, **kw)
+
+    @contextmanager
+    def replica_reads(self, pinned: bool = False):
+        """
+        Route the reads issued inside the block to a replica.
+
+        :param pinned: Keep the reads on the primary, for a user who wrote recently.
+        :type pinned: bool
+        """
+        if not self.replicas.engines or pinned:
+            yield
+            return
+        previous, self._replica_reads = self._replica_reads, True
+        try:
+            yield
+        finally:
+            self._replica_reads = previous
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _after_flush(session, flush_context):
+    session._wrote = True
+
+
+async def replica_reads(db: Session, user_id: int | None = None):
+    """
+    Context manager routing the reads of ``db`` to a replica when it is a :class:`RoutingSession`.
+
+    The read-your-writes pin of the user is looked up first, hence the await::
+
+        with await replica_reads(db, user.id):
+            ...
+
+    :param db: The database session.
+    :type db: Session
+    :param user_id: The user the reads are for; users who wrote recently stay on the primary.
+    :type user_id: int | None
+    """
+    if isinstance(db, RoutingSession) and db.replicas.engines:
+        return db.replica_reads(user_id is not None and await db.replicas.is_pinned(user_id))
+    return nullcontext()
+
+
+async def mark_written(db: Session, user_id: int) -> None:
+    """
+    Start the read-your-writes window of a user after a committed mutation.
+
+    :param db: The database session that performed the write.
+    :type db: Session
+    :param user_id: The user whose data changed.
+    :type user_id: int
+    """
+    if isinstance(db, RoutingSession) and db.replicas.engines:
+        await db.replicas.mark_written(user_id)
@@ -2,6 +2,7 @@ from fastapi import Depends
 
 from src.database.db import get_db
 from src.repository.contacts import ContactsRepository
+from src.repository.users import UsersRepository
 
 
 def get_contacts_repository(db=Depends(get_db)):
@@ -13,4 +14,16 @@ def get_contacts_repository(db=Depends(get_db)):
     :return: An instance of ContactsRepository.
     :rtype: ContactsRepository
     """
-    return ContactsRepository(db)
\ No newline at end of file
+    return ContactsRepository(db)
+
+
+def get_users_repository(db=Depends(get_db)):
+    """
+    Dependency function to get an instance of the UsersRepository.
+
+    :param db: Dependency on the database session.
+    :type db: Depends
+    :return: An instance of UsersRepository.
+    :rtype: UsersRepository
+    """
+    return UsersRepository(db)
@@ -1,38 +1,68 @@
-from ipaddress import ip_address
-from typing import Callable
-from fastapi.responses import JSONResponse
-import redis.asyncio as redis
-from fastapi_limiter import FastAPILimiter
-from fastapi import FastAPI, Request, status
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from src.routes import contacts, auth, users
+from src.routes import contacts, auth, users, health, admin, batch
 from src.conf.config import settings
+from src.middleware.compression import CompressionMiddleware
+from src.middleware.idempotency import IdempotencyMiddleware
+from src.middleware.inflight import InFlightMiddleware
+from src.middleware.profiling import ProfilingMiddleware
+from src.middleware.querylog import QueryStatsMiddleware
+from src.services.resources import resources
+
+
+class SettingsCORSMiddleware(CORSMiddleware):
+    """
+    CORS middleware that reads the allowed origins from the settings.
+
+    Starlette builds the middleware stack on the first request, so the settings are
+    not loaded while the application module is being imported.
+    """
+    def __init__(self, app, **kwargs):
+        super().__init__(app, allow_origins=[settings.origins_url], **kwargs)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan handler.
 
+    Opens and warms the Redis and database pools before the worker accepts traffic, and
+    disposes them on shutdown; draining starts earlier, at SIGTERM (see
+    :class:`src.services.resources.ResourceManager`). The clients are created here, when the
+    server starts, instead of when the module is imported.
+    """
+    await resources.startup()
+    try:
+        yield
+    finally:
+        await resources.shutdown()
 
-ORIGINS = [
-    settings.origins_url
-    ]
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=ORIGINS,
+    SettingsCORSMiddleware,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+app.add_middleware(IdempotencyMiddleware)
+
+app.add_middleware(QueryStatsMiddleware)
+
+app.add_middleware(ProfilingMiddleware)
+
+app.add_middleware(CompressionMiddleware)
+
+app.add_middleware(InFlightMiddleware, resources=resources)
+
+app.include_router(health.router, prefix='/api')
 app.include_router(contacts.router, prefix='/api')
 app.include_router(auth.router, prefix='/api')
 app.include_router(users.router, prefix='/api')
-
-@app.on_event("startup")
-async def startup():
-    """
-    Function to run on application startup to initialize the connection to Redis and FastAPILimiter.
-    """
-    r = await redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0, encoding="utf-8",
-                          decode_responses=True)
-    await FastAPILimiter.init(r)
\ No newline at end of file
+app.include_router(admin.router, prefix='/api')
+app.include_router(batch.router, prefix='/api')
@@ -0,0 +1,194 @@
+import importlib.util
+import zlib
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from src.conf.config import settings
+
+# Cheap levels: most of the size reduction for a fraction of the CPU of the maximum levels.
+LEVELS = {"zstd": 3, "br": 4, "gzip": 5}
+PREFERENCE = ("zstd", "br", "gzip")
+MODULES = {"zstd": "zstandard", "br": "brotli"}
+# Server-sent event streams stay open with small, flushed frames: a compressor per stream
+# would hold its window for hours and save next to nothing.
+PASSTHROUGH_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip", "text/event-stream")
+
+
+def available_encodings() -> tuple[str, ...]:
+    """
+    Return the supported encodings, best first; brotli and zstd need their optional packages.
+    """
+    return tuple(name for name in PREFERENCE if name not in MODULES or importlib.util.find_spec(MODULES[name]))
+
+
+def negotiate(accept_encoding: str, available: tuple[str, ...]) -> str | None:
+    """
+    Pick the encoding for an ``Accept-Encoding`` header.
+
+    The highest q-value wins; ties go to the first encoding of ``available``. An encoding
+    with ``q=0`` is never picked, and ``*`` stands for every encoding not listed.
+
+    :param accept_encoding: The value of the request header.
+    :type accept_encoding: str
+    :param available: The encodings the server supports, best first.
+    :type available: tuple[str, ...]
+    :return: The chosen encoding, or None to send the body as is.
+    :rtype: str | None
+    """
+    weights = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip()] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in available:
+        q = weights.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class Encoder:
+    """
+    Streaming compressor with the same interface for gzip, brotli and zstd.
+    """
+    def __init__(self, encoding: str, level: int | None = None):
+        level = LEVELS[encoding] if level is None else level
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            import brotli
+
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            import zstandard
+
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes, flush: bool = True) -> bytes:
+        """
+        Compress a chunk; with ``flush`` the output decodes up to the end of the chunk.
+        """
+        if self.encoding == "br":
+            out = self._compressor.process(data)
+            return out + self._compressor.flush() if flush else out
+        out = self._compressor.compress(data)
+        if not flush:
+            return out
+        if self.encoding == "gzip":
+            return out + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        import zstandard
+
+        return out + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        """
+        Return the end of the compressed stream.
+        """
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+    def compress_all(self, data: bytes) -> bytes:
+        return self.compress(data, flush=False) + self.finish()
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses responses with the encoding negotiated from ``Accept-Encoding``.
+
+    zstd, brotli and gzip are offered, in that order of preference; the first two only when
+    the ``zstandard`` and ``brotli`` packages are installed. A complete body smaller than
+    ``settings.compression_min_size`` is sent as is. Streaming responses are compressed
+    chunk by chunk and flushed after every chunk, so clients see data as it is produced.
+    Chunks of ``settings.compression_offload_size`` bytes or more are compressed in the
+    thread pool, so large pages do not block the event loop.
+    """
+    def __init__(self, app, min_size: int | None = None, offload_size: int | None = None):
+        self.app = app
+        self.min_size = settings.compression_min_size if min_size is None else min_size
+        self.offload_size = settings.compression_offload_size if offload_size is None else offload_size
+        self.available = available_encodings()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.available)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, CompressingSend(send, encoding, self.min_size, self.offload_size))
+
+
+class CompressingSend:
+    """
+    The ``send`` callable of one response, compressing its body.
+    """
+    def __init__(self, send, encoding: str, min_size: int, offload_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.min_size = min_size
+        self.offload_size = offload_size
+        self.start = None
+        self.encoder = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message.get("headers", []))
+            content_type = headers.get("content-type", "")
+            self.passthrough = ("content-encoding" in headers or message["status"] in (204, 304)
+                                or content_type.startswith(PASSTHROUGH_TYPES))
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            if not more_body and len(body) < self.min_size:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            self.encoder = Encoder(self.encoding)
+            headers = MutableHeaders(raw=list(start.get("headers", [])))
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+                await self.send({**start, "headers": headers.raw})
+            else:
+                body = await self._run(self.encoder.compress_all, body)
+                headers["Content-Length"] = str(len(body))
+                await self.send({**start, "headers": headers.raw})
+                await self.send({"type": "http.response.body", "body": body})
+                return
+
+        if more_body:
+            body = await self._run(self.encoder.compress, body) if body else b""
+        else:
+            body = await self._run(self.encoder.compress_all, body)
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+    async def _run(self, func, data: bytes) -> bytes:
+        if len(data) >= self.offload_size:
+            return await run_in_threadpool(func, data)
+        return func(data)
@@ -0,0 +1,155 @@
+import hashlib
+import logging
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Match
+
+from src.services.auth import auth_service
+from src.services.idempotency import IDEMPOTENT_ENDPOINTS, idempotency_store
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+# Client errors a retry of the same request would get again; the others, such as 401 or
+# 429, may pass once the client re-authenticated or waited, so the retry runs again.
+REPLAYED_CLIENT_ERRORS = (400, 409, 422)
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware that makes the endpoints marked with ``@idempotent`` safe to retry.
+
+    A request to such an endpoint carrying an ``Idempotency-Key`` header runs once per key and
+    user; the user is taken from the bearer token. Requests without a token are scoped by
+    the key and the request itself, so that anonymous clients cannot hold each other's
+    keys, and requests with an invalid token are processed as sent. A successful response
+    of the first attempt, or a client error the same request would get again, is stored by
+    :data:`src.services.idempotency.idempotency_store` and replayed without calling the
+    endpoint, marked with ``Idempotent-Replayed: true``; after any other response the key
+    is released and a retry runs again. A concurrent retry waits for the first attempt.
+    Reusing a key for a different request is answered with 422, and a retry that gave up
+    waiting with 409. Without Redis the requests are processed as sent.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or idempotency_store.redis is None:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        key = headers.get("idempotency-key")
+        if key is None or not self._idempotent(scope):
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await JSONResponse({"detail": "Invalid Idempotency-Key"}, status_code=400)(scope, receive, send)
+            return
+
+        owner = self._owner(headers)
+        if owner is None:
+            await self.app(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        request_line = f"{scope['method']} {scope['path']}\n".encode()
+        fingerprint = hashlib.sha256(request_line + body).hexdigest()
+        if owner == "anonymous":
+            redis_key = f"idempotency:anonymous:{fingerprint}:{key}"
+        else:
+            redis_key = f"idempotency:{owner}:{key}"
+        try:
+            record = await idempotency_store.begin(redis_key, fingerprint)
+        except Exception as e:
+            logger.warning("reserving the idempotency key failed: %s", e)
+            await self.app(scope, self._replay_body(body, receive), send)
+            return
+        if record is not None:
+            await self._answer(record, fingerprint)(scope, receive, send)
+            return
+
+        response = {}
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response["start"] = message
+                response["body"] = b""
+            elif message["type"] == "http.response.body":
+                response["body"] += message.get("body", b"")
+            await send(message)
+
+        try:
+            await self.app(scope, self._replay_body(body, receive), capture)
+        finally:
+            try:
+                if "start" in response and self._replayable(response["start"]["status"]):
+                    await idempotency_store.complete(redis_key, fingerprint, response["start"]["status"],
+                                                     response["start"].get("headers", []), response["body"])
+                else:
+                    await idempotency_store.abandon(redis_key)
+            except Exception as e:
+                logger.warning("storing the idempotent response failed: %s", e)
+
+    @staticmethod
+    def _idempotent(scope) -> bool:
+        if scope["method"] not in ("POST", "PUT", "PATCH"):
+            return False
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "endpoint", None) in IDEMPOTENT_ENDPOINTS
+        return False
+
+    @staticmethod
+    def _replayable(status: int) -> bool:
+        return 200 <= status < 300 or status in REPLAYED_CLIENT_ERRORS
+
+    @staticmethod
+    def _owner(headers: Headers) -> str | None:
+        """
+        Return the user the keys of a request belong to: ``anonymous`` without a token,
+        None for an invalid one.
+        """
+        authorization = headers.get("authorization")
+        if authorization is None:
+            return "anonymous"
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and token:
+            return auth_service.access_token_subject(token)
+        return None
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                return body
+
+    @staticmethod
+    def _replay_body(body: bytes, receive):
+        sent = False
+
+        async def replay():
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        return replay
+
+    @staticmethod
+    def _answer(record: dict, fingerprint: str) -> Response:
+        if record["fingerprint"] != fingerprint:
+            return JSONResponse({"detail": "Idempotency-Key was already used for a different request"},
+                                status_code=422)
+        if "status" not in record:
+            return JSONResponse({"detail": "A request with this Idempotency-Key is still in progress"},
+                                status_code=409)
+        response = Response(record["body"].encode("latin-1"), status_code=record["status"])
+        response.raw_headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in record["headers"]]
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
@@ -0,0 +1,44 @@
+from starlette.responses import JSONResponse
+
+from src.services.resources import ResourceManager
+
+
+class InFlightMiddleware:
+    """
+    ASGI middleware that counts in-flight HTTP requests for graceful shutdown.
+
+    While the resource manager drains after SIGTERM, requests are still served but every
+    response carries ``Connection: close``, so keep-alive clients reconnect through the
+    load balancer. Once the server is stopping, new requests are refused with
+    ``503 Service Unavailable`` so that load balancers retry them on another worker,
+    while requests already running are allowed to complete.
+    """
+    def __init__(self, app, resources: ResourceManager):
+        self.app = app
+        self.resources = resources
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self.resources.stopping:
+            response = JSONResponse({"detail": "Server is shutting down"}, status_code=503,
+                                    headers={"Connection": "close", "Retry-After": "1"})
+            await response(scope, receive, send)
+            return
+        if self.resources.draining:
+            send = self._closing(send)
+        self.resources.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.resources.request_finished()
+
+    @staticmethod
+    def _closing(send):
+        async def send_with_close(message):
+            if message["type"] == "http.response.start":
+                headers = [(name, value) for name, value in message.get("headers", []) if name.lower() != b"connection"]
+                message = {**message, "headers": [*headers, (b"connection", b"close")]}
+            await send(message)
+        return send_with_close
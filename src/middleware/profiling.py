@@ -0,0 +1,53 @@
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse
+
+from src.conf.config import settings
+from src.services.profiler import StackSampler, profiling_allowed
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles a single request on demand.
+
+    A request carrying ``X-Profile: 1`` or the ``__profile=1`` query parameter, together with
+    the token of ``settings.profiling_token`` in ``X-Profile-Token``, runs under a
+    :class:`StackSampler` sampling every ``settings.profiling_interval`` seconds. Its response
+    is replaced by the folded stacks, ready for a flamegraph viewer; the original status is
+    sent in ``X-Profiled-Status``. Requests without a valid token are served normally, and
+    with an empty token the middleware only checks for the flag.
+
+    The sampler sees the whole worker, so requests running concurrently show up in the
+    report as well.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+        if not profiling_allowed(Headers(scope=scope).get("x-profile-token")):
+            await self.app(scope, receive, send)
+            return
+        profiled = {}
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                profiled["status"] = message["status"]
+
+        with StackSampler(settings.profiling_interval) as sampler:
+            await self.app(scope, receive, capture)
+        response = PlainTextResponse(sampler.folded(), headers={
+            "X-Profiled-Status": str(profiled.get("status", "")),
+            "X-Profile-Samples": str(sampler.samples),
+        })
+        await response(scope, receive, send)
+
+    @staticmethod
+    def _requested(scope) -> bool:
+        if Headers(scope=scope).get("x-profile") == "1":
+            return True
+        return b"__profile" in scope["query_string"] and \
+            parse_qs(scope["query_string"].decode("latin-1")).get("__profile") == ["1"]
@@ -0,0 +1,35 @@
+import logging
+
+from starlette.datastructures import MutableHeaders
+
+from src.database.querylog import track_queries
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware that counts and times the database statements of every HTTP request.
+
+    The totals are sent in a ``Server-Timing`` header (``db;dur=<ms>;desc="<n> queries"``),
+    which browser dev tools show next to the request, and logged at debug level together
+    with the statements flagged as N+1. In strict mode an N+1 raises instead, so that the
+    request fails with a 500.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with track_queries() as stats:
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"')
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+        logger.debug("%s %s: %s queries in %.1f ms, %s repeated", scope["method"], scope["path"], stats.count,
+                     stats.duration * 1000, len(stats.repeated))
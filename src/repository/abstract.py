@@ -1,6 +1,7 @@
 import abc
 
-from src.schemas.schemas import UserOut, ContactOut, ContactIn
+from src.database.models import User
+from src.schemas.schemas import UserIn, UserOut, ContactOut, ContactIn, ContactPage, ContactStats, ContactSuggestion, DuplicateCluster
 
 
 class AbstractContactsRepository(abc.ABC):
@@ -12,7 +13,13 @@ class AbstractContactsRepository(abc.ABC):
 
     """
     @abc.abstractmethod
-    async def get_contacts(self, skip: int, limit: int, user: UserOut) -> list[ContactOut]:
+    async def get_contacts(self, skip: int, limit: int, user: UserOut,
+                           fields: tuple[str, ...] | None = None) -> list[ContactOut]:
+        ...
+
+    @abc.abstractmethod
+    async def get_contacts_page(self, skip: int, limit: int, user: UserOut,
+                                fields: tuple[str, ...] | None = None) -> ContactPage:
         ...
 
     @abc.abstractmethod
@@ -32,9 +39,64 @@ class AbstractContactsRepository(abc.ABC):
         ...
 
     @abc.abstractmethod
-    async def get_contacts_by_query(self, query: str, skip: int, limit: int, user: UserOut) -> list[ContactOut]:
+    async def get_contacts_by_query(self, query: str, skip: int, limit: int, user: UserOut,
+                                    fields: tuple[str, ...] | None = None) -> list[ContactOut]:
+        ...
+
+    @abc.abstractmethod
+    async def get_contacts_by_query_page(self, query: str, skip: int, limit: int, user: UserOut,
+                                         fields: tuple[str, ...] | None = None) -> ContactPage:
+        ...
+
+    @abc.abstractmethod
+    async def autocomplete(self, prefix: str, limit: int, user: UserOut) -> list[ContactSuggestion]:
+        ...
+
+    @abc.abstractmethod
+    async def get_contacts_by_phone(self, number: str, user: UserOut) -> list[ContactOut]:
         ...
 
     @abc.abstractmethod
     async def get_contacts_with_upcoming_birthdays(self, user: UserOut) -> list[ContactOut]:
-        ...
\ No newline at end of file
+        ...
+
+    @abc.abstractmethod
+    async def get_contact_stats(self, user: UserOut) -> ContactStats:
+        ...
+
+    @abc.abstractmethod
+    async def get_duplicates(self, user: UserOut) -> list[DuplicateCluster]:
+        ...
+
+    @abc.abstractmethod
+    async def merge_contacts(self, keep_id: int, merge_ids: list[int], user: UserOut) -> ContactOut | None:
+        ...
+
+
+class AbstractUsersRepository(abc.ABC):
+    """
+    Abstract base class defining the interface for a users repository.
+
+    This class defines the abstract methods that should be implemented by concrete subclasses to provide
+    functionality for managing users.
+
+    """
+    @abc.abstractmethod
+    async def get_user_by_email(self, email: str) -> User | None:
+        ...
+
+    @abc.abstractmethod
+    async def create_user(self, body: UserIn) -> User:
+        ...
+
+    @abc.abstractmethod
+    async def update_token(self, user: User, token: str | None) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def confirm_email(self, email: str) -> User | None:
+        ...
+
+    @abc.abstractmethod
+    async def update_avatar(self, email: str, url: str) -> User | None:
+        ...
@@ -1,11 +1,44 @@
-from datetime import datetime, timedelta
+import json
+from datetime import datetime
 
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from sqlalchemy import extract, or_
+from sqlalchemy import func, or_
 
+from src.conf.config import settings
 from src.database.models import Contact
-from src.schemas.schemas import ContactIn, UserOut, ContactOut
+from src.database.replicas import replica_reads, mark_written
+from src.repository import dedupe, stats
+from src.schemas.fields import contact_list_adapter, contact_page_model
+from src.schemas.schemas import ContactIn, UserOut, ContactOut, ContactPage, ContactStats, ContactSuggestion, DuplicateCluster
 from src.repository.abstract import AbstractContactsRepository
+from src.services.autocomplete import autocomplete_index
+from src.services.events import contact_events
+from src.services.scheduler import birthday_digests
+from src.services.singleflight import singleflight
+from src.services.normalize import contact_keys, phone_key
+
+CONTACT_LIST = TypeAdapter(list[ContactOut])
+OPTIONAL_CONTACT = TypeAdapter(ContactOut | None)
+
+
+def _codec(adapter: TypeAdapter):
+    """
+    Return the single-flight encoder and decoder of the contacts read through ``adapter``.
+
+    The encoder also accepts ORM rows, so the coalesced reads hand out validated copies
+    instead of the rows of the session that loaded them.
+    """
+    return (lambda value: adapter.dump_json(adapter.validate_python(value, from_attributes=True)).decode(),
+            adapter.validate_json)
+
+
+def contacts_scope(user_id: int) -> str:
+    """
+    Return the single-flight scope of the reads of a user's contacts.
+    """
+    return f"contacts:{user_id}"
+
 
 class ContactsRepository(AbstractContactsRepository):
     """
@@ -14,7 +47,29 @@ class ContactsRepository(AbstractContactsRepository):
     def __init__(self, db: Session):
         self._db = db
 
-    async def get_contacts(self, skip: int, limit: int, user: UserOut) -> list[ContactOut]:
+    async def _written(self, user_id: int) -> None:
+        """
+        Start the read-your-writes window of a user after a committed contact write.
+
+        Reads of the user's contacts still in flight may predate the write, so later reads
+        must not join them.
+        """
+        await mark_written(self._db, user_id)
+        await singleflight.forget(contacts_scope(user_id))
+
+    def _select(self, fields: tuple[str, ...] | None):
+        if fields is None:
+            return self._db.query(Contact)
+        return self._db.query(*(getattr(Contact, name) for name in fields))
+
+    @staticmethod
+    def _items(rows: list, fields: tuple[str, ...] | None) -> list:
+        if fields is None:
+            return [ContactOut.model_validate(row, from_attributes=True) for row in rows]
+        return contact_list_adapter(fields).validate_python(rows, from_attributes=True)
+
+    async def get_contacts(self, skip: int, limit: int, user: UserOut,
+                           fields: tuple[str, ...] | None = None) -> list[ContactOut]:
         """
         Retrieves a list of contacts for a specific user with specified pagination parameters.
 
@@ -24,10 +79,52 @@ class ContactsRepository(AbstractContactsRepository):
         :type limit: int
         :param user: The user to retrieve contacts for.
         :type user: UserOut
-        :return: A list of contacts.
+        :param fields: Select only these columns, as parsed by :func:`src.schemas.fields.parse_contact_fields`.
+        :type fields: tuple[str, ...] | None
+        :return: A list of contacts; with ``fields``, instances of the matching :func:`contact_model`.
         :rtype: List[ContactOut]
         """
-        return self._db.query(Contact).filter(Contact.user_id == user.id).offset(skip).limit(limit).all()
+        async def load():
+            with await replica_reads(self._db, user.id):
+                rows = self._select(fields).filter(Contact.user_id == user.id).offset(skip).limit(limit).all()
+            return rows if fields is None else self._items(rows, fields)
+
+        return await singleflight.do(f"contacts:{user.id}:{skip}:{limit}:{','.join(fields or ())}", load,
+                                     *_codec(CONTACT_LIST if fields is None else contact_list_adapter(fields)),
+                                     scope=contacts_scope(user.id))
+
+
+    async def get_contacts_page(self, skip: int, limit: int, user: UserOut,
+                                fields: tuple[str, ...] | None = None) -> ContactPage:
+        """
+        Retrieves one page of a user's contacts together with the total number of contacts.
+
+        The total comes from the maintained contact counters, so it costs a primary key
+        lookup instead of a second scan of the contacts.
+
+        :param skip: The number of contacts to skip.
+        :type skip: int
+        :param limit: The maximum number of contacts to return.
+        :type limit: int
+        :param user: The user to retrieve contacts for.
+        :type user: UserOut
+        :param fields: Select only these columns, as parsed by :func:`src.schemas.fields.parse_contact_fields`.
+        :type fields: tuple[str, ...] | None
+        :return: The page of contacts and the total; with ``fields``, a :func:`contact_page_model`.
+        :rtype: ContactPage
+        """
+        page_model = ContactPage if fields is None else contact_page_model(fields)
+
+        async def load():
+            with await replica_reads(self._db, user.id):
+                items = (self._select(fields).filter(Contact.user_id == user.id).order_by(Contact.id)
+                         .offset(skip).limit(limit).all())
+                total = stats.get_total(self._db, user.id)
+            return page_model(items=self._items(items, fields), total=total)
+
+        return await singleflight.do(f"contacts-page:{user.id}:{skip}:{limit}:{','.join(fields or ())}", load,
+                                     page_model.model_dump_json, page_model.model_validate_json,
+                                     scope=contacts_scope(user.id))
 
 
     async def get_contact(self, contact_id: int, user: UserOut) -> ContactOut:
@@ -41,7 +138,12 @@ class ContactsRepository(AbstractContactsRepository):
         :return: The contact with the specified ID, or None if it does not exist.
         :rtype: ContactOut | None
         """
-        return self._db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == user.id).first()
+        async def load():
+            with await replica_reads(self._db, user.id):
+                return self._db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == user.id).first()
+
+        return await singleflight.do(f"contact:{user.id}:{contact_id}", load, *_codec(OPTIONAL_CONTACT),
+                                     scope=contacts_scope(user.id))
 
 
     async def create_contact(self, body: ContactIn, user: UserOut) -> ContactOut:
@@ -55,10 +157,16 @@ class ContactsRepository(AbstractContactsRepository):
         :return: The newly created contact.
         :rtype: ContactOut
         """
-        contact = Contact(first_name=body.first_name, last_name=body.last_name, email=body.email, phone_number = body.phone_number, date_of_birth = body.date_of_birth, user_id=user.id)
+        contact = Contact(first_name=body.first_name, last_name=body.last_name, email=body.email, phone_number = body.phone_number, date_of_birth = body.date_of_birth, user_id=user.id,
+                          **contact_keys(body.first_name, body.last_name, body.email, body.phone_number))
         self._db.add(contact)
+        stats.adjust_birthday_count(self._db, user.id, body.date_of_birth, 1)
         self._db.commit()
+        await self._written(user.id)
         self._db.refresh(contact)
+        autocomplete_index.add(user.id, contact.id, contact.first_name, contact.last_name)
+        await birthday_digests.discard(user.id, datetime.today().date())
+        await contact_events.publish(user.id, "created", contact)
         return contact
 
 
@@ -76,7 +184,12 @@ class ContactsRepository(AbstractContactsRepository):
         contact = self._db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == user.id).first()
         if contact:
             self._db.delete(contact)
+            stats.adjust_birthday_count(self._db, user.id, contact.date_of_birth, -1)
             self._db.commit()
+            await self._written(user.id)
+            autocomplete_index.remove(user.id, contact_id)
+            await birthday_digests.discard(user.id, datetime.today().date())
+            await contact_events.publish(user.id, "deleted", contact)
         return contact
 
 
@@ -95,16 +208,24 @@ class ContactsRepository(AbstractContactsRepository):
         """
         contact = self._db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == user.id).first()
         if contact:
+            stats.move_birthday_count(self._db, user.id, contact.date_of_birth, body.date_of_birth)
             contact.first_name = body.first_name
             contact.last_name = body.last_name
             contact.email = body.email
             contact.phone_number = body.phone_number
             contact.date_of_birth = body.date_of_birth
+            for field, value in contact_keys(body.first_name, body.last_name, body.email, body.phone_number).items():
+                setattr(contact, field, value)
             self._db.commit()
+            await self._written(user.id)
+            autocomplete_index.add(user.id, contact.id, contact.first_name, contact.last_name)
+            await birthday_digests.discard(user.id, datetime.today().date())
+            await contact_events.publish(user.id, "updated", contact)
         return contact
 
 
-    async def get_contacts_by_query(self, query: str, skip: int, limit: int, user: UserOut) -> list[ContactOut]:
+    async def get_contacts_by_query(self, query: str, skip: int, limit: int, user: UserOut,
+                                    fields: tuple[str, ...] | None = None) -> list[ContactOut]:
         """
         Retrieves a list of contacts based on a search query for a specific user.
 
@@ -116,34 +237,196 @@ class ContactsRepository(AbstractContactsRepository):
         :type limit: int
         :param user: The user whose contacts are being queried.
         :type user: UserOut
+        :param fields: Select only these columns, as parsed by :func:`src.schemas.fields.parse_contact_fields`.
+        :type fields: tuple[str, ...] | None
         :return: A list of contacts matching the search query within the specified range.
         :rtype: list[ContactOut]
         """
-        contact = self._db.query(Contact).filter(Contact.user_id == user.id)
+        contact = self._select(fields).filter(Contact.user_id == user.id)
         if query:
-            return contact.filter(
-                or_(
-                    Contact.first_name.ilike(f"%{query}%"),
-                    Contact.last_name.ilike(f"%{query}%"),
-                    Contact.email.ilike(f"%{query}%")
-                )
-            ).offset(skip).limit(limit).all()
+            with await replica_reads(self._db, user.id):
+                rows = contact.filter(self._matches(query)).offset(skip).limit(limit).all()
+            return rows if fields is None else self._items(rows, fields)
+
+
+    async def get_contacts_by_query_page(self, query: str, skip: int, limit: int, user: UserOut,
+                                         fields: tuple[str, ...] | None = None) -> ContactPage:
+        """
+        Retrieves one page of the contacts matching a search query together with the number of matches.
+
+        The page itself is never capped. The last page is counted from its own length;
+        otherwise the matches are counted in the database up to the larger of
+        ``settings.search_count_cap`` and the end of the next page. A total that reaches
+        that bound is reported with ``total_exact`` set to False, so clients can keep
+        paging past the cap.
+
+        :param query: The search query to filter contacts by (can be a partial match for first name, last name, or email).
+        :type query: str
+        :param skip: The number of contacts to skip.
+        :type skip: int
+        :param limit: The maximum number of contacts to return.
+        :type limit: int
+        :param user: The user whose contacts are being queried.
+        :type user: UserOut
+        :param fields: Select only these columns, as parsed by :func:`src.schemas.fields.parse_contact_fields`.
+        :type fields: tuple[str, ...] | None
+        :return: The page of matching contacts and the number of matches.
+        :rtype: ContactPage
+        """
+        if not query:
+            return await self.get_contacts_page(skip, limit, user, fields)
+        with await replica_reads(self._db, user.id):
+            matches = self._select(fields).filter(Contact.user_id == user.id, self._matches(query))
+            items = matches.order_by(Contact.id).offset(skip).limit(limit).all()
+            if len(items) < limit and (items or not skip):
+                total, total_exact = skip + len(items), True
+            else:
+                bound = max(settings.search_count_cap, skip + limit + 1)
+                counted = matches.with_entities(Contact.id).limit(bound).subquery()
+                total = self._db.query(func.count()).select_from(counted).scalar()
+                total_exact = total < bound
+        page_model = ContactPage if fields is None else contact_page_model(fields)
+        return page_model(items=self._items(items, fields), total=total, total_exact=total_exact)
+
+
+    async def autocomplete(self, prefix: str, limit: int, user: UserOut) -> list[ContactSuggestion]:
+        """
+        Suggests contacts whose first, last or full name starts with a prefix.
+
+        Served from the in-process name index of the user, which is loaded from the database
+        on first use and then updated by the contact writes.
+
+        :param prefix: The prefix as typed; case and accents are ignored.
+        :type prefix: str
+        :param limit: The maximum number of suggestions.
+        :type limit: int
+        :param user: The user whose contacts are searched.
+        :type user: UserOut
+        :return: The suggestions, ordered by the matched name.
+        :rtype: list[ContactSuggestion]
+        """
+        reads = await replica_reads(self._db, user.id)
+
+        def load():
+            with reads:
+                return self._db.query(Contact.id, Contact.first_name, Contact.last_name).filter(
+                    Contact.user_id == user.id).all()
+
+        return [ContactSuggestion(id=contact_id, first_name=first_name, last_name=last_name)
+                for contact_id, first_name, last_name in autocomplete_index.search(user.id, prefix, limit, load)]
+
+
+    async def get_contacts_by_phone(self, number: str, user: UserOut) -> list[ContactOut]:
+        """
+        Retrieves the contacts of a user with the given phone number, in any formatting.
+
+        The number is normalised to E.164 and looked up with one seek on the
+        ``(user_id, phone_key)`` index.
+
+        :param number: The phone number, e.g. ``+48 600-100-200`` or ``600100200``.
+        :type number: str
+        :param user: The user whose contacts are being queried.
+        :type user: UserOut
+        :return: The contacts with that number; empty when the number is not valid.
+        :rtype: list[ContactOut]
+        """
+        key = phone_key(number)
+        if key is None:
+            return []
+        with await replica_reads(self._db, user.id):
+            return self._db.query(Contact).filter(Contact.user_id == user.id, Contact.phone_key == key).all()
+
+
+    @staticmethod
+    def _matches(query: str):
+        return or_(
+            Contact.first_name.ilike(f"%{query}%"),
+            Contact.last_name.ilike(f"%{query}%"),
+            Contact.email.ilike(f"%{query}%")
+        )
 
 
     async def get_contacts_with_upcoming_birthdays(self, user: UserOut) -> list[ContactOut]:
         """
         Retrieves a list of contacts with upcoming birthdays within the next 7 days for a specific user.
 
+        The list is read from the digest precomputed by the birthday scheduler when there is
+        one, and queried from the database otherwise.
+
         :param user: The user whose contacts are being queried.
         :type user: UserOut
         :return: A list of contacts with birthdays in the next 7 days.
         :rtype: list[ContactOut]
         """
+        today = datetime.today().date()
+        digest = await birthday_digests.read(user.id, today)
+        if digest is not None:
+            return digest
         contact = self._db.query(Contact).filter(Contact.user_id == user.id)
-        today = datetime.today()
-        end_date = today + timedelta(days=7)
-        return contact.filter(
-            extract('month', Contact.date_of_birth) == today.month,
-            extract('day', Contact.date_of_birth) >= today.day,
-            extract('day', Contact.date_of_birth) <= end_date.day
-        ).all()
+        with await replica_reads(self._db, user.id):
+            return contact.filter(stats.upcoming_birthday_clause(today, settings.birthday_digest_days)).all()
+
+
+    async def get_contact_stats(self, user: UserOut) -> ContactStats:
+        """
+        Retrieves contact statistics for a specific user from the maintained counters.
+
+        :param user: The user whose contacts are counted.
+        :type user: UserOut
+        :return: The total number of contacts, the counts per birth month and the number of upcoming birthdays.
+        :rtype: ContactStats
+        """
+        today = datetime.today().date()
+
+        async def load():
+            with await replica_reads(self._db, user.id):
+                return stats.get_stats(self._db, user.id, today)
+
+        return await singleflight.do(f"contact-stats:{user.id}:{today.isoformat()}", load,
+                                     json.dumps, json.loads, scope=contacts_scope(user.id))
+
+
+    async def get_duplicates(self, user: UserOut) -> list[DuplicateCluster]:
+        """
+        Finds groups of a user's contacts that share an email, a phone number or a phonetic name.
+
+        :param user: The user whose contacts are checked.
+        :type user: UserOut
+        :return: The candidate duplicate clusters.
+        :rtype: list[DuplicateCluster]
+        """
+        with await replica_reads(self._db, user.id):
+            clusters = dedupe.find_duplicate_clusters(self._db, user.id)
+        return [DuplicateCluster(contacts=[ContactOut.model_validate(contact, from_attributes=True)
+                                           for contact in cluster["contacts"]],
+                                 matched_on=cluster["matched_on"])
+                for cluster in clusters]
+
+
+    async def merge_contacts(self, keep_id: int, merge_ids: list[int], user: UserOut) -> ContactOut | None:
+        """
+        Merges duplicate contacts of a user into one of them.
+
+        :param keep_id: The ID of the contact to keep.
+        :type keep_id: int
+        :param merge_ids: The IDs of the contacts merged into it and deleted.
+        :type merge_ids: list[int]
+        :param user: The user owning the contacts.
+        :type user: UserOut
+        :return: The kept contact, or None if any of the contacts does not exist.
+        :rtype: ContactOut | None
+        """
+        contact = dedupe.merge_contacts(self._db, user.id, keep_id, merge_ids)
+        if contact:
+            self._db.commit()
+            await self._written(user.id)
+            for contact_id in merge_ids:
+                if contact_id != keep_id:
+                    autocomplete_index.remove(user.id, contact_id)
+            autocomplete_index.add(user.id, contact.id, contact.first_name, contact.last_name)
+            await birthday_digests.discard(user.id, datetime.today().date())
+            await contact_events.publish(user.id, "updated", contact)
+            for contact_id in merge_ids:
+                if contact_id != keep_id:
+                    await contact_events.publish(user.id, "deleted", Contact(id=contact_id))
+        return contact
@@ -0,0 +1,154 @@
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from src.database.models import Contact
+from src.repository import stats
+from src.services.normalize import contact_keys
+
+BLOCKING_KEYS = {
+    "email": Contact.email_key,
+    "phone": Contact.phone_key,
+    "name": Contact.name_key,
+}
+MERGED_FIELDS = ("first_name", "last_name", "email", "phone_number", "date_of_birth")
+
+
+def find_duplicate_clusters(db: Session, user_id: int) -> list[dict]:
+    """
+    Groups a user's contacts that share at least one blocking key.
+
+    Each key is grouped in the database through its ``(user_id, key)`` index and only the
+    contacts whose key occurs more than once are read back. The groups are then joined with
+    a union-find, so contacts linked through different keys (A shares an email with B, B a
+    phone with C) end up in one cluster. The work is linear in the number of contacts
+    instead of comparing every pair.
+
+    :param Session db: The database session object.
+    :param int user_id: The ID of the user.
+
+    :return: The clusters, each with its contacts ordered by ID and the keys that matched.
+    :rtype: list[dict]
+    """
+    parent = {}
+
+    def find(contact_id):
+        while parent[contact_id] != contact_id:
+            parent[contact_id] = parent[parent[contact_id]]
+            contact_id = parent[contact_id]
+        return contact_id
+
+    groups = []
+    for name, column in BLOCKING_KEYS.items():
+        shared = (select(column).where(Contact.user_id == user_id, column.isnot(None))
+                  .group_by(column).having(func.count() > 1))
+        rows = db.execute(select(column, Contact.id).where(Contact.user_id == user_id, column.in_(shared))
+                          .order_by(column, Contact.id)).all()
+        for _, group in groupby(rows, key=itemgetter(0)):
+            ids = [row[1] for row in group]
+            groups.append((name, ids))
+            for contact_id in ids:
+                parent.setdefault(contact_id, contact_id)
+            for contact_id in ids[1:]:
+                parent[find(contact_id)] = find(ids[0])
+
+    if not parent:
+        return []
+    members, matched_on = defaultdict(list), defaultdict(set)
+    for contact_id in parent:
+        members[find(contact_id)].append(contact_id)
+    for name, ids in groups:
+        matched_on[find(ids[0])].add(name)
+    contacts = {contact.id: contact for contact in
+                db.query(Contact).filter(Contact.user_id == user_id, Contact.id.in_(list(parent)))}
+    clusters = sorted(members.items(), key=lambda item: min(item[1]))
+    return [{"contacts": [contacts[contact_id] for contact_id in sorted(ids)], "matched_on": sorted(matched_on[root])}
+            for root, ids in clusters]
+
+
+def merge_contacts(db: Session, user_id: int, keep_id: int, merge_ids: list[int]) -> Contact | None:
+    """
+    Merges duplicate contacts into the one that is kept.
+
+    Empty fields of the kept contact are filled from the merged contacts, in the order given,
+    and the merged contacts are deleted. The birthday counters and blocking keys are updated
+    in the same transaction; the caller commits.
+
+    :param Session db: The database session object.
+    :param int user_id: The ID of the user owning the contacts.
+    :param int keep_id: The ID of the contact to keep.
+    :param list[int] merge_ids: The IDs of the contacts merged into it.
+
+    :return: The kept contact, or None if any of the contacts does not exist.
+    :rtype: Contact | None
+    """
+    merge_ids = [contact_id for contact_id in dict.fromkeys(merge_ids) if contact_id != keep_id]
+    contacts = {contact.id: contact for contact in
+                db.query(Contact).filter(Contact.user_id == user_id, Contact.id.in_([keep_id, *merge_ids]))}
+    if len(contacts) != len(merge_ids) + 1:
+        return None
+    keep = contacts[keep_id]
+    previous_birthday = keep.date_of_birth
+    values = {field: getattr(keep, field) for field in MERGED_FIELDS}
+    for contact_id in merge_ids:
+        other = contacts[contact_id]
+        for field in MERGED_FIELDS:
+            if values[field] in (None, "") and getattr(other, field) not in (None, ""):
+                values[field] = getattr(other, field)
+        stats.adjust_birthday_count(db, user_id, other.date_of_birth, -1)
+        db.delete(other)
+    # Delete first so that taking over the email of a merged contact does not hit the
+    # per-user unique index.
+    db.flush()
+    for field, value in values.items():
+        setattr(keep, field, value)
+    for field, value in contact_keys(keep.first_name, keep.last_name, keep.email, keep.phone_number).items():
+        setattr(keep, field, value)
+    stats.move_birthday_count(db, user_id, previous_birthday, keep.date_of_birth)
+    return keep
+
+
+def backfill_contact_keys(db: Session, batch_size: int = 1000, missing_only: bool = False, after_id: int = 0,
+                          progress=None) -> int:
+    """
+    Computes the blocking keys of existing contacts.
+
+    Contacts are streamed in primary key order, ``batch_size`` at a time, with a keyset
+    condition on the last ID seen, so every batch is an index range scan however far the
+    job has got. Every batch is written with one executemany and committed, so the job can
+    run against a live database and be resumed from the last reported ID.
+
+    :param Session db: The database session object.
+    :param int batch_size: Number of contacts read and updated per transaction.
+    :param bool missing_only: Only update contacts that have a phone number but no phone key.
+    :param int after_id: Resume after this contact ID.
+    :param progress: Optional callable receiving the running count and the last ID after each batch.
+
+    :return: The number of contacts updated.
+    :rtype: int
+    """
+    table = Contact.__table__
+    statement = (update(table)
+                 .where(table.c.id == bindparam("b_id"), table.c.user_id == bindparam("b_user_id"))
+                 .values(email_key=bindparam("email_key"), phone_key=bindparam("phone_key"),
+                         name_key=bindparam("name_key")))
+    query = select(Contact.id, Contact.user_id, Contact.first_name, Contact.last_name, Contact.email,
+                   Contact.phone_number)
+    if missing_only:
+        query = query.where(Contact.phone_key.is_(None), Contact.phone_number.isnot(None))
+    last_id, updated = after_id, 0
+    while True:
+        rows = db.execute(query.where(Contact.id > last_id).order_by(Contact.id).limit(batch_size)).all()
+        if not rows:
+            return updated
+        db.execute(statement, [{"b_id": row.id, "b_user_id": row.user_id,
+                                **contact_keys(row.first_name, row.last_name, row.email, row.phone_number)}
+                               for row in rows])
+        db.commit()
+        updated += len(rows)
+        last_id = rows[-1].id
+        if progress is not None:
+            progress(updated, last_id)
@@ -0,0 +1,162 @@
+from datetime import date, timedelta
+
+from sqlalchemy import delete, extract, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from src.database.models import Contact, ContactStat
+
+UNKNOWN = (0, 0)
+
+
+def upcoming_birthday_days(today: date, days: int = 7) -> list[tuple[int, int]]:
+    """
+    Lists the (month, day) pairs from ``today`` up to and including ``today + days``.
+
+    February 29 is included in non-leap years when February 28 is in the range, so that
+    contacts born on a leap day are not skipped.
+
+    :param date today: The first day of the range.
+    :param int days: Number of days after ``today`` to include.
+
+    :return: The birthdays falling in the range.
+    :rtype: list[tuple[int, int]]
+    """
+    pairs = []
+    for offset in range(days + 1):
+        current = today + timedelta(days=offset)
+        pairs.append((current.month, current.day))
+        if (current.month, current.day) == (2, 28) and (current + timedelta(days=1)).day == 1:
+            pairs.append((2, 29))
+    return pairs
+
+
+def upcoming_birthday_clause(today: date, days: int = 7):
+    """
+    SQL condition selecting contacts with a birthday from ``today`` up to ``today + days``.
+
+    Unlike a comparison of day numbers within the current month, the range may cross the
+    end of a month or year.
+
+    :param date today: The first day of the range.
+    :param int days: Number of days after ``today`` to include.
+
+    :return: The condition on ``Contact.date_of_birth``.
+    """
+    birthday = extract('month', Contact.date_of_birth) * 100 + extract('day', Contact.date_of_birth)
+    return birthday.in_([month * 100 + day for month, day in upcoming_birthday_days(today, days)])
+
+
+def _birthday_key(birthday: date | None) -> tuple[int, int]:
+    return (birthday.month, birthday.day) if birthday else UNKNOWN
+
+
+def adjust_birthday_count(db: Session, user_id: int, birthday: date | None, delta: int) -> None:
+    """
+    Adds ``delta`` to the counter of contacts of a user born on ``birthday``.
+
+    The counter is updated with a single upsert so that concurrent writers do not lose
+    increments. It is part of the caller's transaction and is committed with the contact.
+
+    :param Session db: The database session object.
+    :param int user_id: The ID of the user owning the contact.
+    :param date | None birthday: The contact's date of birth.
+    :param int delta: The change to apply, usually 1 or -1.
+
+    :return: This function does not return anything.
+    :rtype: None
+    """
+    month, day = _birthday_key(birthday)
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(ContactStat).values(user_id=user_id, month=month, day=day, count=delta)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ContactStat.user_id, ContactStat.month, ContactStat.day],
+        set_={"count": ContactStat.count + stmt.excluded.count},
+    )
+    db.execute(stmt)
+
+
+def move_birthday_count(db: Session, user_id: int, old: date | None, new: date | None) -> None:
+    """
+    Moves one contact between birthday counters after its date of birth changed.
+
+    :param Session db: The database session object.
+    :param int user_id: The ID of the user owning the contact.
+    :param date | None old: The previous date of birth.
+    :param date | None new: The new date of birth.
+
+    :return: This function does not return anything.
+    :rtype: None
+    """
+    if _birthday_key(old) != _birthday_key(new):
+        adjust_birthday_count(db, user_id, old, -1)
+        adjust_birthday_count(db, user_id, new, 1)
+
+
+def get_stats(db: Session, user_id: int, today: date, days: int = 7) -> dict:
+    """
+    Computes a user's contact statistics from the maintained counters.
+
+    Reads at most 367 counter rows through the primary key, independently of the number of
+    contacts.
+
+    :param Session db: The database session object.
+    :param int user_id: The ID of the user.
+    :param date today: The date the upcoming birthdays are counted from.
+    :param int days: Number of days ahead counted as upcoming.
+
+    :return: The total, the counts per birth month and the number of upcoming birthdays.
+    :rtype: dict
+    """
+    rows = db.execute(
+        select(ContactStat.month, ContactStat.day, ContactStat.count).where(ContactStat.user_id == user_id)
+    ).all()
+    upcoming_days = set(upcoming_birthday_days(today, days))
+    by_month = {month: 0 for month in range(1, 13)}
+    total = upcoming = 0
+    for month, day, count in rows:
+        total += count
+        if month:
+            by_month[month] += count
+        if (month, day) in upcoming_days:
+            upcoming += count
+    return {"total": total, "birthdays_by_month": by_month, "upcoming_birthdays": upcoming, "upcoming_days": days}
+
+
+def get_total(db: Session, user_id: int) -> int:
+    """
+    Returns the number of contacts of a user from the maintained counters.
+
+    :param Session db: The database session object.
+    :param int user_id: The ID of the user.
+
+    :return: The number of contacts.
+    :rtype: int
+    """
+    return db.scalar(select(func.coalesce(func.sum(ContactStat.count), 0)).where(ContactStat.user_id == user_id))
+
+
+def rebuild_stats(db: Session, user_id: int | None = None) -> int:
+    """
+    Recomputes the counters from the contacts table, for one user or for everyone.
+
+    Used to repair the counters if they ever drift, for example after rows were changed
+    outside the repository.
+
+    :param Session db: The database session object.
+    :param int | None user_id: The user to rebuild, or None for all users.
+
+    :return: The number of counter rows written.
+    :rtype: int
+    """
+    month = func.coalesce(extract('month', Contact.date_of_birth), 0)
+    day = func.coalesce(extract('day', Contact.date_of_birth), 0)
+    source = select(Contact.user_id, month, day, func.count()).group_by(Contact.user_id, month, day)
+    clear = delete(ContactStat)
+    if user_id is not None:
+        source = source.where(Contact.user_id == user_id)
+        clear = clear.where(ContactStat.user_id == user_id)
+    db.execute(clear)
+    result = db.execute(insert(ContactStat).from_select(["user_id", "month", "day", "count"], source))
+    db.commit()
+    return result.rowcount
@@ -1,88 +1,107 @@
 from libgravatar import Gravatar
+from sqlalchemy import update
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
 from src.database.models import User
-from src.schemas.schemas import UserIn, UserOut
+from src.repository.abstract import AbstractUsersRepository
+from src.schemas.schemas import UserIn
 
 
-async def get_user_by_email(email: str, db: Session) -> UserOut:
+class UsersRepository(AbstractUsersRepository):
     """
-    Retrieves a user by their email address.
+    Repository for users.
 
-    :param str email: The email address of the user to retrieve.
-    :param Session db: The database session object.
-
-    :return: The user corresponding to the provided email, or None if not found.
-    :rtype: UserOut or None
-    """
-    return db.query(User).filter(User.email == email).first()
-
-
-async def create_user(body: UserIn, db: Session) -> User:
-    """
-    Creates a new user.
-
-    :param UserIn body: The data for the new user.
-    :param Session db: The database session object.
-
-    :return: The newly created user.
-    :rtype: User
-    """
-    avatar = None
-    try:
-        g = Gravatar(body.email)
-        avatar = g.get_image()
-    except Exception as e:
-        print(e)
-    new_user = User(**body.dict(), avatar=avatar)
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
-
-
-async def update_token(user: User, token: str | None, db: Session) -> None:
-    """
-    Updates the refresh token for a user.
-
-    :param User user: The user whose token is to be updated.
-    :param str | None token: The new refresh token. Pass None to remove the token.
-    :param Session db: The database session object.
-
-    :return: This function does not return anything.
-    :rtype: None
-    """
-    user.refresh_token = token
-    db.commit()
-
-
-async def confirm_email(email: str, db: Session) -> None:
-    """
-    Marks a user's email as confirmed.
-
-    :param str email: The email address of the user to confirm.
-    :param Session db: The database session object.
-
-    :return: This function does not return anything.
-    :rtype: None
-    """
-    user = await get_user_by_email(email, db)
-    user.confirmed = True
-    db.commit()
-
-
-async def update_avatar(email, url: str, db: Session) -> UserOut:
-    """
-    Updates the avatar URL for a user.
-
-    :param str email: The email address of the user to update.
-    :param str url: The new URL of the avatar.
-    :param Session db: The database session object.
-
-    :return: The updated user with the new avatar URL.
-    :rtype: UserOut
+    Every change is a single ``UPDATE`` statement; the ones that need the new state of the
+    user read it back with ``RETURNING`` rather than loading the user first. The commit
+    of a change does not expire the loaded users, whose state the statement already
+    returned, so they can be serialised and cached without another ``SELECT``.
     """
-    user = await get_user_by_email(email, db)
-    user.avatar = url
-    db.commit()
-    return user
+    def __init__(self, db: Session):
+        self._db = db
+
+    def _commit(self) -> None:
+        expire, self._db.expire_on_commit = self._db.expire_on_commit, False
+        try:
+            self._db.commit()
+        finally:
+            self._db.expire_on_commit = expire
+
+    async def get_user_by_email(self, email: str) -> User | None:
+        """
+        Retrieves a user by their email address.
+
+        :param email: The email address of the user to retrieve.
+        :type email: str
+        :return: The user corresponding to the provided email, or None if not found.
+        :rtype: User | None
+        """
+        return self._db.query(User).filter(User.email == email).first()
+
+    async def create_user(self, body: UserIn) -> User:
+        """
+        Creates a new user.
+
+        :param body: The data for the new user.
+        :type body: UserIn
+        :return: The newly created user.
+        :rtype: User
+        """
+        avatar = None
+        try:
+            g = Gravatar(body.email)
+            avatar = g.get_image()
+        except Exception as e:
+            print(e)
+        new_user = User(**body.dict(), avatar=avatar)
+        self._db.add(new_user)
+        self._db.commit()
+        self._db.refresh(new_user)
+        return new_user
+
+    async def update_token(self, user: User, token: str | None) -> None:
+        """
+        Updates the refresh token for a user.
+
+        The user is updated by its ID, so it may be a user read from the cache, and is kept
+        in step with the row without being reloaded.
+
+        :param user: The user whose token is to be updated.
+        :type user: User
+        :param token: The new refresh token. Pass None to remove the token.
+        :type token: str | None
+        """
+        self._db.execute(update(User).where(User.id == user.id).values(refresh_token=token)
+                         .execution_options(synchronize_session=False))
+        self._commit()
+        set_committed_value(user, "refresh_token", token)
+
+    async def confirm_email(self, email: str) -> User | None:
+        """
+        Marks a user's email as confirmed.
+
+        :param email: The email address of the user to confirm.
+        :type email: str
+        :return: The confirmed user; a user of this session is updated in place. None if
+            there is no user with this email or it was already confirmed.
+        :rtype: User | None
+        """
+        user = self._db.scalars(update(User).where(User.email == email, User.confirmed.isnot(True))
+                                .values(confirmed=True).returning(User)).first()
+        self._commit()
+        return user
+
+    async def update_avatar(self, email: str, url: str) -> User | None:
+        """
+        Updates the avatar URL for a user.
+
+        :param email: The email address of the user to update.
+        :type email: str
+        :param url: The new URL of the avatar.
+        :type url: str
+        :return: The updated user with the new avatar URL, or None if not found.
+        :rtype: User | None
+        """
+        user = self._db.scalars(update(User).where(User.email == email).values(avatar=url).returning(User)).first()
+        self._commit()
+        return user
@@ -0,0 +1,38 @@
+import asyncio
+
+from fastapi import APIRouter, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from src.conf.config import settings
+from src.services.profiler import StackSampler, profiling_allowed
+
+router = APIRouter(prefix='/admin', tags=["admin"])
+
+_worker_profile = asyncio.Lock()
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile_worker(seconds: float = Query(10, gt=0),
+                         x_profile_token: str | None = Header(None)):
+    """
+    Sample every thread of this worker for a number of seconds and return the aggregated stacks.
+
+    The sampler runs every ``settings.profiling_worker_interval`` seconds, which keeps its
+    overhead low enough for production traffic. Only one session runs per worker at a time.
+
+    :param float seconds: How long to sample, at most ``settings.profiling_max_seconds``.
+    :param str x_profile_token: The token configured in ``settings.profiling_token``.
+
+    :return: The folded stacks, one ``frame;frame;... count`` line per stack.
+    :rtype: str
+
+    :raises HTTPException: 404 when profiling is disabled or the token is wrong, 409 when a session is running.
+    """
+    if not profiling_allowed(x_profile_token):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if _worker_profile.locked():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A profiling session is already running")
+    async with _worker_profile:
+        with StackSampler(settings.profiling_worker_interval) as sampler:
+            await asyncio.sleep(min(seconds, settings.profiling_max_seconds))
+    return PlainTextResponse(sampler.folded(), headers={"X-Profile-Samples": str(sampler.samples)})
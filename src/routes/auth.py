@@ -1,54 +1,80 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Request, status, Security
+import logging
+
+from fastapi import APIRouter, HTTPException, Depends, Request, status, Security
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
 
-from src.database.db import get_db
+from src.dependencies import get_users_repository
+from src.repository.abstract import AbstractUsersRepository
 from src.schemas.schemas import RequestEmail, UserIn, UserCreated, Token
-from src.repository import users as repository_users
 from src.services.auth import auth_service
-from src.services.email import send_email
+from src.services.idempotency import idempotent
+from src.services.jobs import job_queue
 
 router = APIRouter(prefix='/auth', tags=["auth"])
 security = HTTPBearer()
+logger = logging.getLogger(__name__)
+
+
+async def enqueue_verification_email(email: str, username: str, host: str) -> None:
+    """
+    Queue the verification email without failing the request.
+
+    The user row is already committed, so a broker outage must not turn the signup into
+    an error; the user can ask for the email again through ``/request_email``.
+
+    :param str email: The recipient's email address.
+    :param str username: The username associated with the email.
+    :param str host: The base URL of the application.
+    """
+    try:
+        await job_queue.enqueue("send_email", email, username, host)
+    except Exception:
+        logger.exception("queueing the verification email for %s failed", email)
 
 
 @router.post("/signup", response_model=UserCreated, status_code=status.HTTP_201_CREATED)
-async def signup(body: UserIn, background_tasks: BackgroundTasks, request: Request, db: Session = Depends(get_db)):
+@idempotent
+async def signup(body: UserIn, request: Request,
+                 repository_users: AbstractUsersRepository = Depends(get_users_repository)):
     """
     Endpoint for user signup.
 
+    The verification email is sent by the background job worker. Retries sent with the
+    same ``Idempotency-Key`` header replay the first response.
+
     :param UserIn body: The request body containing user data.
-    :param BackgroundTasks background_tasks: Background tasks to execute asynchronously.
     :param Request request: The request object.
-    :param Session db: The database session. Defaults to Depends(get_db).
+    :param AbstractUsersRepository repository_users: The users repository.
 
     :return: Details of the newly created user.
     :rtype: UserCreated
 
     :raises HTTPException: If an account with the provided email already exists.
     """
-    exist_user = await repository_users.get_user_by_email(body.email, db)
+    exist_user = await repository_users.get_user_by_email(body.email)
     if exist_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account already exists")
     body.password = auth_service.get_password_hash(body.password)
-    new_user = await repository_users.create_user(body, db)
-    background_tasks.add_task(send_email, new_user.email, new_user.username, request.base_url)
+    new_user = await repository_users.create_user(body)
+    await enqueue_verification_email(new_user.email, new_user.username, str(request.base_url))
     return {"user": new_user, "detail": "User successfully created"}
 
 
 @router.post("/login", response_model=Token)
-async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(body: OAuth2PasswordRequestForm = Depends(),
+                repository_users: AbstractUsersRepository = Depends(get_users_repository)):
     """
     Endpoint for user login.
 
     :param OAuth2PasswordRequestForm body: The request body containing login credentials. Defaults to Depends().
+    :param AbstractUsersRepository repository_users: The users repository.
 
     :return: JWT tokens for authentication.
     :rtype: Token
 
     :raises HTTPException: If the provided email or password is invalid.
     """
-    user = await repository_users.get_user_by_email(body.username, db)
+    user = await repository_users.get_user_by_email(body.username)
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
     if not user.confirmed:
@@ -57,17 +83,19 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depen
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
     access_token = await auth_service.create_access_token(data={"sub": user.email})
     refresh_token = await auth_service.create_refresh_token(data={"sub": user.email})
-    await repository_users.update_token(user, refresh_token, db)
+    await repository_users.update_token(user, refresh_token)
+    await auth_service.cache_user(user)
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
 @router.get('/refresh_token', response_model=Token)
-async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security), db: Session = Depends(get_db)):
+async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security),
+                        repository_users: AbstractUsersRepository = Depends(get_users_repository)):
     """
     Endpoint for refreshing access tokens.
 
     :param HTTPAuthorizationCredentials credentials: The HTTP authorization credentials. Defaults to Security(security).
-    :param Session db: The database session. Defaults to Depends(get_db).
+    :param AbstractUsersRepository repository_users: The users repository.
 
     :return: JWT tokens for authentication.
     :rtype: Token
@@ -76,24 +104,26 @@ async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(sec
     """
     token = credentials.credentials
     email = await auth_service.decode_refresh_token(token)
-    user = await repository_users.get_user_by_email(email, db)
+    user = await repository_users.get_user_by_email(email)
     if user.refresh_token != token:
-        await repository_users.update_token(user, None, db)
+        await repository_users.update_token(user, None)
+        await auth_service.cache_user(user)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
 
     access_token = await auth_service.create_access_token(data={"sub": email})
     refresh_token = await auth_service.create_refresh_token(data={"sub": email})
-    await repository_users.update_token(user, refresh_token, db)
+    await repository_users.update_token(user, refresh_token)
+    await auth_service.cache_user(user)
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
 @router.get('/confirmed_email/{token}')
-async def confirmed_email(token: str, db: Session = Depends(get_db)):
+async def confirmed_email(token: str, repository_users: AbstractUsersRepository = Depends(get_users_repository)):
     """
     Endpoint for confirming email addresses.
 
     :param str token: The confirmation token.
-    :param Session db: The database session. Defaults to Depends(get_db).
+    :param AbstractUsersRepository repository_users: The users repository.
 
     :return: A message confirming email confirmation.
     :rtype: dict
@@ -101,33 +131,33 @@ async def confirmed_email(token: str, db: Session = Depends(get_db)):
     :raises HTTPException: If the token is invalid.
     """
     email = await auth_service.get_email_from_token(token)
-    user = await repository_users.get_user_by_email(email, db)
+    user = await repository_users.confirm_email(email)
     if user is None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Verification error")
-    if user.confirmed:
+        # Nothing was updated: tell an unknown email from an already confirmed one.
+        if await repository_users.get_user_by_email(email) is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Verification error")
         return {"message": "Your email is already confirmed"}
-    await repository_users.confirm_email(email, db)
+    await auth_service.cache_user(user)
     return {"message": "Email confirmed"}
 
 
 @router.post('/request_email')
-async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, request: Request,
-                        db: Session = Depends(get_db)):
+async def request_email(body: RequestEmail, request: Request,
+                        repository_users: AbstractUsersRepository = Depends(get_users_repository)):
     """
     Endpoint for requesting email confirmation.
 
     :param RequestEmail body: The request body containing the email address.
-    :param BackgroundTasks background_tasks: Background tasks to execute asynchronously.
     :param Request request: The request object.
-    :param Session db: The database session. Defaults to Depends(get_db).
+    :param AbstractUsersRepository repository_users: The users repository.
 
     :return: A message confirming the email request.
     :rtype: dict
     """
-    user = await repository_users.get_user_by_email(body.email, db)
+    user = await repository_users.get_user_by_email(body.email)
 
     if user.confirmed:
         return {"message": "Your email is already confirmed"}
     if user:
-        background_tasks.add_task(send_email, user.email, user.username, request.base_url)
+        await enqueue_verification_email(user.email, user.username, str(request.base_url))
     return {"message": "Check your email for confirmation."}
\ No newline at end of file
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.orm import Session
+
+from src.conf.config import settings
+from src.database.db import get_db, sharing_session
+from src.database.models import User
+from src.schemas.schemas import BatchRequest, BatchResponse, BatchResult
+from src.services import batch
+from src.services.auth import auth_service
+
+router = APIRouter(prefix='/batch', tags=["batch"])
+
+
+@router.post("", response_model=BatchResponse)
+async def run_batch(body: BatchRequest, request: Request, db: Session = Depends(get_db),
+                    current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Run several read requests in one call.
+
+    The user is authenticated once and the requests run one after another on the database
+    session of the batch: its queries block the event loop, so running them concurrently
+    would only interleave them on one transaction. Each response carries the status and
+    body the request would have received on its own, so a failing request does not fail
+    the batch.
+
+    :param BatchRequest body: The requests, at most ``settings.batch_max_requests``.
+    :param Request request: The batch request, whose headers the requests inherit.
+    :param Session db: The database session shared by the requests.
+    :param User current_user: The current user.
+
+    :return: The responses, in the order of the requests.
+    :rtype: BatchResponse
+
+    :raises HTTPException: 422 if the batch has too many requests or repeats an ID.
+    """
+    if len(body.requests) > settings.batch_max_requests:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"A batch holds at most {settings.batch_max_requests} requests")
+    if len({item.id for item in body.requests}) != len(body.requests):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Request IDs must be unique")
+    with sharing_session(db), auth_service.authenticated_as(current_user):
+        responses = []
+        for item in body.requests:
+            code, result = await batch.call(request.scope, item.url)
+            responses.append(BatchResult(id=item.id, status=code, body=result))
+    return BatchResponse(responses=responses)
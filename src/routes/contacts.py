@@ -1,11 +1,18 @@
 from typing import List
 
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
 from fastapi_limiter.depends import RateLimiter
+from sqlalchemy.orm import Session
 
-from src.schemas.schemas import ContactIn, ContactOut, UserOut
+from src.schemas.fields import contact_list_adapter, parse_contact_fields
+from src.schemas.schemas import ContactIn, ContactMerge, ContactOut, ContactPage, ContactStats, ContactSuggestion, DuplicateCluster, UserOut
 from src.repository.abstract import AbstractContactsRepository
+from src.database.db import get_db
 from src.services.auth import auth_service
+from src.services.batch import batchable
+from src.services.events import contact_events
+from src.services.idempotency import idempotent
 
 from src.dependencies import get_contacts_repository
 
@@ -13,8 +20,44 @@ from src.dependencies import get_contacts_repository
 router = APIRouter(prefix='/contacts', tags=["contacts"])
 
 
-@router.get("/", response_model=List[ContactOut], description="No more than 10 requests per minute", dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def read_contacts(skip: int = 0, limit: int = 100,
+def _with_next(page: ContactPage, request: Request, skip: int) -> ContactPage:
+    """
+    Set the link to the following page when there are more contacts after this one.
+    """
+    end = skip + len(page.items)
+    if page.items and (end < page.total or not page.total_exact):
+        page.next = str(request.url.include_query_params(skip=end))
+    return page
+
+
+def contact_fields(fields: str | None = Query(None, description="Comma separated fields to return, e.g. "
+                                                                 "first_name,last_name; the id is always included")):
+    """
+    Dependency parsing the ``fields`` query parameter into the columns to select.
+
+    :raises HTTPException: 422 if a name is not a field of a contact.
+    """
+    try:
+        return parse_contact_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+
+
+def _projected(result, fields: tuple[str, ...] | None):
+    """
+    Serialise a list or page restricted to ``fields``, which the full response model would reject.
+    """
+    if fields is None or result is None:
+        return result
+    if isinstance(result, list):
+        return Response(contact_list_adapter(fields).dump_json(result), media_type="application/json")
+    return Response(result.model_dump_json(), media_type="application/json")
+
+
+@router.get("/", response_model=List[ContactOut] | ContactPage, description="No more than 10 requests per minute", dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+@batchable
+async def read_contacts(request: Request, skip: int = 0, limit: int = 100, envelope: bool = False,
+                        fields: tuple[str, ...] | None = Depends(contact_fields),
                         repository_contacts: AbstractContactsRepository = Depends(get_contacts_repository),
                         current_user: UserOut = Depends(auth_service.get_current_user)):
     """
@@ -22,19 +65,132 @@ async def read_contacts(skip: int = 0, limit: int = 100,
 
     :param int skip: Number of contacts to skip. Defaults to 0.
     :param int limit: Maximum number of contacts to return. Defaults to 100.
+    :param bool envelope: Return a page with ``items``, ``total`` and ``next`` instead of a bare list.
+    :param tuple[str, ...] | None fields: Return only these fields; only their columns are read.
     :param AbstractContactsRepository repository_contacts: The contacts repository.
     :param UserOut current_user: The current user.
 
-    :return: A list of contacts.
-    :rtype: List[ContactOut]
+    :return: A list of contacts, or a page of contacts when ``envelope`` is set.
+    :rtype: List[ContactOut] | ContactPage
 
     :raises HTTPException: If there is an issue retrieving the contacts.
     """
-    contacts = await repository_contacts.get_contacts(skip, limit, current_user)
-    return contacts
+    if envelope:
+        page = await repository_contacts.get_contacts_page(skip, limit, current_user, fields)
+        return _projected(_with_next(page, request, skip), fields)
+    contacts = await repository_contacts.get_contacts(skip, limit, current_user, fields)
+    return _projected(contacts, fields)
+
+
+@router.get("/stats", response_model=ContactStats)
+@batchable
+async def read_contact_stats(
+                        repository_contacts: AbstractContactsRepository = Depends(get_contacts_repository),
+                        current_user: UserOut = Depends(auth_service.get_current_user)):
+    """
+    Retrieve contact statistics for the current user.
+
+    The numbers come from counters maintained by every contact write, so the cost does not
+    grow with the number of contacts.
+
+    :param AbstractContactsRepository repository_contacts: The contacts repository.
+    :param UserOut current_user: The current user.
+
+    :return: The total number of contacts, the counts per birth month and the number of upcoming birthdays.
+    :rtype: ContactStats
+    """
+    return await repository_contacts.get_contact_stats(current_user)
+
+
+@router.get("/autocomplete", response_model=List[ContactSuggestion])
+@batchable
+async def autocomplete_contacts(prefix: str = Query(min_length=1), limit: int = Query(10, ge=1, le=100),
+                        repository_contacts: AbstractContactsRepository = Depends(get_contacts_repository),
+                        current_user: UserOut = Depends(auth_service.get_current_user)):
+    """
+    Suggest contacts whose first, last or full name starts with a prefix, for type-ahead.
+
+    :param str prefix: The typed prefix; case and accents are ignored.
+    :param int limit: Maximum number of suggestions. Defaults to 10.
+    :param AbstractContactsRepository repository_contacts: The contacts repository.
+    :param UserOut current_user: The current user.
+
+    :return: The suggestions.
+    :rtype: List[ContactSuggestion]
+    """
+    return await repository_contacts.autocomplete(prefix, limit, current_user)
+
+
+@router.get("/duplicates", response_model=List[DuplicateCluster])
+@batchable
+async def read_duplicates(
+                        repository_contacts: AbstractContactsRepository = Depends(get_contacts_repository),
+                        current_user: UserOut = Depends(auth_service.get_current_user)):
+    """
+    Retrieve groups of contacts that look like the same person.
+
+    Contacts are grouped when they share a normalised email, an E.164 phone number or a
+    phonetic name key.
+
+    :param AbstractContactsRepository repository_contacts: The contacts repository.
+    :param UserOut current_user: The current user.
+
+    :return: The candidate duplicate clusters.
+    :rtype: List[DuplicateCluster]
+    """
+    return await repository_contacts.get_duplicates(current_user)
+
+
+@router.post("/duplicates/merge", response_model=ContactOut)
+async def merge_duplicates(body: ContactMerge,
+                        repository_contacts: AbstractContactsRepository = Depends(get_contacts_repository),
+                        current_user: UserOut = Depends(auth_service.get_current_user)):
+    """
+    Merge duplicate contacts into one.
+
+    Empty fields of the kept contact are filled from the merged contacts, which are then deleted.
+
+    :param ContactMerge body: The contact to keep and the contacts merged into it.
+    :param AbstractContactsRepository repository_contacts: The contacts repository.
+    :param UserOut current_user: The current user.
+
+    :return: The kept contact.
+    :rtype: ContactOut
+
+    :raises HTTPException: If any of the contacts does not exist.
+    """
+    contact = await repository_contacts.merge_contacts(body.keep_id, body.merge_ids, current_user)
+    if contact is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="contact not found")
+    return contact
+
+
+@router.get("/stream", response_class=StreamingResponse)
+async def stream_contact_changes(current_user: UserOut = Depends(auth_service.get_current_user),
+                                 db: Session = Depends(get_db)):
+    """
+    Stream the changes of the current user's contacts as server-sent events.
+
+    Every create, update and delete, made through any worker, is sent as a ``created``,
+    ``updated`` or ``deleted`` event whose data is the contact, or only its ID for a delete.
+    A client that falls too far behind gets a ``resync`` event and the stream ends; it
+    should then reload its contacts before reconnecting.
+
+    :param UserOut current_user: The current user.
+    :param Session db: The database session of the authentication, released before streaming.
+
+    :return: The ``text/event-stream`` response.
+    :rtype: StreamingResponse
+    """
+    # The stream may stay open for hours; it must not keep a pooled connection.
+    db.close()
+    subscription = contact_events.subscribe(current_user.id)
+    return StreamingResponse(contact_events.stream(subscription), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 @router.get("/{contact_id}", response_model=ContactOut)
+@batchable
 async def read_contact(contact_id: int,
                         repository_contacts: AbstractContactsRepository = Depends(get_contacts_repository),
                         current_user: UserOut = Depends(auth_service.get_current_user)):
@@ -57,12 +213,15 @@ async def read_contact(contact_id: int,
 
 
 @router.post("/", response_model=ContactOut)
+@idempotent
 async def create_contact(body: ContactIn,
                         repository_contacts: AbstractContactsRepository = Depends(get_contacts_repository),
                         current_user: UserOut = Depends(auth_service.get_current_user)):
     """
     Create a new contact.
 
+    Retries sent with the same ``Idempotency-Key`` header replay the first response.
+
     :param ContactIn body: The contact data.
     :param AbstractContactsRepository repository_contacts: The contacts repository.
     :param UserOut current_user: The current user.
@@ -76,12 +235,15 @@ async def create_contact(body: ContactIn,
 
 
 @router.put("/{contact_id}", response_model=ContactOut)
+@idempotent
 async def update_contact(body: ContactIn, contact_id: int,
                         repository_contacts: AbstractContactsRepository = Depends(get_contacts_repository),
                         current_user: UserOut = Depends(auth_service.get_current_user)):
     """
     Update an existing contact.
 
+    Retries sent with the same ``Idempotency-Key`` header replay the first response.
+
     :param ContactIn body: The updated contact data.
     :param int contact_id: The ID of the contact to update.
     :param AbstractContactsRepository repository_contacts: The contacts repository.
@@ -120,8 +282,10 @@ async def remove_contact(contact_id: int,
     return contact
 
 
-@router.get("/search/", response_model=List[ContactOut])
-async def search_contacts(query: str, skip: int = 0, limit: int = 100,
+@router.get("/search/", response_model=List[ContactOut] | ContactPage)
+@batchable
+async def search_contacts(request: Request, query: str, skip: int = 0, limit: int = 100, envelope: bool = False,
+                        fields: tuple[str, ...] | None = Depends(contact_fields),
                         repository_contacts: AbstractContactsRepository = Depends(get_contacts_repository),
                         current_user: UserOut = Depends(auth_service.get_current_user)):
     """
@@ -130,17 +294,44 @@ async def search_contacts(query: str, skip: int = 0, limit: int = 100,
     :param str query: The search query.
     :param int skip: Number of contacts to skip. Defaults to 0.
     :param int limit: Maximum number of contacts to return. Defaults to 100.
+    :param bool envelope: Return a page with ``items``, ``total`` and ``next`` instead of a bare list.
+    :param tuple[str, ...] | None fields: Return only these fields; only their columns are read.
+    :param AbstractContactsRepository repository_contacts: The contacts repository.
+    :param UserOut current_user: The current user.
+
+    :return: A list of contacts matching the query, or a page of them when ``envelope`` is set.
+    :rtype: List[ContactOut] | ContactPage
+    """
+    if envelope:
+        page = await repository_contacts.get_contacts_by_query_page(query, skip, limit, current_user, fields)
+        return _projected(_with_next(page, request, skip), fields)
+    contacts = await repository_contacts.get_contacts_by_query(query, skip, limit, current_user, fields)
+    return _projected(contacts, fields)
+
+
+@router.get("/by-phone/{number}", response_model=List[ContactOut])
+@batchable
+async def read_contacts_by_phone(number: str,
+                        repository_contacts: AbstractContactsRepository = Depends(get_contacts_repository),
+                        current_user: UserOut = Depends(auth_service.get_current_user)):
+    """
+    Retrieve the contacts with a phone number, ignoring its formatting.
+
+    Numbers without a country code get the default one, so ``600100200`` and
+    ``+48 600-100-200`` find the same contacts.
+
+    :param str number: The phone number to look up.
     :param AbstractContactsRepository repository_contacts: The contacts repository.
     :param UserOut current_user: The current user.
 
-    :return: A list of contacts matching the query.
+    :return: The contacts with that number.
     :rtype: List[ContactOut]
     """
-    contacts = await repository_contacts.get_contacts_by_query(query, skip, limit, current_user)
-    return contacts
+    return await repository_contacts.get_contacts_by_phone(number, current_user)
 
 
 @router.get("/upcoming-birthdays/", response_model=List[ContactOut])
+@batchable
 async def get_contacts_upcoming_birthdays(
                         repository_contacts: AbstractContactsRepository = Depends(get_contacts_repository),
                         current_user: UserOut = Depends(auth_service.get_current_user)):
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Response, status
+
+from src.services.resources import resources
+
+router = APIRouter(prefix='/health', tags=["health"])
+
+
+@router.get("/live")
+async def liveness():
+    """
+    Liveness probe: the worker process is running and its event loop responds.
+
+    :return: The liveness status and the number of in-flight requests.
+    :rtype: dict
+    """
+    return resources.liveness()
+
+
+@router.get("/ready")
+async def readiness(response: Response):
+    """
+    Readiness probe: the worker is not draining and its database and Redis pools respond.
+
+    :param Response response: The response, whose status is set to 503 when not ready.
+
+    :return: The result of every health check.
+    :rtype: dict
+    """
+    ready, details = await resources.readiness()
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return details
@@ -0,0 +1,68 @@
+from functools import lru_cache
+
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+
+from src.schemas.schemas import ContactOut, ContactPage
+
+CONTACT_FIELDS = tuple(ContactOut.model_fields)
+
+
+def parse_contact_fields(value: str | None) -> tuple[str, ...] | None:
+    """
+    Parse the ``fields`` query parameter of the contact endpoints.
+
+    The ID is always included, and the fields are returned in the order of
+    :class:`ContactOut`, so that the same set always gives the same tuple.
+
+    :param value: Comma separated field names, e.g. ``first_name,last_name``.
+    :type value: str | None
+    :return: The fields to return, or None for every field.
+    :rtype: tuple[str, ...] | None
+    :raises ValueError: If a name is not a field of :class:`ContactOut`.
+    """
+    if value is None or not value.strip():
+        return None
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = requested.difference(CONTACT_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}; choose from {', '.join(CONTACT_FIELDS)}")
+    requested.add("id")
+    if len(requested) == len(CONTACT_FIELDS):
+        return None
+    return tuple(name for name in CONTACT_FIELDS if name in requested)
+
+
+@lru_cache
+def contact_model(fields: tuple[str, ...]) -> type[BaseModel]:
+    """
+    Build the response model of a contact restricted to some fields.
+
+    :param fields: Fields as returned by :func:`parse_contact_fields`.
+    :type fields: tuple[str, ...]
+    :return: A model with those fields of :class:`ContactOut`, built once per set of fields.
+    :rtype: type[BaseModel]
+    """
+    return create_model(f"ContactOut_{'_'.join(fields)}", __config__=ConfigDict(from_attributes=True),
+                        **{name: (ContactOut.model_fields[name].annotation, ...) for name in fields})
+
+
+@lru_cache
+def contact_page_model(fields: tuple[str, ...]) -> type[BaseModel]:
+    """
+    Build the page model whose items are restricted to some fields.
+
+    :param fields: Fields as returned by :func:`parse_contact_fields`.
+    :type fields: tuple[str, ...]
+    :return: :class:`ContactPage` with items of :func:`contact_model`.
+    :rtype: type[BaseModel]
+    """
+    return create_model(f"ContactPage_{'_'.join(fields)}", __base__=ContactPage,
+                        items=(list[contact_model(fields)], ...))
+
+
+@lru_cache
+def contact_list_adapter(fields: tuple[str, ...]) -> TypeAdapter:
+    """
+    Return the adapter validating and serialising lists of :func:`contact_model`.
+    """
+    return TypeAdapter(list[contact_model(fields)])
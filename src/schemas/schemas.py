@@ -1,4 +1,6 @@
 from datetime import date
+from typing import Any, Literal
+
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
 
@@ -10,7 +12,7 @@ class ContactIn(BaseModel):
     first_name: str = Field(max_length=50)
     last_name: str = Field(max_length=50)
     email: str
-    phone_number: str = Field(max_length=15)
+    phone_number: str = Field(max_length=32)
     date_of_birth: date
 
 
@@ -25,6 +27,83 @@ class ContactOut(ContactIn):
         orm_mode = True
 
 
+class ContactSuggestion(BaseModel):
+    """
+    Schema for an autocomplete suggestion.
+    """
+    id: int
+    first_name: str | None
+    last_name: str | None
+
+
+class ContactStats(BaseModel):
+    """
+    Schema for per-user contact statistics.
+    """
+    total: int
+    birthdays_by_month: dict[int, int]
+    upcoming_birthdays: int
+    upcoming_days: int = 7
+
+
+class ContactPage(BaseModel):
+    """
+    Schema for one page of contacts with pagination metadata.
+    """
+    items: list[ContactOut]
+    total: int
+    total_exact: bool = True
+    next: str | None = None
+
+
+class DuplicateCluster(BaseModel):
+    """
+    Schema for a group of contacts that look like the same person.
+    """
+    contacts: list[ContactOut]
+    matched_on: list[str]
+
+
+class ContactMerge(BaseModel):
+    """
+    Schema for merging duplicate contacts into one.
+    """
+    keep_id: int
+    merge_ids: list[int] = Field(min_length=1)
+
+
+class BatchItem(BaseModel):
+    """
+    Schema for one read request of a batch.
+    """
+    id: str = Field(min_length=1, max_length=64)
+    method: Literal["GET"] = "GET"
+    url: str = Field(pattern=r"^/api/", description="Path and query string, e.g. /api/contacts/stats")
+
+
+class BatchRequest(BaseModel):
+    """
+    Schema for a batch of read requests.
+    """
+    requests: list[BatchItem] = Field(min_length=1)
+
+
+class BatchResult(BaseModel):
+    """
+    Schema for the response to one request of a batch.
+    """
+    id: str
+    status: int
+    body: Any
+
+
+class BatchResponse(BaseModel):
+    """
+    Schema for the responses to a batch, in the order of the requests.
+    """
+    responses: list[BatchResult]
+
+
 class UserIn(BaseModel):
     """
     Schema for incoming user data during creation.
@@ -0,0 +1,116 @@
+"""
+Production web server.
+
+Runs the application under uvicorn with one worker process per CPU, using uvloop and
+httptools when they are installed (``pip install uvloop httptools``). The database and
+Redis pools of every worker are sized so that all workers together stay within
+``postgres_max_connections`` and ``redis_max_clients``.
+
+Usage::
+
+    python -m src.serve
+    python -m src.serve --workers 8 --port 8080
+    python -m src.serve --print-plan
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+
+from src.conf.config import get_settings, settings
+
+logger = logging.getLogger(__name__)
+
+
+def cpu_count() -> int:
+    """
+    Return the number of CPUs this process may run on.
+
+    :return: The CPUs in the scheduler affinity mask where supported, otherwise all CPUs.
+    :rtype: int
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def plan(workers: int | None = None) -> dict:
+    """
+    Work out the worker count, event loop, HTTP parser and per-worker pool sizes.
+
+    The connections left after ``db_reserved_connections`` are split evenly between the
+    workers; a worker keeps up to ``db_pool_size`` of its share open and may use the rest,
+    up to ``db_max_overflow``, under load. Redis clients are split the same way.
+
+    :param workers: Number of workers; defaults to ``settings.server_workers``, or one per CPU.
+    :type workers: int | None
+    :return: The plan, with the settings to export to the workers under ``environment``.
+    :rtype: dict
+    :raises ValueError: If the database cannot give every worker a connection.
+    """
+    workers = workers or settings.server_workers or cpu_count()
+    db_share = (settings.postgres_max_connections - settings.db_reserved_connections) // workers
+    if db_share < 1:
+        raise ValueError(f"{workers} workers need at least {workers + settings.db_reserved_connections} "
+                         f"database connections, postgres_max_connections is {settings.postgres_max_connections}")
+    pool_size = min(settings.db_pool_size, db_share)
+    max_overflow = min(settings.db_max_overflow, db_share - pool_size)
+    redis_connections = max(1, min(settings.redis_max_connections, settings.redis_max_clients // workers))
+    return {
+        "workers": workers,
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+        "environment": {
+            "DB_POOL_SIZE": str(pool_size),
+            "DB_MAX_OVERFLOW": str(max_overflow),
+            "DB_WARMUP_CONNECTIONS": str(min(settings.db_warmup_connections, pool_size)),
+            "REDIS_MAX_CONNECTIONS": str(redis_connections),
+            "REDIS_WARMUP_CONNECTIONS": str(min(settings.redis_warmup_connections, redis_connections)),
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the web server.")
+    parser.add_argument("--app", default="src.main:app", help="the ASGI application to serve")
+    parser.add_argument("--host", help="defaults to the server_host setting")
+    parser.add_argument("--port", type=int, help="defaults to the server_port setting")
+    parser.add_argument("--workers", type=int, help="defaults to the server_workers setting, or one per CPU")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--print-plan", action="store_true", help="print the worker and pool sizes and exit")
+    args = parser.parse_args(argv)
+
+    try:
+        server_plan = plan(args.workers)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.print_plan:
+        print(json.dumps(server_plan, indent=2))
+        return
+
+    import uvicorn
+
+    # Spawned workers read their pool sizes from the environment; a single worker runs in this
+    # process, so the cached settings are dropped as well.
+    os.environ.update(server_plan["environment"])
+    get_settings.cache_clear()
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    logger.info("starting %s workers with %s and %s", server_plan["workers"], server_plan["loop"],
+                server_plan["http"])
+    uvicorn.run(
+        args.app,
+        host=args.host or settings.server_host,
+        port=args.port or settings.server_port,
+        workers=server_plan["workers"],
+        loop=server_plan["loop"],
+        http=server_plan["http"],
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.server_keep_alive,
+        timeout_graceful_shutdown=int(settings.shutdown_drain_timeout),
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
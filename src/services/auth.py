@@ -1,27 +1,97 @@
+import json
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import cached_property
 from typing import Optional
 
-import redis as redis
-import pickle
 from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 
 from src.database.db import get_db
-from src.repository import users as repository_users
+from src.database.models import User
+from src.repository.users import UsersRepository
 from src.conf.config import settings
+from src.services.singleflight import singleflight
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_TTL = 900
+
+_authenticated: ContextVar[User | None] = ContextVar("authenticated_user", default=None)
+
+
+def dump_user(user: User) -> str:
+    """
+    Serialise the columns of a user to JSON for the user cache.
+    """
+    data = {attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs}
+    if data["created_at"] is not None:
+        data["created_at"] = data["created_at"].isoformat()
+    return json.dumps(data)
+
+
+def load_user(value: str) -> User:
+    """
+    Rebuild a detached user from the JSON written by :func:`dump_user`.
+    """
+    data = json.loads(value)
+    if data["created_at"] is not None:
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+    return User(**data)
+
 
 class Auth:
     """
     Authentication service class responsible for handling user authentication and token generation.
+
+    Users are cached in Redis for ``USER_CACHE_TTL`` seconds once :meth:`bind` gave the service
+    the shared client; without it, or when Redis fails, every request loads the user from the
+    database. Every cache operation is a single round-trip: a hit is one ``GET``, a miss adds
+    one ``SET ... EX``, and :meth:`warm_users` pipelines the writes for many users. Concurrent
+    requests of one user in a worker share a single lookup.
     """
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    SECRET_KEY = settings.secret_key
-    ALGORITHM = settings.algorithm
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
-    r = redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0)
+
+    def __init__(self):
+        self.redis = None
+
+    def bind(self, redis) -> None:
+        """
+        Use the shared async Redis client as the user cache.
+
+        :param redis: The async Redis client, or None to disable the cache.
+        """
+        self.redis = redis
+
+    @cached_property
+    def pwd_context(self):
+        """
+        Password hashing context, created on first use so passlib and bcrypt are not loaded at import.
+
+        :return: The passlib context configured for bcrypt.
+        :rtype: CryptContext
+        """
+        from passlib.context import CryptContext
+
+        return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+    @property
+    def SECRET_KEY(self):
+        """
+        The secret key used to sign tokens, read from the settings on access.
+        """
+        return settings.secret_key
+
+    @property
+    def ALGORITHM(self):
+        """
+        The JWT signing algorithm, read from the settings on access.
+        """
+        return settings.algorithm
 
     def verify_password(self, plain_password, hashed_password):
         """
@@ -105,6 +175,39 @@ class Auth:
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
 
+    def access_token_subject(self, token: str) -> str | None:
+        """
+        Return the email an access token was issued for.
+
+        :param token: The access token.
+        :type token: str
+        :return: The email, or None when the token is invalid, expired or not an access token.
+        :rtype: str | None
+        """
+        try:
+            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+        except JWTError:
+            return None
+        if payload.get('scope') != 'access_token':
+            return None
+        return payload.get("sub")
+
+    @contextmanager
+    def authenticated_as(self, user: User):
+        """
+        Make :meth:`get_current_user` return ``user`` inside the block without checking the token again.
+
+        Used by the batch endpoint for its sub-requests, which carry the token it verified.
+
+        :param user: The user the enclosing request authenticated.
+        :type user: User
+        """
+        token = _authenticated.set(user)
+        try:
+            yield user
+        finally:
+            _authenticated.reset(token)
+
     async def get_current_user(self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
         """
         Retrieve the current authenticated user.
@@ -116,33 +219,86 @@ class Auth:
         :return: The current authenticated user.
         :rtype: User
         """
+        authenticated = _authenticated.get()
+        if authenticated is not None:
+            return authenticated
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-        try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            if payload['scope'] == 'access_token':
-                email = payload["sub"]
-                if email is None:
-                    raise credentials_exception
-            else:
-                raise credentials_exception
-        except JWTError as e:
+        email = self.access_token_subject(token)
+        if email is None:
             raise credentials_exception
-        user = self.r.get(f"user:{email}")
-        if user is None:
-            user = await repository_users.get_user_by_email(email, db)
+
+        async def load():
+            user = await self.get_cached_user(email)
             if user is None:
-                raise credentials_exception
-            await self.r.set(f"user:{email}", pickle.dumps(user))
-            await self.r.expire(f"user:{email}", 900)
-        else:
-            user = pickle.loads(user)
+                user = await UsersRepository(db).get_user_by_email(email)
+                if user is not None:
+                    await self.cache_user(user)
+            return user
+
+        # Requests that join the load get a detached copy, not the user of the first request's session.
+        user = await singleflight.do(f"user:{email}", load, lambda loaded: "" if loaded is None else dump_user(loaded),
+                                     lambda value: load_user(value) if value else None)
+        if user is None:
+            raise credentials_exception
         return user
 
+    async def get_cached_user(self, email: str) -> User | None:
+        """
+        Read a user from the cache.
+
+        :param email: The email of the user.
+        :type email: str
+        :return: The cached user, or None on a miss or when Redis is unavailable.
+        :rtype: User | None
+        """
+        if self.redis is None:
+            return None
+        try:
+            value = await self.redis.get(f"user:{email}")
+        except Exception as e:
+            logger.warning("reading the user cache failed: %s", e)
+            return None
+        return None if value is None else load_user(value)
+
+    async def cache_user(self, user: User) -> None:
+        """
+        Store a user in the cache, with the TTL set by the same command.
+
+        :param user: The user to store.
+        :type user: User
+        """
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(f"user:{user.email}", dump_user(user), ex=USER_CACHE_TTL)
+        except Exception as e:
+            logger.warning("writing the user cache failed: %s", e)
+
+    async def warm_users(self, users: list[User]) -> int:
+        """
+        Store many users in the cache in one pipelined round-trip.
+
+        :param users: The users to store.
+        :type users: list[User]
+        :return: The number of users stored; 0 when Redis is unavailable.
+        :rtype: int
+        """
+        if self.redis is None or not users:
+            return 0
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for user in users:
+                    pipe.set(f"user:{user.email}", dump_user(user), ex=USER_CACHE_TTL)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("warming the user cache failed: %s", e)
+            return 0
+        return len(users)
 
     def create_email_token(self, data: dict):
         """
@@ -0,0 +1,181 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Callable, Iterable
+
+from src.conf.config import settings
+from src.services.normalize import fold
+
+NameRow = tuple[int, str | None, str | None]
+
+
+def _terms(first_name: str | None, last_name: str | None) -> set[str]:
+    terms = {fold(first_name), fold(last_name), fold(f"{first_name or ''} {last_name or ''}")}
+    terms.discard("")
+    return terms
+
+
+class NameIndex:
+    """
+    Sorted prefix index over the names of one user's contacts.
+
+    Every contact is stored under its folded first name, last name and full name, so a
+    prefix lookup is a binary search followed by a scan of the matching range.
+    """
+    def __init__(self, rows: Iterable[NameRow]):
+        self.names = {}
+        self.entries = []
+        for contact_id, first_name, last_name in rows:
+            self.names[contact_id] = (first_name, last_name)
+            self.entries.extend((term, contact_id) for term in _terms(first_name, last_name))
+        self.entries.sort()
+        self.built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, contact_id: int, first_name: str | None, last_name: str | None) -> None:
+        """
+        Insert a contact, replacing its previous names.
+        """
+        self.remove(contact_id)
+        self.names[contact_id] = (first_name, last_name)
+        for term in _terms(first_name, last_name):
+            insort(self.entries, (term, contact_id))
+
+    def remove(self, contact_id: int) -> None:
+        """
+        Remove a contact if it is in the index.
+        """
+        names = self.names.pop(contact_id, None)
+        if names is None:
+            return
+        for term in _terms(*names):
+            position = bisect_left(self.entries, (term, contact_id))
+            if position < len(self.entries) and self.entries[position] == (term, contact_id):
+                del self.entries[position]
+
+    def search(self, prefix: str, limit: int) -> list[NameRow]:
+        """
+        Find contacts with a name starting with an already folded prefix.
+
+        :param prefix: The folded prefix.
+        :type prefix: str
+        :param limit: Maximum number of contacts to return.
+        :type limit: int
+        :return: The matching contacts as (id, first name, last name), ordered by the matched name.
+        :rtype: list[tuple[int, str | None, str | None]]
+        """
+        found = {}
+        position = bisect_left(self.entries, (prefix,))
+        while position < len(self.entries) and len(found) < limit:
+            term, contact_id = self.entries[position]
+            if not term.startswith(prefix):
+                break
+            found.setdefault(contact_id, None)
+            position += 1
+        return [(contact_id, *self.names[contact_id]) for contact_id in found]
+
+
+class AutocompleteIndex:
+    """
+    Per-user name indexes for prefix autocomplete, kept in the worker process.
+
+    A user's index is built from the database on the first lookup and then kept up to date
+    by the contact writes of this worker. Writes made by other workers are picked up when the
+    index expires after ``settings.autocomplete_ttl`` seconds. When the indexes together hold
+    more than ``settings.autocomplete_max_entries`` names, the least recently used users are
+    evicted and rebuilt on their next lookup.
+    """
+    def __init__(self, max_entries: int | None = None, ttl: float | None = None):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+
+    @property
+    def max_entries(self) -> int:
+        return settings.autocomplete_max_entries if self._max_entries is None else self._max_entries
+
+    @property
+    def ttl(self) -> float:
+        return settings.autocomplete_ttl if self._ttl is None else self._ttl
+
+    def search(self, user_id: int, prefix: str, limit: int, loader: Callable[[], Iterable[NameRow]]) -> list[NameRow]:
+        """
+        Find a user's contacts whose first, last or full name starts with a prefix.
+
+        :param user_id: The user whose contacts are searched.
+        :type user_id: int
+        :param prefix: The prefix as typed; case and accents are ignored.
+        :type prefix: str
+        :param limit: Maximum number of contacts to return.
+        :type limit: int
+        :param loader: Callable returning (id, first name, last name) of every contact of the
+            user, used when the index has to be built.
+        :type loader: Callable
+        :return: The matching contacts as (id, first name, last name).
+        :rtype: list[tuple[int, str | None, str | None]]
+        """
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None and time.monotonic() - index.built_at < self.ttl:
+                self._indexes.move_to_end(user_id)
+                return index.search(fold(prefix), limit)
+        index = NameIndex(loader())
+        with self._lock:
+            self._replace(user_id, index)
+            return index.search(fold(prefix), limit)
+
+    def _replace(self, user_id: int, index: NameIndex | None) -> None:
+        previous = self._indexes.pop(user_id, None)
+        if previous is not None:
+            self.size -= len(previous)
+        if index is not None:
+            self._indexes[user_id] = index
+            self.size += len(index)
+        while self.size > self.max_entries and len(self._indexes) > 1:
+            _, evicted = self._indexes.popitem(last=False)
+            self.size -= len(evicted)
+
+    def add(self, user_id: int, contact_id: int, first_name: str | None, last_name: str | None) -> None:
+        """
+        Record a created or updated contact, if the user's index is loaded.
+        """
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self.size -= len(index)
+                index.add(contact_id, first_name, last_name)
+                self.size += len(index)
+
+    def remove(self, user_id: int, contact_id: int) -> None:
+        """
+        Forget a deleted contact, if the user's index is loaded.
+        """
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self.size -= len(index)
+                index.remove(contact_id)
+                self.size += len(index)
+
+    def evict(self, user_id: int) -> None:
+        """
+        Drop a user's index; it is rebuilt on the next lookup.
+        """
+        with self._lock:
+            self._replace(user_id, None)
+
+    def clear(self) -> None:
+        """
+        Drop every index.
+        """
+        with self._lock:
+            self._indexes.clear()
+            self.size = 0
+
+
+autocomplete_index = AutocompleteIndex()
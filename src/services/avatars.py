@@ -0,0 +1,43 @@
+from functools import lru_cache
+
+from src.conf.config import settings
+
+
+@lru_cache
+def get_cloudinary():
+    """
+    Import and configure the cloudinary SDK on first use.
+
+    The SDK is only needed by the avatar upload route, so it is kept out of the
+    application import path.
+
+    :return: The configured cloudinary module.
+    :rtype: module
+    """
+    import cloudinary
+    import cloudinary.uploader
+
+    cloudinary.config(
+        cloud_name=settings.cloudinary_name,
+        api_key=settings.cloudinary_api_key,
+        api_secret=settings.cloudinary_api_secret,
+        secure=True
+    )
+    return cloudinary
+
+
+def upload_avatar(file, username: str) -> str:
+    """
+    Upload an avatar image to cloudinary and build its public URL.
+
+    :param file: The image file object to upload.
+    :type file: BinaryIO
+    :param username: The username used as the cloudinary public ID.
+    :type username: str
+    :return: The URL of the uploaded avatar cropped to 250x250.
+    :rtype: str
+    """
+    cloudinary = get_cloudinary()
+    r = cloudinary.uploader.upload(file, public_id=f'ContactsApp/{username}', overwrite=True)
+    return cloudinary.CloudinaryImage(f'ContactsApp/{username}')\
+                     .build_url(width=250, height=250, crop='fill', version=r.get('version'))
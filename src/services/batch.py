@@ -0,0 +1,88 @@
+import json
+import logging
+from urllib.parse import urlsplit
+
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+BATCHABLE_ENDPOINTS = set()
+
+# Parent scope entries a sub-request inherits; the exception handlers are installed by
+# Starlette's ExceptionMiddleware and turn an HTTPException of the endpoint into its response.
+INHERITED_SCOPE = ("asgi", "http_version", "scheme", "server", "client", "root_path", "app", "state",
+                   "starlette.exception_handlers")
+# Headers that describe the body of the batch, not of the sub-requests.
+DROPPED_HEADERS = {b"content-length", b"content-type", b"accept-encoding", b"idempotency-key"}
+
+
+def batchable(endpoint):
+    """
+    Mark a read endpoint as callable from ``POST /api/batch``.
+
+    Apply it below the router decorator; the endpoint itself is returned unchanged. Only
+    endpoints without side effects may be marked, as the sub-requests of a batch share
+    one database session.
+    """
+    BATCHABLE_ENDPOINTS.add(endpoint)
+    return endpoint
+
+
+async def call(parent_scope: dict, url: str) -> tuple[int, object]:
+    """
+    Run one ``GET`` sub-request of a batch through the routes of the application.
+
+    The sub-request goes straight to its route, skipping the middleware the batch already
+    went through, and carries the headers of the batch, so the authentication and the
+    database session set up for the batch apply to it.
+
+    :param parent_scope: The ASGI scope of the batch request.
+    :type parent_scope: dict
+    :param url: Path and query string of the sub-request.
+    :type url: str
+    :return: The status code and the body, decoded from JSON when the response is JSON.
+    :rtype: tuple[int, object]
+    """
+    parts = urlsplit(url)
+    root_path = parent_scope.get("root_path", "")
+    scope = {key: parent_scope[key] for key in INHERITED_SCOPE if key in parent_scope}
+    scope.update({
+        "type": "http",
+        "method": "GET",
+        "path": root_path + parts.path,
+        "raw_path": (root_path + parts.path).encode(),
+        "query_string": parts.query.encode(),
+        "headers": [(name, value) for name, value in parent_scope["headers"] if name not in DROPPED_HEADERS],
+    })
+
+    for route in scope["app"].router.routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            break
+    else:
+        return 404, {"detail": "Not Found"}
+    if getattr(route, "endpoint", None) not in BATCHABLE_ENDPOINTS:
+        return 400, {"detail": f"{parts.path} cannot be called in a batch"}
+    scope.update(child_scope)
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    response = {"status": 500, "body": b"", "json": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["json"] = any(name == b"content-type" and value.startswith(b"application/json")
+                                   for name, value in message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    try:
+        await route.handle(scope, receive, send)
+    except Exception:
+        logger.exception("batched request %s failed", parts.path)
+        return 500, {"detail": "Internal Server Error"}
+    if response["json"]:
+        return response["status"], json.loads(response["body"]) if response["body"] else None
+    return response["status"], response["body"].decode("utf-8", "replace")
@@ -1,29 +1,67 @@
+from functools import lru_cache
 from pathlib import Path
-import ssl
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
-from pydantic import BaseModel, EmailStr
+from pydantic import EmailStr
 
 from src.conf.config import settings
 from src.services.auth import auth_service
 
 
-context = ssl.create_default_context()
+@lru_cache
+def get_connection_config():
+    """
+    Build the fastapi-mail connection configuration on first use.
+
+    fastapi-mail is imported here rather than at module level so that importing the
+    application does not pay for it until an email is actually sent.
+
+    :return: The SMTP connection configuration.
+    :rtype: ConnectionConfig
+    """
+    from fastapi_mail import ConnectionConfig
+
+    return ConnectionConfig(
+        MAIL_USERNAME=settings.mail_username,
+        MAIL_PASSWORD=settings.mail_password,
+        MAIL_FROM=settings.mail_from,
+        MAIL_PORT=settings.mail_port,
+        MAIL_SERVER=settings.mail_server,
+        MAIL_FROM_NAME="Example email",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=True,
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=False,
+        TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
+    )
+
+async def deliver_email(email: EmailStr, username: str, host: str):
+    """
+    Send an email for email verification, raising when it cannot be delivered.
+
+    Used by the background job, so that a failed delivery is retried.
+
+    :param email: The recipient's email address.
+    :type email: EmailStr
+    :param username: The username associated with the email.
+    :type username: str
+    :param host: The base URL of the application.
+    :type host: str
+
+    :raises ConnectionErrors: If the SMTP server cannot be reached.
+    """
+    from fastapi_mail import FastMail, MessageSchema, MessageType
+
+    token_verification = auth_service.create_email_token({"sub": email})
+    message = MessageSchema(
+        subject="Confirm your email ",
+        recipients=[email],
+        template_body={"host": host, "username": username, "token": token_verification},
+        subtype=MessageType.html
+    )
+
+    fm = FastMail(get_connection_config())
+    await fm.send_message(message, template_name="email_template.html")
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.mail_username,
-    MAIL_PASSWORD=settings.mail_password,
-    MAIL_FROM=settings.mail_from,
-    MAIL_PORT=settings.mail_port,
-    MAIL_SERVER=settings.mail_server,
-    MAIL_FROM_NAME="Example email",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=False,
-    TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
-)
 
 async def send_email(email: EmailStr, username: str, host: str):
     """
@@ -36,16 +74,35 @@ async def send_email(email: EmailStr, username: str, host: str):
     :param host: The base URL of the application.
     :type host: str
     """
+    from fastapi_mail.errors import ConnectionErrors
+
     try:
-        token_verification = auth_service.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Confirm your email ",
-            recipients=[email],
-            template_body={"host": host, "username": username, "token": token_verification},
-            subtype=MessageType.html
-        )
-
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="email_template.html")
+        await deliver_email(email, username, host)
     except ConnectionErrors as err:
         print(err)
+
+
+async def send_birthday_reminder(email: EmailStr, username: str, contacts: list[dict]):
+    """
+    Send a reminder of the contacts with an upcoming birthday.
+
+    :param email: The recipient's email address.
+    :type email: EmailStr
+    :param username: The username associated with the email.
+    :type username: str
+    :param contacts: The contacts with an upcoming birthday.
+    :type contacts: list[dict]
+
+    :raises ConnectionErrors: If the SMTP server cannot be reached.
+    """
+    from fastapi_mail import FastMail, MessageSchema, MessageType
+
+    message = MessageSchema(
+        subject="Upcoming birthdays",
+        recipients=[email],
+        template_body={"username": username, "contacts": contacts},
+        subtype=MessageType.html
+    )
+
+    fm = FastMail(get_connection_config())
+    await fm.send_message(message, template_name="birthday_template.html")
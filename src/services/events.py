@@ -0,0 +1,217 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+
+from src.conf.config import settings
+from src.schemas.schemas import ContactOut
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "contact-events"
+
+
+class Subscription:
+    """
+    The bounded buffer of server-sent event frames waiting to be written to one client.
+
+    Attributes:
+        user_id (int): The user whose contact changes are delivered.
+        closed (str | None): Why the subscription ended: ``"overflow"`` when the client fell
+            ``settings.contact_stream_buffer`` events behind, ``"shutdown"`` when the worker
+            drains; None while it is open.
+    """
+    def __init__(self, user_id: int, size: int):
+        self.user_id = user_id
+        self.closed = None
+        self._queue = asyncio.Queue(size + 1)
+        self._size = size
+
+    def deliver(self, frame: bytes) -> None:
+        if self.closed is not None:
+            return
+        if self._queue.qsize() >= self._size:
+            self.close("overflow")
+            return
+        self._queue.put_nowait(frame)
+
+    def close(self, reason: str) -> None:
+        """
+        End the subscription after the buffered frames; on overflow they are dropped.
+        """
+        if self.closed is not None:
+            return
+        self.closed = reason
+        if reason == "overflow":
+            while not self._queue.empty():
+                self._queue.get_nowait()
+        # Marks the end for the reader; the extra slot of the queue keeps room for it.
+        self._queue.put_nowait(None)
+
+    async def get(self, timeout: float) -> bytes | None:
+        """
+        Wait for the next frame.
+
+        :param timeout: Seconds to wait before returning None, so that the caller can send a heartbeat.
+        :type timeout: float
+        :return: The frame, or None on timeout and at the end of a closed subscription.
+        :rtype: bytes | None
+        """
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ContactEventHub:
+    """
+    Fan-out of contact changes to the streams open in this worker.
+
+    The contact writes publish one message per change on the ``contact-events`` Redis channel.
+    Every worker that has a stream open listens on the channel with a single pub/sub
+    connection, started with the first stream, and turns each message into a server-sent
+    event frame once, then hands it to the subscriptions of the message's user. Without
+    Redis the changes are delivered to the streams of the publishing worker only.
+    """
+    def __init__(self):
+        self.redis = None
+        self._subscriptions = defaultdict(set)
+        self._listener = None
+        self._closing = False
+
+    def bind(self, redis) -> None:
+        """
+        Exchange the changes with the other workers through Redis pub/sub.
+
+        :param redis: The async Redis client, or None to deliver the changes in-process only.
+        """
+        self.redis = redis
+        self._closing = False
+
+    @property
+    def connections(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    async def publish(self, user_id: int, event: str, contact) -> None:
+        """
+        Announce a change of a contact to the streams of its user; failures are only logged.
+
+        :param user_id: The owner of the contact.
+        :type user_id: int
+        :param event: ``created``, ``updated`` or ``deleted``.
+        :type event: str
+        :param contact: The contact as stored; only its ID is sent for ``deleted``.
+        """
+        if self.redis is None and user_id not in self._subscriptions:
+            return
+        data = ({"id": contact.id} if event == "deleted"
+                else ContactOut.model_validate(contact, from_attributes=True).model_dump(mode="json"))
+        message = json.dumps({"user_id": user_id, "event": event, "data": data})
+        if self.redis is None:
+            self.dispatch(message)
+            return
+        try:
+            await self.redis.publish(CHANNEL, message)
+        except Exception as e:
+            logger.warning("publishing a contact %s event failed: %s", event, e)
+
+    def dispatch(self, message: str) -> None:
+        """
+        Deliver a message of the channel to the local subscriptions of its user.
+        """
+        payload = json.loads(message)
+        subscriptions = self._subscriptions.get(payload["user_id"])
+        if not subscriptions:
+            return
+        frame = f"event: {payload['event']}\ndata: {json.dumps(payload['data'])}\n\n".encode()
+        for subscription in list(subscriptions):
+            subscription.deliver(frame)
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """
+        Open a subscription to the contact changes of a user.
+
+        :param user_id: The user.
+        :type user_id: int
+        :return: The subscription; pass it to :meth:`unsubscribe` when the client is gone.
+        :rtype: Subscription
+        """
+        subscription = Subscription(user_id, settings.contact_stream_buffer)
+        if self._closing:
+            subscription.close("shutdown")
+            return subscription
+        self._subscriptions[user_id].add(subscription)
+        if self.redis is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+
+    def close_all(self) -> None:
+        """
+        End every stream of the worker when it starts draining; streams opened later end at once.
+        """
+        self._closing = True
+        for subscriptions in list(self._subscriptions.values()):
+            for subscription in list(subscriptions):
+                subscription.close("shutdown")
+
+    async def stop(self) -> None:
+        """
+        End every stream and stop listening on the channel.
+        """
+        self.close_all()
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(CHANNEL)
+                    while True:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message is not None:
+                            self.dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("listening for contact events failed, reconnecting")
+                await asyncio.sleep(1.0)
+
+    async def stream(self, subscription: Subscription):
+        """
+        Generate the server-sent event stream of a subscription.
+
+        Starts with the reconnection delay, sends a comment every
+        ``settings.contact_stream_heartbeat`` seconds without changes, and ends with a
+        ``resync`` event when the client fell behind, after which it should reload its
+        contacts. The subscription is closed when the generator is closed.
+
+        :param subscription: The subscription to stream.
+        :type subscription: Subscription
+        """
+        try:
+            yield f"retry: {settings.contact_stream_retry_ms}\n\n".encode()
+            while True:
+                frame = await subscription.get(settings.contact_stream_heartbeat)
+                if frame is None and subscription.closed is not None:
+                    if subscription.closed == "overflow":
+                        yield b"event: resync\ndata: {}\n\n"
+                    return
+                yield b": keepalive\n\n" if frame is None else frame
+        finally:
+            self.unsubscribe(subscription)
+
+
+contact_events = ContactEventHub()
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import logging
+
+from src.conf.config import settings
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_ENDPOINTS = set()
+
+
+def idempotent(endpoint):
+    """
+    Mark a route endpoint as honouring the ``Idempotency-Key`` header.
+
+    Apply it below the router decorator; the endpoint itself is returned unchanged and the
+    keys are handled by :class:`src.middleware.idempotency.IdempotencyMiddleware`.
+    """
+    IDEMPOTENT_ENDPOINTS.add(endpoint)
+    return endpoint
+
+
+class IdempotencyStore:
+    """
+    Redis records of the requests sent with an ``Idempotency-Key``.
+
+    The first request with a key stores a pending record holding the fingerprint of the
+    request, for at most ``settings.idempotency_lock_timeout`` seconds. Once it completed
+    the record is replaced by its response, which is kept for ``settings.idempotency_ttl``
+    seconds and replayed for every retry. A retry arriving while the first attempt runs
+    polls until the response is stored, and takes over when the first attempt gave up the
+    key without one.
+    """
+    def __init__(self):
+        self.redis = None
+
+    def bind(self, redis) -> None:
+        """
+        Use the shared async Redis client for the records.
+
+        :param redis: The async Redis client, or None to process every request as sent.
+        """
+        self.redis = redis
+
+    async def begin(self, key: str, fingerprint: str) -> dict | None:
+        """
+        Reserve a key for a request, waiting for an attempt that holds it already.
+
+        :param key: The Redis key of the idempotency key.
+        :type key: str
+        :param fingerprint: Identifies the method, path and body of the request.
+        :type fingerprint: str
+        :return: None when the caller reserved the key and must run the request; otherwise the
+            existing record, which has a ``status`` once its response was stored.
+        :rtype: dict | None
+        """
+        pending = json.dumps({"fingerprint": fingerprint})
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.idempotency_wait_timeout
+        while True:
+            if await self.redis.set(key, pending, nx=True, px=int(settings.idempotency_lock_timeout * 1000)):
+                return None
+            value = await self.redis.get(key)
+            if value is not None:
+                record = json.loads(value)
+                if record["fingerprint"] != fingerprint or "status" in record or loop.time() >= deadline:
+                    return record
+            await asyncio.sleep(settings.idempotency_poll_interval)
+
+    async def complete(self, key: str, fingerprint: str, status: int, headers: list, body: bytes) -> None:
+        """
+        Store the response of a reserved key for replay.
+
+        :param key: The Redis key of the idempotency key.
+        :param fingerprint: The fingerprint given to :meth:`begin`.
+        :param status: The status code of the response.
+        :param headers: The raw response headers.
+        :param body: The response body.
+        """
+        record = {
+            "fingerprint": fingerprint,
+            "status": status,
+            "headers": [[name.decode("latin-1"), value.decode("latin-1")] for name, value in headers],
+            "body": body.decode("latin-1"),
+        }
+        await self.redis.set(key, json.dumps(record), ex=settings.idempotency_ttl)
+
+    async def abandon(self, key: str) -> None:
+        """
+        Release a reserved key without a response, so that a retry runs the request again.
+        """
+        await self.redis.delete(key)
+
+
+idempotency_store = IdempotencyStore()
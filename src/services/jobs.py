@@ -0,0 +1,313 @@
+import asyncio
+import inspect
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Callable
+
+from redis.exceptions import WatchError
+from starlette.concurrency import run_in_threadpool
+
+from src.conf.config import settings
+
+logger = logging.getLogger(__name__)
+
+JOBS: dict[str, Callable] = {}
+
+
+def job(name: str | None = None):
+    """
+    Register a function as a job that workers can run.
+
+    The function may be sync, in which case the worker runs it in a thread, or async.
+    Its arguments must be JSON serialisable.
+
+    :param name: The name jobs are enqueued under; defaults to the function name.
+    :type name: str | None
+    """
+    def register(func):
+        JOBS[name or func.__name__] = func
+        return func
+    return register
+
+
+class JobQueue:
+    """
+    Redis-backed job queue.
+
+    Jobs are JSON documents in Redis lists under ``jobs:<queue>:``:
+
+    - ``ready``: jobs waiting for a worker
+    - ``processing:<worker>``: jobs taken by a worker and not finished yet
+    - ``delayed``: sorted set of jobs waiting for a retry, scored by due time
+    - ``dead``: jobs that failed more than ``max_retries`` times
+    - ``metrics``: hash of counters per job name
+    """
+    def __init__(self, name: str | None = None):
+        self._name = name
+        self.redis = None
+
+    @property
+    def name(self) -> str:
+        return settings.job_queue_name if self._name is None else self._name
+
+    def bind(self, redis) -> None:
+        """
+        Use a connected async Redis client as the broker.
+
+        :param redis: The async Redis client, created with ``decode_responses=True``.
+        """
+        self.redis = redis
+
+    def key(self, suffix: str) -> str:
+        return f"jobs:{self.name}:{suffix}"
+
+    async def enqueue(self, name: str, *args, delay: float = 0, max_retries: int | None = None, **kwargs) -> str:
+        """
+        Add a job to the queue.
+
+        :param name: The registered name of the job.
+        :type name: str
+        :param delay: Seconds to wait before the job may run.
+        :type delay: float
+        :param max_retries: Retries after a failure before the job is dead-lettered;
+            defaults to ``settings.job_max_retries``.
+        :type max_retries: int | None
+        :return: The ID of the job.
+        :rtype: str
+        """
+        if self.redis is None:
+            raise RuntimeError("job queue is not connected")
+        job_id = uuid.uuid4().hex
+        payload = json.dumps({
+            "id": job_id,
+            "name": name,
+            "args": list(args),
+            "kwargs": kwargs,
+            "attempts": 0,
+            "max_retries": settings.job_max_retries if max_retries is None else max_retries,
+            "enqueued_at": time.time(),
+        })
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if delay > 0:
+                pipe.zadd(self.key("delayed"), {payload: time.time() + delay})
+            else:
+                pipe.lpush(self.key("ready"), payload)
+            pipe.hincrby(self.key("metrics"), f"{name}:enqueued", 1)
+            await pipe.execute()
+        return job_id
+
+    async def metrics(self) -> dict:
+        """
+        Report the queue lengths and the counters per job name.
+
+        :return: The number of ready, delayed and dead jobs and the job counters.
+        :rtype: dict
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.llen(self.key("ready"))
+            pipe.zcard(self.key("delayed"))
+            pipe.llen(self.key("dead"))
+            pipe.hgetall(self.key("metrics"))
+            ready, delayed, dead, counters = await pipe.execute()
+        return {"ready": ready, "delayed": delayed, "dead": dead,
+                "counters": {name: float(value) if "." in value else int(value) for name, value in counters.items()}}
+
+    async def retry_dead(self) -> int:
+        """
+        Move every dead-lettered job back to the ready list with its attempts reset.
+
+        :return: The number of jobs moved.
+        :rtype: int
+        """
+        moved = 0
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    # The job leaves the dead list and enters the ready list in one
+                    # transaction, which is retried when a job is dead-lettered meanwhile.
+                    await pipe.watch(self.key("dead"))
+                    payload = await pipe.lindex(self.key("dead"), -1)
+                    if payload is None:
+                        return moved
+                    job = json.loads(payload)
+                    job["attempts"] = 0
+                    pipe.multi()
+                    pipe.rpop(self.key("dead"))
+                    pipe.lpush(self.key("ready"), json.dumps(job))
+                    await pipe.execute()
+                    moved += 1
+                except WatchError:
+                    continue
+
+
+class Worker:
+    """
+    Runs jobs from a :class:`JobQueue` with bounded concurrency.
+
+    Each of the ``concurrency`` consumers atomically moves a job from the ready list to
+    this worker's processing list, runs it and removes it. A failed job is scheduled
+    again with exponential backoff, and dead-lettered once its retries are used up.
+    Jobs left in the processing list of a worker that stopped sending heartbeats are
+    put back on the ready list, so a crash does not lose them.
+    """
+    def __init__(self, queue: JobQueue, concurrency: int | None = None, worker_id: str | None = None,
+                 poll_timeout: float = 1.0):
+        self.queue = queue
+        self.concurrency = settings.job_worker_concurrency if concurrency is None else concurrency
+        self.id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.poll_timeout = poll_timeout
+        self._stopping = asyncio.Event()
+
+    @property
+    def redis(self):
+        return self.queue.redis
+
+    @property
+    def processing_key(self) -> str:
+        return self.queue.key(f"processing:{self.id}")
+
+    def heartbeat_key(self, worker_id: str) -> str:
+        return self.queue.key(f"worker:{worker_id}")
+
+    def stop(self) -> None:
+        """
+        Stop taking new jobs; :meth:`run` returns once the running jobs finish.
+        """
+        self._stopping.set()
+
+    async def run(self) -> None:
+        """
+        Run jobs until :meth:`stop` is called.
+        """
+        await self.heartbeat()
+        await self.recover()
+        housekeeping = asyncio.create_task(self._housekeeping())
+        try:
+            await asyncio.gather(*(self._consume() for _ in range(self.concurrency)))
+        finally:
+            housekeeping.cancel()
+            await self.redis.delete(self.heartbeat_key(self.id))
+
+    async def _consume(self) -> None:
+        while not self._stopping.is_set():
+            started = time.monotonic()
+            payload = await self.redis.blmove(self.queue.key("ready"), self.processing_key, self.poll_timeout,
+                                              "RIGHT", "LEFT")
+            if payload is not None:
+                await self.process(payload)
+                continue
+            # Not every broker honours the timeout (fakeredis returns at once), so wait out the
+            # rest of it here; otherwise the loop never yields and stop() is never seen.
+            remaining = self.poll_timeout - (time.monotonic() - started)
+            if remaining > 0:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _housekeeping(self) -> None:
+        last_recovery = time.monotonic()
+        while True:
+            await asyncio.sleep(1)
+            try:
+                await self.heartbeat()
+                await self.promote()
+                if time.monotonic() - last_recovery > 30:
+                    await self.recover()
+                    last_recovery = time.monotonic()
+            except Exception:
+                logger.exception("job queue housekeeping failed")
+
+    async def heartbeat(self) -> None:
+        await self.redis.set(self.heartbeat_key(self.id), 1, ex=10)
+
+    async def process(self, payload: str) -> None:
+        """
+        Run one job taken from the ready list and record the outcome.
+
+        :param payload: The job as stored in Redis.
+        :type payload: str
+        """
+        job = json.loads(payload)
+        name = job["name"]
+        func = JOBS.get(name)
+        started = time.perf_counter()
+        try:
+            if func is None:
+                raise LookupError(f"unknown job {name!r}")
+            if inspect.iscoroutinefunction(func):
+                await func(*job["args"], **job["kwargs"])
+            else:
+                await run_in_threadpool(func, *job["args"], **job["kwargs"])
+        except Exception as e:
+            logger.exception("job %s %s failed", name, job["id"])
+            job["attempts"] += 1
+            job["error"] = repr(e)
+            retry = func is not None and job["attempts"] <= job["max_retries"]
+            async with self.redis.pipeline(transaction=True) as pipe:
+                if retry:
+                    due = time.time() + settings.job_retry_backoff * 2 ** (job["attempts"] - 1)
+                    pipe.zadd(self.queue.key("delayed"), {json.dumps(job): due})
+                    pipe.hincrby(self.queue.key("metrics"), f"{name}:retried", 1)
+                else:
+                    pipe.lpush(self.queue.key("dead"), json.dumps(job))
+                    pipe.hincrby(self.queue.key("metrics"), f"{name}:dead", 1)
+                pipe.hincrby(self.queue.key("metrics"), f"{name}:failed", 1)
+                pipe.lrem(self.processing_key, 1, payload)
+                await pipe.execute()
+            return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hincrby(self.queue.key("metrics"), f"{name}:succeeded", 1)
+            pipe.hincrbyfloat(self.queue.key("metrics"), f"{name}:seconds", time.perf_counter() - started)
+            pipe.lrem(self.processing_key, 1, payload)
+            await pipe.execute()
+
+    async def promote(self) -> int:
+        """
+        Move delayed jobs whose time has come to the ready list.
+
+        :return: The number of jobs moved.
+        :rtype: int
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    # The jobs leave the delayed set and enter the ready list in one
+                    # transaction, which is retried when another worker moves them first.
+                    await pipe.watch(self.queue.key("delayed"))
+                    due = await pipe.zrangebyscore(self.queue.key("delayed"), "-inf", time.time(), start=0, num=100)
+                    if not due:
+                        return 0
+                    pipe.multi()
+                    pipe.zrem(self.queue.key("delayed"), *due)
+                    pipe.lpush(self.queue.key("ready"), *due)
+                    await pipe.execute()
+                    return len(due)
+                except WatchError:
+                    continue
+
+    async def recover(self) -> int:
+        """
+        Put back on the ready list the jobs of workers that stopped sending heartbeats.
+
+        :return: The number of jobs recovered.
+        :rtype: int
+        """
+        recovered = 0
+        prefix = self.queue.key("processing:")
+        async for key in self.redis.scan_iter(match=f"{prefix}*"):
+            worker_id = key[len(prefix):]
+            if worker_id == self.id or await self.redis.exists(self.heartbeat_key(worker_id)):
+                continue
+            while await self.redis.lmove(key, self.queue.key("ready"), "RIGHT", "RIGHT") is not None:
+                recovered += 1
+        if recovered:
+            logger.warning("recovered %s jobs from stopped workers", recovered)
+        return recovered
+
+
+job_queue = JobQueue()
@@ -0,0 +1,138 @@
+import re
+import unicodedata
+
+from src.conf.config import settings
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+_TRANSLITERATE = str.maketrans({"ł": "l", "Ł": "L", "ø": "o", "Ø": "O", "ß": "ss", "đ": "d", "Đ": "D"})
+_EXTENSION = re.compile(r"\s*(?:ext\.?|x|#)\s*\d+\s*$", re.IGNORECASE)
+
+
+def fold(text: str | None) -> str:
+    """
+    Case- and accent-insensitive form of a text, e.g. ``Łukasz Żółw`` becomes ``lukasz zolw``.
+
+    :param str | None text: The text.
+
+    :return: The folded text with runs of whitespace collapsed.
+    :rtype: str
+    """
+    text = unicodedata.normalize("NFKD", (text or "").translate(_TRANSLITERATE))
+    return " ".join("".join(c for c in text if not unicodedata.combining(c)).casefold().split())
+
+
+def email_key(email: str | None) -> str | None:
+    """
+    Normalise an email address for comparison: surrounding whitespace removed, lower-cased.
+
+    :param str | None email: The email address.
+
+    :return: The normalised email, or None when it is empty.
+    :rtype: str | None
+    """
+    if not email or not email.strip():
+        return None
+    return email.strip().lower()
+
+
+def phone_key(phone: str | None, default_country_code: str | None = None) -> str | None:
+    """
+    Normalise a phone number to E.164 (``+`` followed by up to 15 digits).
+
+    Separators and a trailing extension are dropped. Numbers starting with ``+`` or ``00``
+    are taken as international; other numbers are national, lose a leading trunk ``0`` and
+    get the default country code.
+
+    :param str | None phone: The phone number as entered.
+    :param str | None default_country_code: Country calling code for national numbers;
+        defaults to ``settings.default_phone_country_code``.
+
+    :return: The E.164 number, or None when the input cannot be a valid number.
+    :rtype: str | None
+    """
+    if not phone:
+        return None
+    phone = _EXTENSION.sub("", phone.strip())
+    digits = re.sub(r"\D", "", phone)
+    if phone.startswith("+"):
+        number = digits
+    elif digits.startswith("00"):
+        number = digits[2:]
+    else:
+        if default_country_code is None:
+            default_country_code = settings.default_phone_country_code
+        number = default_country_code + (digits[1:] if digits.startswith("0") else digits)
+    if not 7 <= len(number) <= 15 or number.startswith("0"):
+        return None
+    return "+" + number
+
+
+def soundex(word: str) -> str:
+    """
+    American Soundex code of a word, e.g. ``Robert`` and ``Rupert`` both give ``R163``.
+
+    :param str word: The word to encode; accents are stripped first.
+
+    :return: The four-character code, or an empty string when the word has no letters.
+    :rtype: str
+    """
+    word = unicodedata.normalize("NFKD", word.translate(_TRANSLITERATE))
+    letters = [c for c in word.lower() if "a" <= c <= "z"]
+    if not letters:
+        return ""
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES.get(letters[0], "")
+    for letter in letters[1:]:
+        digit = _SOUNDEX_CODES.get(letter, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if letter not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def name_key(first_name: str | None, last_name: str | None) -> str | None:
+    """
+    Phonetic key of a full name, the Soundex codes of the last and first names.
+
+    Spelling variants such as "Jon Smith" and "John Smyth" share a key.
+
+    :param str | None first_name: The first name.
+    :param str | None last_name: The last name.
+
+    :return: The key, e.g. ``S530:J500``, or None when either name has no letters.
+    :rtype: str | None
+    """
+    first, last = soundex(first_name or ""), soundex(last_name or "")
+    if not first or not last:
+        return None
+    return f"{last}:{first}"
+
+
+def contact_keys(first_name: str | None, last_name: str | None, email: str | None,
+                 phone_number: str | None) -> dict:
+    """
+    Compute every blocking key stored on a contact.
+
+    :param str | None first_name: The first name.
+    :param str | None last_name: The last name.
+    :param str | None email: The email address.
+    :param str | None phone_number: The phone number.
+
+    :return: The ``email_key``, ``phone_key`` and ``name_key`` column values.
+    :rtype: dict
+    """
+    return {
+        "email_key": email_key(email),
+        "phone_key": phone_key(phone_number),
+        "name_key": name_key(first_name, last_name),
+    }
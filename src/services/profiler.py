@@ -0,0 +1,81 @@
+import hmac
+import sys
+import threading
+from collections import Counter
+
+from src.conf.config import settings
+
+
+class StackSampler:
+    """
+    Wall-clock sampling profiler for every thread of the process.
+
+    A background thread reads the stack of every other thread each ``interval`` seconds
+    with ``sys._current_frames()`` and counts identical stacks. Nothing is hooked into the
+    profiled code, so the cost is one stack walk per thread and sample, and none at all
+    while the sampler is stopped. :meth:`folded` returns the counts in the folded-stack
+    format read by ``flamegraph.pl``, speedscope and most flamegraph viewers.
+    """
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self.stacks[self._stack(names.get(ident, str(ident)), frame)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _stack(thread_name: str, frame) -> str:
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}")
+            frame = frame.f_back
+        frames.append(thread_name.replace(";", ","))
+        return ";".join(reversed(frames))
+
+    def folded(self) -> str:
+        """
+        Return the sampled stacks, root first, one ``frame;frame;... count`` line per stack.
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def profiling_allowed(token: str | None) -> bool:
+    """
+    Check a profiling token against ``settings.profiling_token``.
+
+    Profiling is disabled while the setting is empty.
+
+    :param token: The token sent by the client.
+    :type token: str | None
+    :return: Whether the client may profile this worker.
+    :rtype: bool
+    """
+    expected = settings.profiling_token
+    return bool(expected) and token is not None and hmac.compare_digest(token.encode(), expected.encode())
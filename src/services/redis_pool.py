@@ -0,0 +1,68 @@
+import logging
+
+from src.conf.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RedisPool:
+    """
+    The Redis connection pool of a process, shared by every Redis consumer.
+
+    A web worker opens it in the lifespan (see :class:`src.services.resources.ResourceManager`)
+    and binds the client to the rate limiter, the auth user cache, the job queue, the replica
+    pins and the birthday digests; the job worker opens its own in :mod:`src.worker`.
+
+    Connections come from a blocking pool capped at ``settings.redis_max_connections``: when
+    every connection is in use a caller waits up to ``settings.redis_pool_timeout`` seconds for
+    one instead of opening another socket. Commands have client-side connect and read timeouts,
+    and a connection idle for ``settings.redis_health_check_interval`` seconds is pinged before
+    it is reused.
+    """
+    def __init__(self):
+        self.client = None
+
+    def open(self, max_connections: int | None = None):
+        """
+        Create the pool and its client, unless they are already open.
+
+        :param max_connections: Cap of the pool; defaults to ``settings.redis_max_connections``.
+        :type max_connections: int | None
+        :return: The async Redis client, decoding responses to ``str``.
+        :rtype: redis.asyncio.Redis
+        """
+        if self.client is None:
+            import redis.asyncio as redis
+
+            pool = redis.BlockingConnectionPool(
+                host=settings.redis_host, port=settings.redis_port, db=0, encoding="utf-8", decode_responses=True,
+                max_connections=max_connections or settings.redis_max_connections,
+                timeout=settings.redis_pool_timeout,
+                socket_timeout=settings.redis_socket_timeout,
+                socket_connect_timeout=settings.redis_socket_connect_timeout,
+                health_check_interval=settings.redis_health_check_interval,
+            )
+            self.client = redis.Redis(connection_pool=pool)
+            logger.info("opened redis pool of %s connections", pool.max_connections)
+        return self.client
+
+    def pipeline(self, transaction: bool = False):
+        """
+        Start a pipeline on the shared client, sending its commands in one round-trip.
+
+        :param transaction: Wrap the commands in MULTI/EXEC.
+        :type transaction: bool
+        :return: The pipeline, to be used as an async context manager.
+        """
+        return self.client.pipeline(transaction=transaction)
+
+    async def close(self) -> None:
+        """
+        Close the client and disconnect every connection of the pool.
+        """
+        if self.client is not None:
+            client, self.client = self.client, None
+            await client.aclose(close_connection_pool=True)
+
+
+redis_pool = RedisPool()
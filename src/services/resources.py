@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import signal
+import time
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from src.conf.config import settings
+from src.database.db import get_engine
+from src.database.replicas import get_replicas
+from src.services.auth import auth_service
+from src.services.events import contact_events
+from src.services.idempotency import idempotency_store
+from src.services.jobs import job_queue
+from src.services.redis_pool import redis_pool
+from src.services.scheduler import birthday_digests
+from src.services.singleflight import singleflight
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceManager:
+    """
+    Owns the external connections of a worker for the lifetime of the application.
+
+    On startup it opens the shared Redis pool, hands its client to every Redis consumer and
+    pre-warms the database and Redis pools. While running it counts in-flight requests and
+    reports pool health for the readiness probe.
+
+    Shutdown starts at SIGTERM, not at the lifespan shutdown: uvicorn closes its listening
+    sockets and waits for running requests before it sends the lifespan event, which is too
+    late to tell the load balancer anything. On SIGTERM the worker reports ``draining``, ends
+    its contact streams so that clients reconnect elsewhere, and keeps serving for
+    ``settings.shutdown_grace_period`` seconds, then hands the signal to the server. The
+    lifespan shutdown only disposes the pools.
+    """
+    def __init__(self):
+        self.redis = None
+        self.ready = False
+        self.draining = False
+        self.stopping = False
+        self.in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._server_sigterm = None
+        self._stop_timer = None
+
+    async def startup(self) -> None:
+        """
+        Open the Redis pool, initialise the rate limiter and warm up the connection pools.
+        """
+        from fastapi_limiter import FastAPILimiter
+
+        self.redis = redis_pool.open()
+        await FastAPILimiter.init(self.redis)
+        auth_service.bind(self.redis)
+        job_queue.bind(self.redis)
+        singleflight.bind(self.redis)
+        idempotency_store.bind(self.redis)
+        contact_events.bind(self.redis)
+        get_replicas().bind(self.redis)
+        await self.warm_up(settings.db_warmup_connections, settings.redis_warmup_connections)
+        if settings.birthday_digest_enabled:
+            birthday_digests.start(self.redis)
+        self.draining = False
+        self.stopping = False
+        self.ready = True
+        self.handle_sigterm()
+
+    def handle_sigterm(self) -> None:
+        """
+        Install a SIGTERM handler that drains the worker before the server stops.
+
+        The handler installed by the server (uvicorn's) is called only after the grace period,
+        and at once on a second SIGTERM. Outside the main thread, where signal handlers cannot
+        be installed (e.g. under the test client), nothing is changed.
+        """
+        loop = asyncio.get_running_loop()
+
+        def handler(signum, frame):
+            loop.call_soon_threadsafe(self._on_sigterm)
+
+        try:
+            previous = signal.signal(signal.SIGTERM, handler)
+        except ValueError:
+            return
+        if self._server_sigterm is None:
+            self._server_sigterm = previous
+
+    def _on_sigterm(self) -> None:
+        if self.draining:
+            self._stop_server()
+            return
+        logger.info("SIGTERM received, draining for %s seconds", settings.shutdown_grace_period)
+        self.ready = False
+        self.draining = True
+        contact_events.close_all()
+        self._stop_timer = asyncio.get_running_loop().call_later(settings.shutdown_grace_period, self._stop_server)
+
+    def _stop_server(self) -> None:
+        if self._stop_timer is not None:
+            self._stop_timer.cancel()
+            self._stop_timer = None
+        self.stopping = True
+        handler = self._server_sigterm
+        if callable(handler):
+            handler(signal.SIGTERM, None)
+        elif handler != signal.SIG_IGN:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.raise_signal(signal.SIGTERM)
+
+    async def warm_up(self, db_connections: int, redis_connections: int) -> None:
+        """
+        Open database and Redis connections before the worker accepts traffic.
+
+        :param db_connections: Number of database connections to open, capped at the pool size.
+        :type db_connections: int
+        :param redis_connections: Number of Redis connections to open.
+        :type redis_connections: int
+        """
+        if db_connections > 0:
+            await run_in_threadpool(self._warm_database, db_connections)
+        if redis_connections > 0 and self.redis is not None:
+            await asyncio.gather(*(self.redis.ping() for _ in range(redis_connections)))
+        logger.info("warmed up %s database and %s redis connections", db_connections, redis_connections)
+
+    @staticmethod
+    def _warm_database(count: int) -> None:
+        engine = get_engine()
+        size = getattr(engine.pool, "size", None)
+        if callable(size):
+            count = min(count, size())
+        connections = [engine.connect() for _ in range(count)]
+        try:
+            for connection in connections:
+                connection.execute(text("SELECT 1"))
+        finally:
+            for connection in connections:
+                connection.close()
+
+    def request_started(self) -> None:
+        """
+        Record that a request entered the application.
+        """
+        self.in_flight += 1
+        self._idle.clear()
+
+    def request_finished(self) -> None:
+        """
+        Record that a request left the application.
+        """
+        self.in_flight -= 1
+        if self.in_flight <= 0:
+            self.in_flight = 0
+            self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """
+        Refuse new requests and wait for in-flight requests to finish.
+
+        :param timeout: Maximum number of seconds to wait.
+        :type timeout: float
+        :return: True if every request finished, False if the timeout expired first.
+        :rtype: bool
+        """
+        self.ready = False
+        self.draining = True
+        self.stopping = True
+        contact_events.close_all()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning("shutdown drain timed out with %s requests in flight", self.in_flight)
+            return False
+
+    async def shutdown(self) -> None:
+        """
+        Dispose the database engine and Redis clients.
+
+        Under uvicorn no request is running any more at this point, so the drain returns at
+        once; it only matters for servers that send the lifespan shutdown earlier.
+        """
+        await self.drain(settings.shutdown_drain_timeout)
+        if self._server_sigterm is not None:
+            try:
+                signal.signal(signal.SIGTERM, self._server_sigterm)
+            except ValueError:
+                pass
+            self._server_sigterm = None
+        await birthday_digests.stop()
+        await contact_events.stop()
+        if self.redis is not None:
+            auth_service.bind(None)
+            job_queue.bind(None)
+            singleflight.bind(None)
+            idempotency_store.bind(None)
+            contact_events.bind(None)
+            if get_replicas.cache_info().currsize:
+                get_replicas().bind(None)
+            await redis_pool.close()
+            self.redis = None
+        if get_engine.cache_info().currsize:
+            get_engine().dispose()
+        if get_replicas.cache_info().currsize:
+            get_replicas().dispose()
+
+    def liveness(self) -> dict:
+        """
+        Report that the worker process is alive.
+
+        :return: The liveness status.
+        :rtype: dict
+        """
+        return {"status": "alive", "in_flight": self.in_flight}
+
+    async def readiness(self) -> tuple[bool, dict]:
+        """
+        Check that the worker can serve traffic: it is not draining and both pools respond.
+
+        :return: Whether the worker is ready, and the details of every check.
+        :rtype: tuple[bool, dict]
+        """
+        database = await self._check_database()
+        redis = await self._check_redis()
+        ready = self.ready and not self.draining and database["ok"] and redis["ok"]
+        return ready, {
+            "status": "ready" if ready else "draining" if self.draining else "unavailable",
+            "in_flight": self.in_flight,
+            "database": database,
+            "redis": redis,
+        }
+
+    async def _check_database(self) -> dict:
+        def ping():
+            engine = get_engine()
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            return {"ok": True, "pool": engine.pool.status(), "replicas": get_replicas().status()}
+
+        try:
+            return await run_in_threadpool(ping)
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+
+    async def _check_redis(self) -> dict:
+        if self.redis is None:
+            return {"ok": False, "error": "not connected"}
+        try:
+            started = time.perf_counter()
+            await self.redis.ping()
+            # Only public attributes: the pool's connection lists are internal to redis-py.
+            return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+                    "pool": {"max": self.redis.connection_pool.max_connections}}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+
+
+resources = ResourceManager()
@@ -0,0 +1,225 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from datetime import date
+
+from starlette.concurrency import run_in_threadpool
+
+from src.conf.config import settings
+from src.database.db import SessionLocal, get_engine
+from src.database.models import Contact, User
+from src.repository.stats import upcoming_birthday_clause
+from src.schemas.schemas import ContactOut
+from src.services.jobs import job_queue
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = "birthday-digest:lock"
+DIGEST_KEY = "birthday-digest:{day}:{user_id}"
+BUILT_KEY = "birthday-digest:{day}:built"
+DIRTY_KEY = "birthday-digest:{day}:dirty"
+DIGEST_TTL = 2 * 24 * 3600
+
+# KEYS: the dirty hash, then one digest key per user; ARGV: the TTL, then the ID and the
+# digest of each user. Runs atomically, so a write marks its user either before the check,
+# and the digest is skipped, or after the SET, and discard deletes the stored digest.
+STORE_SCRIPT = """
+local stored = 0
+for i = 2, #KEYS do
+    if redis.call('HEXISTS', KEYS[1], ARGV[2 * i - 2]) == 0 then
+        redis.call('SET', KEYS[i], ARGV[2 * i - 1], 'EX', ARGV[1])
+        stored = stored + 1
+    end
+end
+return stored
+"""
+
+
+def compute_digests(db, today: date, days: int = 7) -> tuple[list[tuple], dict[int, list[dict]]]:
+    """
+    Computes the upcoming birthdays of every user with one query over all contacts.
+
+    :param Session db: The database session object.
+    :param date today: The first day of the range.
+    :param int days: Number of days after ``today`` to include.
+
+    :return: Every user as (id, email, username), and the serialised contacts with an
+        upcoming birthday per user ID.
+    :rtype: tuple[list[tuple], dict[int, list[dict]]]
+    """
+    users = db.query(User.id, User.email, User.username).all()
+    digests = defaultdict(list)
+    contacts = (db.query(Contact).filter(upcoming_birthday_clause(today, days))
+                .order_by(Contact.user_id, Contact.id).all())
+    for contact in contacts:
+        digests[contact.user_id].append(ContactOut.model_validate(contact, from_attributes=True).model_dump(mode="json"))
+    return users, dict(digests)
+
+
+class BirthdayDigestScheduler:
+    """
+    Background task that precomputes every user's upcoming birthdays once a day.
+
+    Every worker runs the task, but only the one holding the Redis lock builds the day's
+    digests; the others see the ``built`` marker and skip. The digests are stored in Redis,
+    one key per user, and read by the upcoming birthdays endpoint instead of querying the
+    database. A contact write discards the digest of its user, who then falls back to the
+    database until the next day; the user is also marked dirty, so that a build running
+    at that moment does not store the digest it computed before the write. When reminder
+    emails are enabled, the builder enqueues one reminder job per user with upcoming
+    birthdays.
+    """
+    def __init__(self):
+        self.redis = None
+        self._task = None
+
+    def start(self, redis) -> None:
+        """
+        Start the background task.
+
+        :param redis: The async Redis client used for the lock and the digests.
+        """
+        self.redis = redis
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Cancel the background task and wait for it to finish.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.redis = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once(date.today())
+            except Exception:
+                logger.exception("building birthday digests failed")
+            await asyncio.sleep(settings.birthday_digest_check_interval)
+
+    async def run_once(self, today: date) -> bool:
+        """
+        Build and store the digests for ``today`` unless they exist or another worker is building them.
+
+        :param today: The day the digests are for.
+        :type today: date
+        :return: Whether this worker built the digests.
+        :rtype: bool
+        """
+        built_key = BUILT_KEY.format(day=today.isoformat())
+        if await self.redis.exists(built_key):
+            return False
+        lock = self.redis.lock(LOCK_KEY, timeout=settings.birthday_digest_lock_timeout)
+        if not await lock.acquire(blocking=False):
+            return False
+        try:
+            if await self.redis.exists(built_key):
+                return False
+            # Writes from now on mark their user; the build does not store those digests.
+            await self.redis.delete(DIRTY_KEY.format(day=today.isoformat()))
+            users, digests = await run_in_threadpool(self._compute, today)
+            if not await self._store(today, users, digests, lock):
+                return False
+            logger.info("built birthday digests for %s users", len(users))
+        finally:
+            try:
+                await lock.release()
+            except Exception:
+                logger.warning("birthday digest lock expired before the digests were stored")
+        if settings.birthday_reminder_emails:
+            await self._send_reminders(users, digests)
+        return True
+
+    @staticmethod
+    def _compute(today: date):
+        with SessionLocal(bind=get_engine()) as db:
+            return compute_digests(db, today, settings.birthday_digest_days)
+
+    async def _store(self, today: date, users: list[tuple], digests: dict[int, list[dict]], lock) -> bool:
+        """
+        Store the digests in batches, skipping the users marked dirty since the build started.
+
+        The lock is extended before every batch, so it outlives a long build and no batch is
+        written once another worker may hold it; the ``built`` marker is only set after the
+        last batch.
+
+        :return: Whether every batch was stored; False when the lock was lost.
+        :rtype: bool
+        """
+        day = today.isoformat()
+        store = self.redis.register_script(STORE_SCRIPT)
+        batch_size = settings.birthday_digest_batch_size
+        for start in range(0, len(users), batch_size):
+            batch = [user_id for user_id, _, _ in users[start:start + batch_size]]
+            keys = [DIRTY_KEY.format(day=day)] + [DIGEST_KEY.format(day=day, user_id=user_id) for user_id in batch]
+            args = [DIGEST_TTL]
+            for user_id in batch:
+                args += [user_id, json.dumps(digests.get(user_id, []))]
+            if not await self._extend(lock):
+                return False
+            await store(keys=keys, args=args)
+        await self.redis.set(BUILT_KEY.format(day=day), 1, ex=DIGEST_TTL)
+        return True
+
+    @staticmethod
+    async def _extend(lock) -> bool:
+        try:
+            return await lock.extend(settings.birthday_digest_lock_timeout, replace_ttl=True)
+        except Exception:
+            return False
+
+    async def _send_reminders(self, users: list[tuple], digests: dict[int, list[dict]]) -> None:
+        for user_id, email, username in users:
+            if digests.get(user_id):
+                await job_queue.enqueue("send_birthday_reminder", email, username, digests[user_id])
+
+    async def read(self, user_id: int, today: date) -> list[dict] | None:
+        """
+        Read a user's precomputed upcoming birthdays.
+
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :param today: The day the digest was built for.
+        :type today: date
+        :return: The contacts, or None when there is no digest and the caller has to query the database.
+        :rtype: list[dict] | None
+        """
+        if self.redis is None:
+            return None
+        try:
+            value = await self.redis.get(DIGEST_KEY.format(day=today.isoformat(), user_id=user_id))
+        except Exception as e:
+            logger.warning("reading birthday digest failed: %s", e)
+            return None
+        return None if value is None else json.loads(value)
+
+    async def discard(self, user_id: int, today: date) -> None:
+        """
+        Drop a user's digest after their contacts changed, and keep a build in progress from storing it.
+
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :param today: The day of the digest to drop.
+        :type today: date
+        """
+        if self.redis is None:
+            return
+        day = today.isoformat()
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(DIRTY_KEY.format(day=day), str(user_id), 1)
+                pipe.expire(DIRTY_KEY.format(day=day), DIGEST_TTL)
+                pipe.delete(DIGEST_KEY.format(day=day, user_id=user_id))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("discarding birthday digest failed: %s", e)
+
+
+birthday_digests = BirthdayDigestScheduler()
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import uuid
+
+from src.conf.config import settings
+
+logger = logging.getLogger(__name__)
+
+# KEYS: the lock and the result key; ARGV: the token of the lock, the lifetime of the
+# result and the result, if any. The lock is deleted only while it still holds the token:
+# once it expired during a slow load, it may belong to another worker.
+RELEASE_SCRIPT = """
+if ARGV[3] then
+    redis.call('SET', KEYS[2], ARGV[3], 'PX', ARGV[2])
+end
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class _Call:
+    """
+    A load in progress and its result encoded once for the callers that joined it.
+    """
+    __slots__ = ("task", "encoded")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.encoded = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent reads into one call.
+
+    The first caller of :meth:`do` for a key runs the load in a task; callers arriving with
+    the same key while it runs await that task instead of querying again. The first caller
+    gets the result of the load, the others a copy decoded from its encoded form, so that
+    no ORM object of one request's session reaches another request; all of them get its
+    exception. Nothing is cached: the next call after the task finished loads again.
+
+    With ``settings.singleflight_shared`` enabled and a Redis client given by :meth:`bind`,
+    reads are also coalesced between workers. The worker that takes the short Redis lock
+    of the key runs the load and publishes the encoded result under the token of its lock;
+    the others poll for that result instead of querying, and load on their own once the
+    lock is released or expired without one.
+
+    Reads passed a ``scope`` are dropped by :meth:`forget` when the data of the scope
+    changes: a read that starts after a write never joins a load that started before it,
+    in this worker or, through a generation counter in Redis, in another one.
+
+    Attributes:
+        coalesced (int): Calls served by a load that another caller started.
+    """
+    def __init__(self):
+        self.redis = None
+        self.coalesced = 0
+        self._calls = {}
+        self._scopes = {}
+
+    def bind(self, redis) -> None:
+        """
+        Use the shared async Redis client to coalesce reads between workers.
+
+        :param redis: The async Redis client, or None to coalesce within this process only.
+        """
+        self.redis = redis
+
+    async def do(self, key: str, load, encode, decode, scope: str | None = None):
+        """
+        Run ``load`` once for all concurrent callers with the same key.
+
+        :param key: Identifies the read, including everything its result depends on.
+        :type key: str
+        :param load: Coroutine function without arguments that performs the read.
+        :param encode: Turns the result into a string for the other callers.
+        :param decode: Rebuilds a result from the string written by ``encode``.
+        :param scope: The data the read depends on, e.g. the contacts of a user; see :meth:`forget`.
+        :type scope: str | None
+        :return: The result of the load.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            if self.redis is not None and settings.singleflight_shared:
+                task = asyncio.ensure_future(self._shared(key, load, encode, decode, scope))
+            else:
+                task = asyncio.ensure_future(load())
+            call = self._calls[key] = _Call(task)
+            if scope is not None:
+                self._scopes.setdefault(scope, set()).add(key)
+            task.add_done_callback(lambda done: self._finished(key, scope, done))
+            # A cancelled caller must not cancel the load the others are waiting for.
+            return await asyncio.shield(task)
+        self.coalesced += 1
+        result = await asyncio.shield(call.task)
+        if call.encoded is None:
+            call.encoded = encode(result)
+        return decode(call.encoded)
+
+    async def forget(self, scope: str) -> None:
+        """
+        Stop coalescing with the loads of a scope in progress, after its data changed.
+
+        Callers already waiting still get the result of their load; the next caller starts
+        a new one. Call it after the write committed and before answering the request.
+
+        :param scope: The scope given to :meth:`do`.
+        :type scope: str
+        """
+        for key in self._scopes.pop(scope, ()):
+            self._calls.pop(key, None)
+        if self.redis is None or not settings.singleflight_shared:
+            return
+        generation_key = self._generation_key(scope)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.incr(generation_key)
+                # Outlives every lock and result of the previous generations.
+                pipe.pexpire(generation_key, settings.singleflight_lock_ms + settings.singleflight_result_ms)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("bumping the single-flight generation of %s failed: %s", scope, e)
+
+    def _finished(self, key: str, scope: str | None, task: asyncio.Future) -> None:
+        call = self._calls.get(key)
+        if call is None or call.task is not task:
+            return
+        del self._calls[key]
+        if scope is not None:
+            keys = self._scopes.get(scope)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._scopes[scope]
+
+    @staticmethod
+    def _generation_key(scope: str) -> str:
+        return f"singleflight-generation:{scope}"
+
+    async def _shared(self, key: str, load, encode, decode, scope: str | None):
+        lock_key = f"singleflight:{key}"
+        token = uuid.uuid4().hex
+        try:
+            if scope is not None:
+                lock_key = f"{lock_key}:{await self.redis.get(self._generation_key(scope)) or 0}"
+            leader = await self.redis.set(lock_key, token, nx=True, px=settings.singleflight_lock_ms)
+            if not leader:
+                found, value = await self._wait(lock_key)
+                if found:
+                    self.coalesced += 1
+                    return decode(value)
+        except Exception as e:
+            logger.warning("coalescing %s through Redis failed: %s", key, e)
+            return await load()
+        if not leader:
+            return await load()
+        try:
+            result = await load()
+        except BaseException:
+            await self._release(lock_key, token, None)
+            raise
+        await self._release(lock_key, token, encode(result))
+        return result
+
+    async def _wait(self, lock_key: str) -> tuple[bool, str | None]:
+        token = await self.redis.get(lock_key)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.singleflight_lock_ms / 1000
+        while token is not None and loop.time() < deadline:
+            await asyncio.sleep(settings.singleflight_poll_ms / 1000)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.get(f"{lock_key}:{token}")
+                pipe.get(lock_key)
+                value, holder = await pipe.execute()
+            if value is not None:
+                return True, value
+            if holder != token:
+                break
+        return False, None
+
+    async def _release(self, lock_key: str, token: str, value: str | None) -> None:
+        args = [token, settings.singleflight_result_ms] + ([] if value is None else [value])
+        try:
+            await self.redis.register_script(RELEASE_SCRIPT)(keys=[lock_key, f"{lock_key}:{token}"], args=args)
+        except Exception as e:
+            logger.warning("publishing the coalesced result of %s failed: %s", lock_key, e)
+
+
+singleflight = SingleFlight()
@@ -0,0 +1,43 @@
+"""
+Jobs run by the background worker (``python -m src.worker``).
+
+Importing this module registers them; the web process only needs their names to enqueue.
+"""
+from src.database.db import SessionLocal, get_engine
+from src.repository import dedupe, stats
+from src.services import email
+from src.services.jobs import job
+
+
+@job("send_email")
+async def send_email(email_address: str, username: str, host: str):
+    """
+    Send the email verification message; SMTP errors fail the job so that it is retried.
+    """
+    await email.deliver_email(email_address, username, host)
+
+
+@job("send_birthday_reminder")
+async def send_birthday_reminder(email_address: str, username: str, contacts: list[dict]):
+    """
+    Send the upcoming birthdays reminder; SMTP errors fail the job so that it is retried.
+    """
+    await email.send_birthday_reminder(email_address, username, contacts)
+
+
+@job("rebuild_stats")
+def rebuild_stats(user_id: int | None = None) -> int:
+    """
+    Recompute the contact counters of one user or of everyone.
+    """
+    with SessionLocal(bind=get_engine()) as db:
+        return stats.rebuild_stats(db, user_id)
+
+
+@job("backfill_contact_keys")
+def backfill_contact_keys(batch_size: int = 1000, missing_only: bool = False) -> int:
+    """
+    Recompute the duplicate-detection keys of existing contacts.
+    """
+    with SessionLocal(bind=get_engine()) as db:
+        return dedupe.backfill_contact_keys(db, batch_size, missing_only)
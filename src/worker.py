@@ -0,0 +1,64 @@
+"""
+Background job worker.
+
+Runs the jobs enqueued by the web workers through :data:`src.services.jobs.job_queue`.
+
+Usage::
+
+    python -m src.worker
+    python -m src.worker --concurrency 20 --queue default
+    python -m src.worker --metrics
+"""
+import argparse
+import asyncio
+import json
+import logging
+import signal
+
+from src.conf.config import settings
+from src.database.db import get_engine
+from src.services.jobs import JobQueue, Worker
+from src.services.redis_pool import redis_pool
+
+
+async def run(args) -> None:
+    import src.services.tasks  # noqa: F401 - registers the jobs
+
+    concurrency = args.concurrency or settings.job_worker_concurrency
+    # Every consumer holds a connection while it waits for a job; leave room for the heartbeat and recovery.
+    client = redis_pool.open(max(settings.redis_max_connections, concurrency + 2))
+    queue = JobQueue(args.queue)
+    queue.bind(client)
+    try:
+        if args.metrics:
+            print(json.dumps(await queue.metrics(), indent=2))
+            return
+        if args.retry_dead:
+            print(f"moved {await queue.retry_dead()} dead jobs back to the queue")
+            return
+        worker = Worker(queue, concurrency)
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, worker.stop)
+        logging.getLogger(__name__).info("worker %s consuming %s with concurrency %s", worker.id, queue.name,
+                                         worker.concurrency)
+        await worker.run()
+    finally:
+        await redis_pool.close()
+        if get_engine.cache_info().currsize:
+            get_engine().dispose()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run background jobs.")
+    parser.add_argument("--queue", help="queue name, defaults to the job_queue_name setting")
+    parser.add_argument("--concurrency", type=int, help="jobs run at the same time")
+    parser.add_argument("--metrics", action="store_true", help="print the queue metrics and exit")
+    parser.add_argument("--retry-dead", action="store_true", help="requeue dead-lettered jobs and exit")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 
+import os
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -7,12 +9,16 @@ from sqlalchemy.orm import sessionmaker
 from src.main import app
 from src.database.models import Base
 from src.database.db import get_db
+from src.database.querylog import instrument, track_queries
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 
-engine = create_engine(
+# Requests made by the tests fail on N+1 instead of logging it.
+os.environ.setdefault("QUERY_STRICT_MODE", "true")
+
+engine = instrument(create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+))
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 @pytest.fixture(scope="module")
@@ -42,6 +48,12 @@ def client(session):
 
     yield TestClient(app)
 
+@pytest.fixture(autouse=True)
+def strict_queries():
+    # Code a test runs outside a request fails on N+1 too.
+    with track_queries(strict=True) as stats:
+        yield stats
+
 @pytest.fixture(scope="module")
 def user():
     return {"username": "deadpool", "email": "deadpool@example.com", "password": "123456789"}
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from src.database.models import Base, Contact, User
+from src.database.replicas import ReplicaSet, RoutingSession
+from src.repository.contacts import ContactsRepository
+from src.schemas.schemas import ContactIn
+
+
+def make_database(path, marker):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id=1, username="replica", email="replica@example.com", password="x"))
+        session.add(Contact(id=1, first_name=marker, last_name="Test", email=f"{marker}@example.com",
+                            phone_number="1", date_of_birth=date(1990, 1, 1), user_id=1))
+        session.commit()
+    return engine
+
+
+@pytest.fixture
+def databases(tmp_path):
+    primary = make_database(tmp_path / "primary.db", "primary")
+    make_database(tmp_path / "replica1.db", "replica1")
+    make_database(tmp_path / "replica2.db", "replica2")
+    replicas = ReplicaSet([f"sqlite:///{tmp_path / 'replica1.db'}", f"sqlite:///{tmp_path / 'replica2.db'}"],
+                          health_check_interval=60, read_your_writes_window=60)
+    yield primary, replicas
+    primary.dispose()
+    replicas.dispose()
+
+
+def first_name(session, user):
+    contacts = asyncio.run(ContactsRepository(session).get_contacts(0, 10, user))
+    return next(contact.first_name for contact in contacts if contact.id == 1)
+
+
+def test_reads_are_round_robin_across_replicas(databases):
+    primary, replicas = databases
+    with RoutingSession(bind=primary, replicas=replicas) as session:
+        user = session.get(User, 1)
+        names = {first_name(session, user) for _ in range(4)}
+    assert names == {"replica1", "replica2"}
+
+
+def test_writes_go_to_primary_and_pin_reads(databases):
+    primary, replicas = databases
+    body = ContactIn(first_name="New", last_name="Contact", email="new@example.com", phone_number="2",
+                     date_of_birth=date(1990, 2, 2))
+    with RoutingSession(bind=primary, replicas=replicas) as session:
+        user = session.get(User, 1)
+        asyncio.run(ContactsRepository(session).create_contact(body, user))
+        assert first_name(session, user) == "primary"
+    with Session(primary) as session:
+        assert session.query(Contact).count() == 2
+    with RoutingSession(bind=primary, replicas=replicas) as session:
+        assert first_name(session, session.get(User, 1)) == "primary"
+
+
+def test_unhealthy_replica_is_skipped(databases, tmp_path):
+    primary, replicas = databases
+    broken = ReplicaSet([f"sqlite:///{tmp_path / 'missing' / 'replica.db'}",
+                         f"sqlite:///{tmp_path / 'replica2.db'}"], health_check_interval=60)
+    with RoutingSession(bind=primary, replicas=broken) as session:
+        user = session.get(User, 1)
+        names = {first_name(session, user) for _ in range(4)}
+    assert names == {"replica2"}
+    assert [r["healthy"] for r in broken.status()] == [False, True]
+    broken.dispose()
+
+
+def test_falls_back_to_primary_without_healthy_replicas(databases, tmp_path):
+    primary, _ = databases
+    broken = ReplicaSet([f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"], health_check_interval=60)
+    with RoutingSession(bind=primary, replicas=broken) as session:
+        assert first_name(session, session.get(User, 1)) == "primary"
+    broken.dispose()
+
+
+def test_pin_is_shared_through_redis(databases):
+    primary, replicas = databases
+    other = ReplicaSet([str(engine.url) for engine in replicas.engines], read_your_writes_window=60)
+    redis = AsyncMock()
+    redis.exists.return_value = 1
+    other.bind(redis)
+    with RoutingSession(bind=primary, replicas=other) as session:
+        assert first_name(session, session.get(User, 1)) == "primary"
+    redis.exists.assert_awaited_with(ReplicaSet.pin_key(1))
+    redis.exists.side_effect = ConnectionError("down")
+    with RoutingSession(bind=primary, replicas=other) as session:
+        assert first_name(session, session.get(User, 1)).startswith("replica")
+    other.dispose()
+
+
+def test_expired_health_check_does_not_block(databases):
+    primary, replicas = databases
+    replicas.health_check_interval = 0
+    engine = replicas.engines[0]
+    assert replicas.is_healthy(engine)
+    with patch.object(replicas, "check", side_effect=lambda e: time.sleep(0.2) or True) as check:
+        started = time.monotonic()
+        assert replicas.is_healthy(engine)
+        assert time.monotonic() - started < 0.1
+        for _ in range(50):
+            if check.called:
+                break
+            time.sleep(0.01)
+    check.assert_called_once_with(engine)
@@ -1,15 +1,16 @@
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock
 
 from src.database.models import User
 
 def test_create_user(client, user, monkeypatch):
-    mock_send_email = MagicMock()
-    monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
+    mock_enqueue = AsyncMock()
+    monkeypatch.setattr("src.routes.auth.job_queue.enqueue", mock_enqueue)
     response = client.post(
         "/api/auth/signup",
         json=user,
     )
     assert response.status_code == 201, response.text
+    assert mock_enqueue.await_args.args[:3] == ("send_email", user.get("email"), user.get("username"))
     data = response.json()
     assert data["user"]["email"] == user.get("email")
     assert "id" in data["user"]
@@ -23,6 +24,14 @@ def test_repeat_create_user(client, user):
     data = response.json()
     assert data["detail"] == "Account already exists"
 
+def test_create_user_without_job_queue(client):
+    response = client.post(
+        "/api/auth/signup",
+        json={"username": "wolverine", "email": "wolverine@example.com", "password": "123456789"},
+    )
+    assert response.status_code == 201, response.text
+    assert response.json()["user"]["email"] == "wolverine@example.com"
+
 def test_login_user_not_confirmed(client, user):
     response = client.post(
         "/api/auth/login",
@@ -0,0 +1,47 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.serve import plan
+
+
+@pytest.fixture
+def settings():
+    with patch("src.serve.settings") as settings:
+        settings.server_workers = 0
+        settings.postgres_max_connections = 100
+        settings.db_reserved_connections = 10
+        settings.db_pool_size = 5
+        settings.db_max_overflow = 10
+        settings.db_warmup_connections = 5
+        settings.redis_max_connections = 50
+        settings.redis_max_clients = 10000
+        settings.redis_warmup_connections = 5
+        yield settings
+
+
+def total_connections(server_plan):
+    environment = server_plan["environment"]
+    return server_plan["workers"] * (int(environment["DB_POOL_SIZE"]) + int(environment["DB_MAX_OVERFLOW"]))
+
+
+def test_pools_fit_within_postgres_max_connections(settings):
+    for workers in (1, 4, 16, 90):
+        server_plan = plan(workers)
+        assert server_plan["workers"] == workers
+        assert total_connections(server_plan) <= 90
+    assert plan(16)["environment"] == {"DB_POOL_SIZE": "5", "DB_MAX_OVERFLOW": "0", "DB_WARMUP_CONNECTIONS": "5",
+                                       "REDIS_MAX_CONNECTIONS": "50", "REDIS_WARMUP_CONNECTIONS": "5"}
+    assert plan(30)["environment"]["DB_POOL_SIZE"] == "3"
+
+
+def test_defaults_to_one_worker_per_cpu(settings):
+    with patch("src.serve.cpu_count", return_value=6):
+        assert plan()["workers"] == 6
+    settings.server_workers = 3
+    assert plan()["workers"] == 3
+
+
+def test_too_many_workers(settings):
+    with pytest.raises(ValueError):
+        plan(91)
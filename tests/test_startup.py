@@ -0,0 +1,15 @@
+import subprocess
+import sys
+
+
+def test_import_main_is_lazy():
+    probe = (
+        "import sys, src.main\n"
+        "from src.conf.config import get_settings\n"
+        "from src.database.db import get_engine\n"
+        "heavy = [m for m in ('cloudinary', 'fastapi_mail', 'passlib') if m in sys.modules]\n"
+        "print(heavy, get_settings.cache_info().currsize, get_engine.cache_info().currsize)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[] 0 0"
@@ -0,0 +1,74 @@
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from redis.exceptions import TimeoutError
+
+from src.database.models import User
+from src.services.auth import Auth
+
+try:
+    from fakeredis import FakeAsyncRedis
+except ImportError:
+    FakeAsyncRedis = None
+
+
+def make_user():
+    return User(id=7, username="cached", email="cached@example.com", confirmed=True, password="hash",
+                created_at=datetime(2024, 4, 1, 12, 30), avatar=None, refresh_token="refresh")
+
+
+@unittest.skipIf(FakeAsyncRedis is None, "fakeredis is not installed")
+class TestUserCache(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.redis = FakeAsyncRedis(decode_responses=True)
+        self.auth = Auth()
+        self.auth.bind(self.redis)
+        patcher = patch("src.services.auth.settings")
+        self.addCleanup(patcher.stop)
+        settings = patcher.start()
+        settings.secret_key, settings.algorithm = "secret", "HS256"
+
+    async def asyncTearDown(self):
+        await self.redis.aclose()
+
+    async def test_cache_round_trip(self):
+        await self.auth.cache_user(make_user())
+        user = await self.auth.get_cached_user("cached@example.com")
+        self.assertEqual((user.id, user.email, user.created_at, user.refresh_token),
+                         (7, "cached@example.com", datetime(2024, 4, 1, 12, 30), "refresh"))
+        self.assertGreater(await self.redis.ttl("user:cached@example.com"), 0)
+
+    async def test_current_user_is_loaded_once(self):
+        token = await self._token()
+        with patch("src.services.auth.UsersRepository.get_user_by_email",
+                   AsyncMock(return_value=make_user())) as get_user, \
+                patch.object(self.redis, "execute_command", wraps=self.redis.execute_command) as commands:
+            first = await self.auth.get_current_user(token, MagicMock())
+            self.assertEqual([c.args[0] for c in commands.call_args_list], ["GET", "SET"])
+            commands.reset_mock()
+            second = await self.auth.get_current_user(token, MagicMock())
+            self.assertEqual([c.args[0] for c in commands.call_args_list], ["GET"])
+        get_user.assert_awaited_once()
+        self.assertEqual((first.id, second.id), (7, 7))
+
+    async def test_warm_users_in_one_pipeline(self):
+        users = [make_user() for _ in range(3)]
+        for i, user in enumerate(users):
+            user.id, user.email = i, f"user{i}@example.com"
+        with patch.object(self.redis, "execute_command", wraps=self.redis.execute_command) as commands:
+            self.assertEqual(await self.auth.warm_users(users), 3)
+        commands.assert_not_called()
+        self.assertEqual((await self.auth.get_cached_user("user2@example.com")).id, 2)
+        self.assertGreater(await self.redis.ttl("user:user0@example.com"), 0)
+
+    async def test_redis_failure_falls_back_to_database(self):
+        self.auth.bind(AsyncMock(get=AsyncMock(side_effect=TimeoutError), set=AsyncMock(side_effect=TimeoutError)))
+        token = await self._token()
+        with patch("src.services.auth.UsersRepository.get_user_by_email", AsyncMock(return_value=make_user())):
+            user = await self.auth.get_current_user(token, MagicMock())
+        self.assertEqual(user.id, 7)
+
+    async def _token(self):
+        return await self.auth.create_access_token({"sub": "cached@example.com"})
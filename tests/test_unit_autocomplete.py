@@ -0,0 +1,104 @@
+from datetime import date
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from src.database.models import Base, Contact, User
+from src.repository.contacts import ContactsRepository
+from src.schemas.schemas import ContactIn
+from src.services.autocomplete import AutocompleteIndex, NameIndex, autocomplete_index
+
+
+class TestNameIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = NameIndex([(1, "Anna", "Nowak"), (2, "Łukasz", "Anders"), (3, "Piotr", "Nowicki")])
+
+    def test_search(self):
+        self.assertEqual([row[0] for row in self.index.search("an", 10)], [2, 1])
+        self.assertEqual([row[0] for row in self.index.search("now", 10)], [1, 3])
+        self.assertEqual([row[0] for row in self.index.search("anna no", 10)], [1])
+        self.assertEqual([row[0] for row in self.index.search("luk", 10)], [2])
+        self.assertEqual(self.index.search("x", 10), [])
+        self.assertEqual(len(self.index.search("n", 1)), 1)
+
+    def test_add_and_remove(self):
+        self.index.add(1, "Hanna", "Nowak")
+        self.assertEqual([row[0] for row in self.index.search("an", 10)], [2])
+        self.index.remove(3)
+        self.assertEqual([row[0] for row in self.index.search("now", 10)], [1])
+        self.assertEqual(len(self.index), 6)
+
+
+class TestAutocompleteIndex(unittest.TestCase):
+
+    def test_builds_lazily_and_evicts_least_recently_used(self):
+        loads = []
+
+        def loader(user_id):
+            def load():
+                loads.append(user_id)
+                return [(user_id * 10 + n, f"Name{n}", "Test") for n in range(2)]
+            return load
+
+        index = AutocompleteIndex(max_entries=12, ttl=60)
+        index.search(1, "name", 10, loader(1))
+        index.search(1, "name", 10, loader(1))
+        index.search(2, "name", 10, loader(2))
+        self.assertEqual((loads, index.size), ([1, 2], 12))
+
+        index.search(1, "name", 10, loader(1))
+        index.search(3, "name", 10, loader(3))
+        self.assertEqual(index.size, 12)
+        index.search(1, "name", 10, loader(1))
+        index.search(2, "name", 10, loader(2))
+        self.assertEqual(loads, [1, 2, 3, 2])
+
+    def test_expired_index_is_rebuilt(self):
+        loads = []
+        index = AutocompleteIndex(max_entries=100, ttl=0)
+        for _ in range(2):
+            index.search(1, "a", 10, lambda: loads.append(1) or [])
+        self.assertEqual(loads, [1, 1])
+
+
+class TestRepositoryAutocomplete(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        autocomplete_index.clear()
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+        self.user = User(id=1, username="autocomplete", email="autocomplete@test.com", password="x")
+        self.session.add(self.user)
+        self.session.add(Contact(first_name="Anna", last_name="Nowak", email="anna@test.com", user_id=1))
+        self.session.commit()
+        self.repository = ContactsRepository(self.session)
+
+    def tearDown(self):
+        autocomplete_index.clear()
+        self.session.close()
+        self.engine.dispose()
+
+    async def suggestions(self, prefix):
+        return [(s.first_name, s.last_name) for s in await self.repository.autocomplete(prefix, 10, self.user)]
+
+    async def test_writes_update_loaded_index(self):
+        self.assertEqual(await self.suggestions("an"), [("Anna", "Nowak")])
+        body = ContactIn(first_name="Andrzej", last_name="Lis", email="andrzej@test.com", phone_number="600100200",
+                         date_of_birth=date(1990, 1, 1))
+        created = await self.repository.create_contact(body, self.user)
+        self.assertEqual(await self.suggestions("an"), [("Andrzej", "Lis"), ("Anna", "Nowak")])
+
+        body.first_name = "Jan"
+        await self.repository.update_contact(created.id, body, self.user)
+        self.assertEqual(await self.suggestions("an"), [("Anna", "Nowak")])
+        self.assertEqual(await self.suggestions("ja"), [("Jan", "Lis")])
+
+        await self.repository.remove_contact(created.id, self.user)
+        self.assertEqual(await self.suggestions("lis"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+from datetime import date
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from src.database import db as db_module
+from src.database.models import Base, Contact, User
+from src.routes import batch, contacts, users
+from src.services.auth import auth_service
+
+
+class TestBatch(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            user = User(id=1, username="batch", email="batch@test.com", password="x", confirmed=True,
+                        avatar="https://example.com/avatar.png")
+            session.add_all([user, Contact(first_name="Anna", last_name="Nowak", email="anna@test.com",
+                                           phone_number="+48505606404", date_of_birth=date(1990, 3, 5), user=user)])
+            session.commit()
+        patcher = patch.object(db_module, "get_engine", return_value=self.engine)
+        self.addCleanup(patcher.stop)
+        patcher.start()
+        token = await auth_service.create_access_token({"sub": "batch@test.com"})
+        app = FastAPI()
+        for module in (contacts, users, batch):
+            app.include_router(module.router, prefix="/api")
+        self.client = TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+    async def asyncTearDown(self):
+        self.engine.dispose()
+
+    def post(self, *urls):
+        return self.client.post("/api/batch", json={"requests": [{"id": str(n), "url": url}
+                                                                 for n, url in enumerate(urls)]})
+
+    async def test_requests_share_one_session_and_authentication(self):
+        with patch.object(db_module, "SessionLocal", wraps=db_module.SessionLocal) as sessions, \
+                patch.object(auth_service, "access_token_subject",
+                             wraps=auth_service.access_token_subject) as decoded:
+            response = self.post("/api/users/me", "/api/contacts/search/?query=anna&fields=email",
+                                 "/api/contacts/1", "/api/contacts/99")
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["responses"]
+        self.assertEqual([result["id"] for result in results], ["0", "1", "2", "3"])
+        self.assertEqual(results[0]["body"]["email"], "batch@test.com")
+        self.assertEqual(results[1]["body"], [{"email": "anna@test.com", "id": 1}])
+        self.assertEqual((results[2]["status"], results[2]["body"]["first_name"]), (200, "Anna"))
+        self.assertEqual((results[3]["status"], results[3]["body"]), (404, {"detail": "contact not found"}))
+        self.assertEqual(sessions.call_count, 1)
+        self.assertEqual(decoded.call_count, 1)
+
+    async def test_errors_stay_in_their_response(self):
+        results = self.post("/api/contacts/abc", "/api/nowhere", "/api/contacts/stream").json()["responses"]
+        self.assertEqual([result["status"] for result in results], [422, 404, 400])
+
+    async def test_batch_is_validated(self):
+        self.assertEqual(self.post("/elsewhere").status_code, 422)
+        self.assertEqual(self.post(*["/api/users/me"] * 21).status_code, 422)
+        duplicated = {"requests": [{"id": "a", "url": "/api/users/me"}, {"id": "a", "url": "/api/users/me"}]}
+        self.assertEqual(self.client.post("/api/batch", json=duplicated).status_code, 422)
+        self.assertEqual(self.client.post("/api/batch", json={"requests": [{"id": "a", "url": "/api/users/me"}]},
+                                          headers={"Authorization": "Bearer invalid"}).status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
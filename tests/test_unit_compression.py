@@ -0,0 +1,83 @@
+import gzip
+import json
+import unittest
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src.middleware.compression import CompressionMiddleware, Encoder, available_encodings, negotiate
+
+PAYLOAD = [{"id": i, "first_name": "Anna", "last_name": "Nowak", "email": f"anna.nowak.{i}@example.com"}
+           for i in range(100)]
+
+
+async def stream(request):
+    async def chunks():
+        for i in range(3):
+            yield json.dumps(PAYLOAD[i * 30:(i + 1) * 30]).encode()
+    return StreamingResponse(chunks(), media_type="application/json")
+
+
+class TestNegotiation(unittest.TestCase):
+
+    def test_negotiate(self):
+        available = ("zstd", "br", "gzip")
+        self.assertEqual(negotiate("gzip, deflate, br", available), "br")
+        self.assertEqual(negotiate("gzip;q=1.0, br;q=0.5", available), "gzip")
+        self.assertEqual(negotiate("br;q=0, *", available), "zstd")
+        self.assertEqual(negotiate("identity", available), None)
+        self.assertEqual(negotiate("", available), None)
+        self.assertEqual(negotiate("gzip;q=0", ("gzip",)), None)
+
+    def test_encoders_round_trip(self):
+        body = json.dumps(PAYLOAD).encode()
+        for encoding in available_encodings():
+            encoder = Encoder(encoding)
+            compressed = encoder.compress(body[:1000]) + encoder.compress(body[1000:]) + encoder.finish()
+            if encoding == "gzip":
+                decoded = gzip.decompress(compressed)
+            elif encoding == "br":
+                import brotli
+                decoded = brotli.decompress(compressed)
+            else:
+                import zstandard
+                decoded = zstandard.ZstdDecompressor().decompressobj().decompress(compressed)
+            self.assertEqual(decoded, body, encoding)
+            self.assertLess(len(compressed), len(body) / 3, encoding)
+
+
+class TestCompressionMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        app = Starlette(routes=[
+            Route("/large", lambda request: JSONResponse(PAYLOAD)),
+            Route("/small", lambda request: JSONResponse({"ok": True})),
+            Route("/image", lambda request: Response(b"\0" * 5000, media_type="image/png")),
+            Route("/events", lambda request: Response(b"data: {}\n\n" * 500, media_type="text/event-stream")),
+            Route("/stream", stream),
+        ])
+        self.client = TestClient(CompressionMiddleware(app, min_size=500, offload_size=1000))
+
+    def test_large_body_is_compressed(self):
+        response = self.client.get("/large", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+        self.assertLess(int(response.headers["content-length"]), len(json.dumps(PAYLOAD)))
+        self.assertEqual(response.json(), PAYLOAD)
+
+    def test_small_and_incompressible_bodies_are_sent_as_is(self):
+        for path in ("/small", "/image", "/events"):
+            response = self.client.get(path, headers={"Accept-Encoding": "gzip"})
+            self.assertNotIn("content-encoding", response.headers)
+        response = self.client.get("/large", headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.json(), PAYLOAD)
+
+    def test_streaming_response_is_compressed(self):
+        response = self.client.get("/stream", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertNotIn("content-length", response.headers)
+        expected = b"".join(json.dumps(PAYLOAD[i * 30:(i + 1) * 30]).encode() for i in range(3))
+        self.assertEqual(response.content, expected)
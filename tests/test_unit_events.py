@@ -0,0 +1,127 @@
+import asyncio
+import json
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import httpx
+from fastapi import FastAPI
+
+from src.database.db import get_db
+from src.database.models import Contact, User
+from src.routes import contacts
+from src.services.auth import auth_service
+from src.services.events import ContactEventHub, contact_events
+
+try:
+    from fakeredis import FakeAsyncRedis, FakeServer
+except ImportError:
+    FakeAsyncRedis = None
+
+
+def make_contact(contact_id=1):
+    return Contact(id=contact_id, first_name="Anna", last_name="Nowak", email="anna@example.com",
+                   phone_number="+48600100200", date_of_birth=date(1990, 5, 17))
+
+
+class TestContactEvents(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        patcher = patch("src.services.events.settings")
+        self.addCleanup(patcher.stop)
+        self.settings = patcher.start()
+        self.settings.contact_stream_buffer = 3
+        self.settings.contact_stream_heartbeat = 0.01
+        self.settings.contact_stream_retry_ms = 3000
+        self.hub = ContactEventHub()
+
+    async def read(self, stream, frames):
+        return [await anext(stream) for _ in range(frames)]
+
+    async def test_changes_reach_the_streams_of_their_user(self):
+        mine, other = self.hub.subscribe(1), self.hub.subscribe(2)
+        stream = self.hub.stream(mine)
+        await self.hub.publish(1, "created", make_contact())
+        await self.hub.publish(1, "deleted", make_contact(5))
+        retry, created, deleted = await self.read(stream, 3)
+        self.assertEqual(retry, b"retry: 3000\n\n")
+        event, data = created.decode().split("\n")[:2]
+        self.assertEqual(event, "event: created")
+        self.assertEqual(json.loads(data.removeprefix("data: "))["email"], "anna@example.com")
+        self.assertEqual(deleted, b'event: deleted\ndata: {"id": 5}\n\n')
+        self.assertIsNone(await other.get(0.01))
+        await stream.aclose()
+        self.assertEqual(self.hub.connections, 1)
+
+    async def test_idle_stream_sends_heartbeats(self):
+        stream = self.hub.stream(self.hub.subscribe(1))
+        self.assertEqual((await self.read(stream, 2))[1], b": keepalive\n\n")
+        await stream.aclose()
+
+    async def test_slow_client_is_told_to_resync(self):
+        subscription = self.hub.subscribe(1)
+        for contact_id in range(5):
+            await self.hub.publish(1, "updated", make_contact(contact_id))
+        self.assertEqual(subscription.closed, "overflow")
+        frames = [frame async for frame in self.hub.stream(subscription)]
+        self.assertEqual(frames[1:], [b"event: resync\ndata: {}\n\n"])
+        self.assertEqual(self.hub.connections, 0)
+
+    async def test_draining_ends_every_stream(self):
+        stream = self.hub.stream(self.hub.subscribe(1))
+        await anext(stream)
+        self.hub.close_all()
+        self.assertEqual([frame async for frame in stream], [])
+        late = self.hub.subscribe(1)
+        self.assertEqual(late.closed, "shutdown")
+
+    @unittest.skipIf(FakeAsyncRedis is None, "fakeredis is not installed")
+    async def test_changes_fan_out_between_workers(self):
+        server = FakeServer()
+        clients = [FakeAsyncRedis(server=server, decode_responses=True) for _ in range(2)]
+        publisher, listener = ContactEventHub(), self.hub
+        publisher.bind(clients[0])
+        listener.bind(clients[1])
+        subscription = listener.subscribe(1)
+        for _ in range(100):
+            if await clients[0].pubsub_numsub("contact-events") == [("contact-events", 1)]:
+                break
+            await asyncio.sleep(0.01)
+        await publisher.publish(1, "created", make_contact())
+        frame = None
+        for _ in range(100):
+            frame = await subscription.get(0.05)
+            if frame is not None:
+                break
+        self.assertTrue(frame.startswith(b"event: created\n"))
+        await listener.stop()
+        for client in clients:
+            await client.aclose()
+
+
+class TestStreamRoute(unittest.IsolatedAsyncioTestCase):
+
+    async def test_stream_releases_the_session_and_sends_changes(self):
+        db = MagicMock()
+        app = FastAPI()
+        app.include_router(contacts.router, prefix="/api")
+        app.dependency_overrides[auth_service.get_current_user] = lambda: User(id=42)
+        app.dependency_overrides[get_db] = lambda: db
+
+        async def change_then_drain():
+            while contact_events.connections == 0:
+                await asyncio.sleep(0.01)
+            db.close.assert_called_once()
+            await contact_events.publish(42, "created", make_contact())
+            contact_events.close_all()
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response, _ = await asyncio.gather(client.get("/api/contacts/stream"), change_then_drain())
+        contact_events.bind(None)
+        self.assertEqual(response.headers["content-type"], "text/event-stream; charset=utf-8")
+        self.assertIn("event: created\n", response.text)
+
+
+if __name__ == '__main__':
+    unittest.main()
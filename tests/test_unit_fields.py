@@ -0,0 +1,103 @@
+from datetime import date
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from src.database.models import Base, User
+from src.dependencies import get_contacts_repository
+from src.repository.contacts import ContactsRepository
+from src.routes import contacts
+from src.schemas.fields import contact_model, contact_page_model, parse_contact_fields
+from src.schemas.schemas import ContactIn, ContactPage
+from src.services.auth import auth_service
+
+
+class TestParseFields(unittest.TestCase):
+
+    def test_fields_are_normalised(self):
+        self.assertEqual(parse_contact_fields("last_name, first_name"), ("first_name", "last_name", "id"))
+        self.assertEqual(parse_contact_fields("id,id"), ("id",))
+
+    def test_all_or_no_fields_mean_the_full_contact(self):
+        self.assertIsNone(parse_contact_fields(None))
+        self.assertIsNone(parse_contact_fields(""))
+        self.assertIsNone(parse_contact_fields("first_name,last_name,email,phone_number,date_of_birth"))
+
+    def test_unknown_fields_are_rejected(self):
+        with self.assertRaisesRegex(ValueError, "unknown fields: password"):
+            parse_contact_fields("first_name,password")
+
+    def test_models_are_built_once(self):
+        fields = ("first_name", "id")
+        self.assertIs(contact_model(fields), contact_model(fields))
+        self.assertEqual(list(contact_model(fields).model_fields), ["first_name", "id"])
+        self.assertTrue(issubclass(contact_page_model(fields), ContactPage))
+
+
+class TestProjection(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(self.engine)
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: self.statements.append(statement))
+        self.session = Session(self.engine)
+        self.user = User(id=1, username="fields", email="fields@test.com", password="x")
+        self.session.add(self.user)
+        self.session.commit()
+        self.repository = ContactsRepository(self.session)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    async def add_contacts(self, count):
+        for n in range(count):
+            await self.repository.create_contact(
+                ContactIn(first_name=f"Anna{n}", last_name="Nowak", email=f"anna{n}@test.com",
+                          phone_number="+48505606404", date_of_birth=date(1990, 3, 5)), self.user)
+        self.statements.clear()
+
+    async def test_only_the_requested_columns_are_selected(self):
+        await self.add_contacts(2)
+        fields = parse_contact_fields("first_name")
+        result = await self.repository.get_contacts(0, 10, self.user, fields)
+        self.assertEqual([item.model_dump() for item in result],
+                         [{"first_name": "Anna0", "id": 1}, {"first_name": "Anna1", "id": 2}])
+        columns = self.statements[-1].split("FROM")[0]
+        self.assertIn("contacts.first_name", columns)
+        self.assertNotIn("contacts.email", columns)
+
+    async def test_search_page_is_projected(self):
+        await self.add_contacts(3)
+        page = await self.repository.get_contacts_by_query_page("anna", 0, 2, self.user, ("last_name", "id"))
+        self.assertEqual(page.model_dump(), {"items": [{"last_name": "Nowak", "id": 1},
+                                                       {"last_name": "Nowak", "id": 2}],
+                                             "total": 3, "total_exact": True, "next": None})
+        self.assertNotIn("contacts.first_name", self.statements[0].split("FROM")[0])
+
+    async def test_routes_return_the_projection(self):
+        await self.add_contacts(1)
+        app = FastAPI()
+        app.include_router(contacts.router, prefix="/api")
+        app.dependency_overrides[auth_service.get_current_user] = lambda: self.user
+        app.dependency_overrides[get_contacts_repository] = lambda: self.repository
+        client = TestClient(app)
+        response = client.get("/api/contacts/search/", params={"query": "anna", "fields": "first_name,email"})
+        self.assertEqual(response.json(), [{"first_name": "Anna0", "email": "anna0@test.com", "id": 1}])
+        response = client.get("/api/contacts/search/", params={"query": "anna", "fields": "id", "envelope": True})
+        self.assertEqual(response.json()["items"], [{"id": 1}])
+        response = client.get("/api/contacts/search/", params={"query": "anna", "fields": "password"})
+        self.assertEqual(response.status_code, 422)
+        response = client.get("/api/contacts/search/", params={"query": "anna"})
+        self.assertEqual(set(response.json()[0]), {"first_name", "last_name", "email", "phone_number",
+                                                   "date_of_birth", "id"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from src.middleware.idempotency import IdempotencyMiddleware
+from src.services.idempotency import idempotency_store, idempotent
+
+try:
+    from fakeredis import FakeAsyncRedis
+except ImportError:
+    FakeAsyncRedis = None
+
+
+class Item(BaseModel):
+    name: str
+
+
+@unittest.skipIf(FakeAsyncRedis is None, "fakeredis is not installed")
+class TestIdempotency(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.redis = FakeAsyncRedis(decode_responses=True)
+        idempotency_store.bind(self.redis)
+        self.addCleanup(idempotency_store.bind, None)
+        patcher = patch("src.services.idempotency.settings")
+        self.addCleanup(patcher.stop)
+        settings = patcher.start()
+        settings.idempotency_ttl = 60
+        settings.idempotency_lock_timeout = 5.0
+        settings.idempotency_wait_timeout = 1.0
+        settings.idempotency_poll_interval = 0.01
+
+        self.calls = []
+        self.release = asyncio.Event()
+        self.release.set()
+        app = FastAPI()
+        app.add_middleware(IdempotencyMiddleware)
+
+        @app.post("/items", status_code=201)
+        @idempotent
+        async def create_item(item: Item):
+            self.calls.append(item.name)
+            await self.release.wait()
+            if item.name == "broken":
+                raise HTTPException(status_code=503, detail="unavailable")
+            if item.name == "limited":
+                raise HTTPException(status_code=429, detail="too many requests")
+            if item.name == "taken":
+                raise HTTPException(status_code=409, detail="already exists")
+            return {"id": len(self.calls), "name": item.name}
+
+        @app.post("/plain")
+        async def plain():
+            self.calls.append("plain")
+            return {"id": len(self.calls)}
+
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        await self.redis.aclose()
+
+    async def post(self, path, name="a", key="key-1", token=None):
+        headers = {"Idempotency-Key": key}
+        if token is not None:
+            headers["Authorization"] = f"Bearer {token}"
+        return await self.client.post(path, json={"name": name}, headers=headers)
+
+    async def test_retry_replays_the_first_response(self):
+        first = await self.post("/items")
+        retry = await self.post("/items")
+        self.assertEqual((first.status_code, first.json()), (201, {"id": 1, "name": "a"}))
+        self.assertEqual((retry.status_code, retry.json()), (201, {"id": 1, "name": "a"}))
+        self.assertEqual(retry.headers["Idempotent-Replayed"], "true")
+        self.assertEqual(self.calls, ["a"])
+        [stored] = await self.redis.keys("idempotency:anonymous:*:key-1")
+        self.assertGreater(await self.redis.ttl(stored), 0)
+
+    async def test_concurrent_retry_waits_for_the_first_attempt(self):
+        self.release.clear()
+        first = asyncio.create_task(self.post("/items"))
+        await asyncio.sleep(0.02)
+        retry = asyncio.create_task(self.post("/items"))
+        await asyncio.sleep(0.05)
+        self.release.set()
+        first, retry = await asyncio.gather(first, retry)
+        self.assertEqual(first.json(), retry.json())
+        self.assertEqual(self.calls, ["a"])
+
+    async def test_retry_gives_up_on_a_stuck_first_attempt(self):
+        self.release.clear()
+        first = asyncio.create_task(self.post("/items"))
+        await asyncio.sleep(0.02)
+        with patch("src.services.idempotency.settings.idempotency_wait_timeout", 0.05):
+            retry = await self.post("/items")
+        self.release.set()
+        await first
+        self.assertEqual(retry.status_code, 409)
+
+    async def test_key_reused_for_another_request_is_rejected(self):
+        with patch("src.middleware.idempotency.auth_service.access_token_subject", return_value="user@test.com"):
+            await self.post("/items", name="a", token="token")
+            reused = await self.post("/items", name="b", token="token")
+        self.assertEqual(reused.status_code, 422)
+        self.assertEqual(self.calls, ["a"])
+        self.assertEqual(await self.redis.keys("idempotency:*"), ["idempotency:user@test.com:key-1"])
+
+    async def test_anonymous_clients_do_not_share_keys(self):
+        first = await self.post("/items", name="a")
+        other = await self.post("/items", name="b")
+        self.assertEqual((first.status_code, other.status_code), (201, 201))
+        self.assertEqual(self.calls, ["a", "b"])
+
+    async def test_invalid_token_is_processed_as_sent(self):
+        with patch("src.middleware.idempotency.auth_service.access_token_subject", return_value=None):
+            await self.post("/items", token="expired")
+            await self.post("/items", token="expired")
+        self.assertEqual(self.calls, ["a", "a"])
+        self.assertEqual(await self.redis.keys("idempotency:*"), [])
+
+    async def test_only_repeatable_client_errors_are_stored(self):
+        self.assertEqual((await self.post("/items", name="limited")).status_code, 429)
+        self.assertEqual((await self.post("/items", name="limited")).status_code, 429)
+        self.assertEqual((await self.post("/items", name="taken", key="key-2")).status_code, 409)
+        replayed = await self.post("/items", name="taken", key="key-2")
+        self.assertEqual((replayed.status_code, replayed.headers["Idempotent-Replayed"]), (409, "true"))
+        self.assertEqual(self.calls, ["limited", "limited", "taken"])
+
+    async def test_server_error_is_not_stored(self):
+        self.assertEqual((await self.post("/items", name="broken")).status_code, 503)
+        self.assertEqual((await self.post("/items", name="broken")).status_code, 503)
+        self.assertEqual(self.calls, ["broken", "broken"])
+
+    async def test_keys_are_scoped_per_endpoint_opt_in(self):
+        await self.post("/plain")
+        await self.post("/plain")
+        await self.post("/items", key="key-2")
+        await self.client.post("/items", json={"name": "a"})
+        await self.client.post("/items", json={"name": "a"})
+        self.assertEqual(self.calls, ["plain", "plain", "a", "a", "a"])
+
+
+if __name__ == '__main__':
+    unittest.main()
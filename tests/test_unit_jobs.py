@@ -0,0 +1,140 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from redis.asyncio.client import Pipeline
+from redis.exceptions import ConnectionError
+
+from src.services.jobs import JOBS, JobQueue, Worker, job
+
+try:
+    from fakeredis import FakeAsyncRedis
+except ImportError:
+    FakeAsyncRedis = None
+
+calls = []
+
+
+@job("test_record")
+async def record(value):
+    calls.append(value)
+
+
+@job("test_sync")
+def record_sync(value):
+    calls.append(value * 2)
+
+
+@job("test_fail")
+def fail():
+    raise ValueError("boom")
+
+
+@unittest.skipIf(FakeAsyncRedis is None, "fakeredis is not installed")
+class TestJobQueue(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        calls.clear()
+        self.redis = FakeAsyncRedis(decode_responses=True)
+        self.queue = JobQueue("test")
+        self.queue.bind(self.redis)
+        self.worker = Worker(self.queue, concurrency=2, worker_id="w1", poll_timeout=0.05)
+
+    async def asyncTearDown(self):
+        await self.redis.aclose()
+
+    async def take(self):
+        return await self.redis.lmove(self.queue.key("ready"), self.worker.processing_key, "RIGHT", "LEFT")
+
+    async def test_runs_sync_and_async_jobs(self):
+        await self.queue.enqueue("test_record", 1)
+        await self.queue.enqueue("test_sync", 2)
+        await self.worker.process(await self.take())
+        await self.worker.process(await self.take())
+        self.assertEqual(calls, [1, 4])
+        metrics = await self.queue.metrics()
+        self.assertEqual((metrics["ready"], metrics["counters"]["test_record:succeeded"]), (0, 1))
+        self.assertEqual(await self.redis.llen(self.worker.processing_key), 0)
+
+    async def test_retries_then_dead_letters(self):
+        await self.queue.enqueue("test_fail", max_retries=1)
+        with patch("src.services.jobs.settings") as settings:
+            settings.job_retry_backoff = 0
+            await self.worker.process(await self.take())
+            self.assertEqual(await self.worker.promote(), 1)
+            await self.worker.process(await self.take())
+        dead = json.loads(await self.redis.lindex(self.queue.key("dead"), 0))
+        self.assertEqual((dead["attempts"], dead["error"]), (2, "ValueError('boom')"))
+        metrics = await self.queue.metrics()
+        self.assertEqual((metrics["dead"], metrics["counters"]["test_fail:retried"]), (1, 1))
+
+        self.assertEqual(await self.queue.retry_dead(), 1)
+        self.assertEqual(json.loads(await self.redis.lindex(self.queue.key("ready"), 0))["attempts"], 0)
+
+    async def test_unknown_job_is_dead_lettered(self):
+        await self.queue.enqueue("no_such_job")
+        await self.worker.process(await self.take())
+        self.assertEqual(await self.redis.llen(self.queue.key("dead")), 1)
+
+    async def test_delayed_job_waits(self):
+        await self.queue.enqueue("test_record", 1, delay=60)
+        self.assertEqual(await self.worker.promote(), 0)
+        self.assertEqual((await self.queue.metrics())["delayed"], 1)
+
+    async def test_promotes_each_job_once_and_atomically(self):
+        await self.redis.zadd(self.queue.key("delayed"), {json.dumps({"id": n}): 0 for n in range(3)})
+        with patch.object(Pipeline, "execute", side_effect=ConnectionError):
+            with self.assertRaises(ConnectionError):
+                await self.worker.promote()
+        metrics = await self.queue.metrics()
+        self.assertEqual((metrics["delayed"], metrics["ready"]), (3, 0))
+
+        other = Worker(self.queue, worker_id="w2")
+        self.assertEqual(sum(await asyncio.gather(self.worker.promote(), other.promote())), 3)
+        metrics = await self.queue.metrics()
+        self.assertEqual((metrics["delayed"], metrics["ready"]), (0, 3))
+
+    async def test_recovers_jobs_of_stopped_workers(self):
+        crashed = Worker(self.queue, worker_id="crashed")
+        live = Worker(self.queue, worker_id="live")
+        await live.heartbeat()
+        for worker in (crashed, live):
+            await self.redis.lpush(worker.processing_key, json.dumps({"id": worker.id}))
+        self.assertEqual(await self.worker.recover(), 1)
+        self.assertEqual(await self.redis.llen(self.queue.key("ready")), 1)
+        self.assertEqual(await self.redis.llen(live.processing_key), 1)
+
+    async def test_run_until_stopped(self):
+        for n in range(5):
+            await self.queue.enqueue("test_record", n)
+        runner = asyncio.create_task(self.worker.run())
+        while len(calls) < 5:
+            await asyncio.sleep(0.01)
+        self.worker.stop()
+        await asyncio.wait_for(runner, 1)
+        self.assertEqual(sorted(calls), [0, 1, 2, 3, 4])
+        self.assertFalse(await self.redis.exists(self.worker.heartbeat_key("w1")))
+
+    async def test_enqueue_requires_connection(self):
+        with self.assertRaises(RuntimeError):
+            await JobQueue("test").enqueue("test_record", 1)
+
+
+class TestTasks(unittest.IsolatedAsyncioTestCase):
+
+    def test_tasks_are_registered(self):
+        import src.services.tasks  # noqa: F401
+
+        self.assertTrue({"send_email", "send_birthday_reminder", "rebuild_stats", "backfill_contact_keys"} <= set(JOBS))
+
+    async def test_send_email_fails_on_smtp_error(self):
+        from src.services import tasks
+
+        with patch("src.services.tasks.email.deliver_email", AsyncMock(side_effect=ConnectionError("smtp down"))):
+            with self.assertRaises(ConnectionError):
+                await tasks.send_email("a@example.com", "a", "http://test/")
+
+
+if __name__ == '__main__':
+    unittest.main()
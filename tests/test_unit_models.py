@@ -0,0 +1,44 @@
+import unittest
+from unittest.mock import MagicMock
+
+from sqlalchemy import Column, Integer, MetaData, PrimaryKeyConstraint, Table
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateTable
+
+from src.database.models import CONTACT_PARTITIONS, Contact, User, _create_contact_partitions
+
+
+class TestContactPartitioning(unittest.TestCase):
+
+    def test_postgresql_table_is_partitioned_by_user(self):
+        ddl = str(CreateTable(Contact.__table__).compile(dialect=postgresql.dialect()))
+        self.assertIn("PRIMARY KEY (id, user_id)", ddl)
+        self.assertTrue(ddl.rstrip().endswith("PARTITION BY HASH (user_id)"))
+
+    def test_partitions_are_created_on_postgresql_only(self):
+        connection = MagicMock()
+        connection.dialect.name = "postgresql"
+        _create_contact_partitions(Contact.__table__, connection)
+        statements = [str(call.args[0].statement) for call in connection.execute.call_args_list]
+        self.assertEqual(len(statements), CONTACT_PARTITIONS)
+        self.assertEqual(statements[-1], f"CREATE TABLE contacts_p{CONTACT_PARTITIONS - 1} PARTITION OF contacts "
+                                         f"FOR VALUES WITH (MODULUS {CONTACT_PARTITIONS}, "
+                                         f"REMAINDER {CONTACT_PARTITIONS - 1})")
+        connection = MagicMock()
+        connection.dialect.name = "sqlite"
+        _create_contact_partitions(Contact.__table__, connection)
+        connection.execute.assert_not_called()
+
+    def test_other_tables_and_databases_keep_their_primary_key(self):
+        self.assertIn("PRIMARY KEY (id)", str(CreateTable(User.__table__).compile(dialect=postgresql.dialect())))
+        other = Table("other", MetaData(), Column("id", Integer), Column("user_id", Integer),
+                      PrimaryKeyConstraint("id"), info={"partition_key": ("user_id",)})
+        self.assertIn("PRIMARY KEY (id)", str(CreateTable(other).compile(dialect=postgresql.dialect())))
+        ddl = str(CreateTable(Contact.__table__).compile(dialect=sqlite.dialect()))
+        self.assertIn("PRIMARY KEY (id)", ddl)
+        self.assertNotIn("PARTITION", ddl)
+        self.assertEqual(list(Contact.__mapper__.primary_key), [Contact.__table__.c.id])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from starlette.responses import PlainTextResponse
+from starlette.testclient import TestClient
+
+from src.middleware.profiling import ProfilingMiddleware
+from src.routes import admin
+from src.services.profiler import StackSampler
+
+
+def busy_handler():
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    return PlainTextResponse("done", status_code=201)
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        settings = patch("src.services.profiler.settings")
+        self.addCleanup(settings.stop)
+        settings.start().profiling_token = "secret"
+        for module in ("src.middleware.profiling", "src.routes.admin"):
+            patcher = patch(f"{module}.settings")
+            self.addCleanup(patcher.stop)
+            patched = patcher.start()
+            patched.profiling_interval = patched.profiling_worker_interval = 0.001
+            patched.profiling_max_seconds = 0.05
+        app = FastAPI()
+        app.add_api_route("/busy", busy_handler)
+        app.include_router(admin.router, prefix="/api")
+        self.client = TestClient(ProfilingMiddleware(app))
+
+    def test_sampler_folds_stacks(self):
+        with StackSampler(0.001) as sampler:
+            busy_handler()
+        self.assertGreater(sampler.samples, 0)
+        line = next(line for line in sampler.folded().splitlines() if "busy_handler" in line)
+        stack, count = line.rsplit(" ", 1)
+        self.assertTrue(stack.startswith("MainThread;"))
+        self.assertGreater(int(count), 0)
+
+    def test_profiles_request_with_token(self):
+        response = self.client.get("/busy?__profile=1", headers={"X-Profile-Token": "secret"})
+        self.assertEqual(response.headers["x-profiled-status"], "201")
+        self.assertIn("test_unit_profiler:busy_handler", response.text)
+
+    def test_ignores_flag_without_token(self):
+        for headers in ({"X-Profile": "1"}, {"X-Profile": "1", "X-Profile-Token": "wrong"}):
+            response = self.client.get("/busy", headers=headers)
+            self.assertEqual((response.status_code, response.text), (201, "done"))
+
+    def test_worker_profile_endpoint(self):
+        self.assertEqual(self.client.post("/api/admin/profile").status_code, 404)
+        response = self.client.post("/api/admin/profile", params={"seconds": 5},
+                                    headers={"X-Profile-Token": "secret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response.headers["x-profile-samples"]), 0)
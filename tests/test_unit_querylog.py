@@ -0,0 +1,71 @@
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src.database.models import Base, Contact, User
+from src.database.querylog import NPlusOneError, bind_shape, instrument, track_queries
+from src.middleware.querylog import QueryStatsMiddleware
+
+
+class TestQueryLog(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = instrument(create_engine("sqlite://", connect_args={"check_same_thread": False},
+                                               poolclass=StaticPool))
+        Base.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            for i in range(12):
+                user = User(id=i + 1, username=f"user{i}", email=f"user{i}@example.com", password="x")
+                session.add_all([user, Contact(first_name="A", last_name="B", email=f"c{i}@example.com",
+                                               phone_number="1", user=user)])
+            session.commit()
+        settings = patch("src.database.querylog.settings")
+        self.addCleanup(settings.stop)
+        self.settings = settings.start()
+        self.settings.slow_query_threshold_ms = 1000
+        self.settings.n_plus_one_threshold = 10
+
+    def load_owners(self):
+        with Session(self.engine) as session:
+            return [contact.user.username for contact in session.query(Contact).all()]
+
+    def test_counts_queries_and_flags_n_plus_one(self):
+        with track_queries(strict=False) as stats, self.assertLogs("src.database.querylog", "WARNING") as logs:
+            self.load_owners()
+        self.assertEqual(stats.count, 13)
+        self.assertEqual(len(stats.repeated), 1)
+        self.assertIn("FROM users", stats.repeated[0])
+        self.assertIn("possible N+1", logs.output[0])
+
+    def test_strict_mode_raises(self):
+        with track_queries(strict=True), self.assertRaises(NPlusOneError):
+            self.load_owners()
+
+    def test_logs_slow_queries_with_bind_shapes(self):
+        self.settings.slow_query_threshold_ms = 0
+        with self.assertLogs("src.database.querylog", "WARNING") as logs, Session(self.engine) as session:
+            session.query(User).filter(User.email == "user1@example.com").first()
+        self.assertIn("(str, int, int)", logs.output[0])
+        self.assertNotIn("user1@example.com", logs.output[0])
+
+    def test_bind_shape(self):
+        self.assertEqual(bind_shape({"user_id_1": 1, "param_1": "x"}), "{user_id_1: int, param_1: str}")
+        self.assertEqual(bind_shape([(1, "a"), (2, "b")]), "2 x (int, str)")
+
+    def test_server_timing_header(self):
+        def endpoint(request):
+            self.load_owners()
+            return PlainTextResponse("ok")
+
+        app = QueryStatsMiddleware(Starlette(routes=[Route("/", endpoint)]))
+        self.settings.query_strict_mode = False
+        with self.assertLogs("src.database.querylog", "WARNING"):
+            response = TestClient(app).get("/")
+        self.assertRegex(response.headers["server-timing"], r'^db;dur=[\d.]+;desc="13 queries"$')
@@ -0,0 +1,130 @@
+from datetime import date
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from src.database.models import Base, Contact, ContactStat, User
+from src.repository.contacts import ContactsRepository
+from src.repository.dedupe import backfill_contact_keys
+from src.schemas.schemas import ContactIn
+from src.services.normalize import email_key, name_key, phone_key, soundex
+
+
+class TestNormalize(unittest.TestCase):
+
+    def test_email_key(self):
+        self.assertEqual(email_key("  Anna.Nowak@Example.COM "), "anna.nowak@example.com")
+        self.assertIsNone(email_key("   "))
+
+    def test_phone_key(self):
+        self.assertEqual(phone_key("+48 600-100-200"), "+48600100200")
+        self.assertEqual(phone_key("600100200", "48"), "+48600100200")
+        self.assertEqual(phone_key("0048 600 100 200"), "+48600100200")
+        self.assertEqual(phone_key("020 7946 0958", "44"), "+442079460958")
+        self.assertEqual(phone_key("+1 (555) 123-4567 ext. 12"), "+15551234567")
+        self.assertIsNone(phone_key("12"))
+        self.assertIsNone(phone_key(None))
+
+    def test_soundex(self):
+        self.assertEqual([soundex(w) for w in ("Robert", "Rupert", "Ashcraft", "Tymczak", "Pfister")],
+                         ["R163", "R163", "A261", "T522", "P236"])
+        self.assertEqual(name_key("Jon", "Smith"), name_key("John", "Smyth"))
+        self.assertIsNone(name_key("", "Smith"))
+
+
+def contact_in(first_name, last_name, email, phone_number, birthday=date(1990, 1, 1)):
+    return ContactIn(first_name=first_name, last_name=last_name, email=email, phone_number=phone_number,
+                     date_of_birth=birthday)
+
+
+class TestDuplicates(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+        self.user = User(id=1, username="dedupe", email="dedupe@test.com", password="x")
+        self.other_user = User(id=2, username="other", email="other@test.com", password="x")
+        self.session.add_all([self.user, self.other_user])
+        self.session.commit()
+        self.repository = ContactsRepository(self.session)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    async def test_clusters_join_different_keys(self):
+        a = await self.repository.create_contact(contact_in("Anna", "Nowak", "anna@a.com", "+48 600 100 200"), self.user)
+        b = await self.repository.create_contact(contact_in("Ann", "Kowal", "ANNA@a.com", "111222333"), self.user)
+        c = await self.repository.create_contact(contact_in("Piotr", "Lis", "p@b.com", "111-222-333"), self.user)
+        d = await self.repository.create_contact(contact_in("Jon", "Smith", "jon@c.com", "500500500"), self.user)
+        e = await self.repository.create_contact(contact_in("John", "Smyth", "john@d.com", "500500501"), self.user)
+        await self.repository.create_contact(contact_in("Zofia", "Wrona", "z@e.com", "700700700"), self.user)
+        await self.repository.create_contact(contact_in("Anna", "Nowak", "anna@a.com", "600100200"), self.other_user)
+
+        clusters = await self.repository.get_duplicates(self.user)
+        self.assertEqual([[contact.id for contact in cluster.contacts] for cluster in clusters],
+                         [[a.id, b.id, c.id], [d.id, e.id]])
+        self.assertEqual(clusters[0].matched_on, ["email", "phone"])
+        self.assertEqual(clusters[1].matched_on, ["name"])
+
+    async def test_merge_contacts(self):
+        keep = await self.repository.create_contact(contact_in("Anna", "Nowak", "anna@a.com", "600100200",
+                                                               date(1990, 5, 1)), self.user)
+        other = await self.repository.create_contact(contact_in("Anna", "Nowak", "anna2@a.com", "600100200",
+                                                                date(1991, 6, 2)), self.user)
+        keep.email = None
+        self.session.commit()
+
+        merged = await self.repository.merge_contacts(keep.id, [other.id], self.user)
+        self.assertEqual(merged.id, keep.id)
+        self.assertEqual(merged.email, "anna2@a.com")
+        self.assertEqual(merged.email_key, "anna2@a.com")
+        self.assertEqual(merged.date_of_birth, date(1990, 5, 1))
+        self.assertIsNone(self.session.get(Contact, other.id))
+        self.assertEqual([(s.month, s.day, s.count) for s in self.session.query(ContactStat).filter(ContactStat.count != 0)],
+                         [(5, 1, 1)])
+
+    async def test_merge_contacts_not_found(self):
+        keep = await self.repository.create_contact(contact_in("Anna", "Nowak", "anna@a.com", "600100200"), self.user)
+        foreign = await self.repository.create_contact(contact_in("Anna", "Nowak", "anna@a.com", "600100200"),
+                                                       self.other_user)
+        self.assertIsNone(await self.repository.merge_contacts(keep.id, [foreign.id], self.user))
+        self.assertIsNotNone(self.session.get(Contact, foreign.id))
+
+    async def test_get_contacts_by_phone(self):
+        contact = await self.repository.create_contact(contact_in("Anna", "Nowak", "anna@a.com", "+48 600-100-200"),
+                                                       self.user)
+        await self.repository.create_contact(contact_in("Anna", "Nowak", "anna@a.com", "600100200"), self.other_user)
+        for number in ("600100200", "+48600100200", "0048 600 100 200"):
+            found = await self.repository.get_contacts_by_phone(number, self.user)
+            self.assertEqual([c.id for c in found], [contact.id])
+        self.assertEqual(await self.repository.get_contacts_by_phone("600100201", self.user), [])
+        self.assertEqual(await self.repository.get_contacts_by_phone("abc", self.user), [])
+
+    def test_backfill_missing_phone_keys(self):
+        self.session.add_all([Contact(first_name="Raw", last_name="Insert", email=f"raw{n}@test.com",
+                                      phone_number=f"600 100 {n:03d}", phone_key="+48000" if n < 2 else None,
+                                      user_id=self.user.id) for n in range(5)])
+        self.session.commit()
+        batches = []
+        updated = backfill_contact_keys(self.session, batch_size=2, missing_only=True,
+                                        progress=lambda count, last_id: batches.append(count))
+        self.assertEqual((updated, batches), (3, [2, 3]))
+        self.assertEqual(sorted(key for (key,) in self.session.query(Contact.phone_key)),
+                         ["+48000", "+48000", "+48600100002", "+48600100003", "+48600100004"])
+
+    def test_backfill_contact_keys(self):
+        self.session.add_all([Contact(first_name=f"Raw{n}", last_name="Insert", email=f"RAW{n}@test.com",
+                                      phone_number=f"600 100 {n:03d}", user_id=self.user.id) for n in range(5)])
+        self.session.commit()
+        self.assertEqual(backfill_contact_keys(self.session, batch_size=2), 5)
+        contact = self.session.query(Contact).filter(Contact.first_name == "Raw3").one()
+        self.session.refresh(contact)
+        self.assertEqual((contact.email_key, contact.phone_key, contact.name_key),
+                         ("raw3@test.com", "+48600100003", "I526:R000"))
+
+
+if __name__ == '__main__':
+    unittest.main()
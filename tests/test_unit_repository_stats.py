@@ -0,0 +1,113 @@
+from datetime import date
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from src.conf.config import settings
+from src.database.models import Base, Contact, ContactStat, User
+from src.repository.contacts import ContactsRepository
+from src.repository.stats import get_stats, rebuild_stats, upcoming_birthday_days
+from src.schemas.schemas import ContactIn
+
+
+def contact_in(n, birthday):
+    return ContactIn(first_name=f"Test{n}", last_name="test", email=f"test{n}@test.com",
+                     phone_number="+48505606404", date_of_birth=birthday)
+
+
+class TestContactStats(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+        self.user = User(id=1, username="stats", email="stats@test.com", password="x")
+        self.session.add(self.user)
+        self.session.commit()
+        self.repository = ContactsRepository(self.session)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def counters(self):
+        return {(s.month, s.day): s.count for s in self.session.query(ContactStat).filter(ContactStat.count != 0)}
+
+    async def test_counters_follow_writes(self):
+        first = await self.repository.create_contact(contact_in(1, date(1990, 3, 5)), self.user)
+        await self.repository.create_contact(contact_in(2, date(1985, 3, 5)), self.user)
+        await self.repository.create_contact(contact_in(3, date(1970, 7, 1)), self.user)
+        self.assertEqual(self.counters(), {(3, 5): 2, (7, 1): 1})
+
+        await self.repository.update_contact(first.id, contact_in(1, date(1990, 12, 24)), self.user)
+        self.assertEqual(self.counters(), {(3, 5): 1, (7, 1): 1, (12, 24): 1})
+
+        await self.repository.remove_contact(first.id, self.user)
+        self.assertEqual(self.counters(), {(3, 5): 1, (7, 1): 1})
+
+    async def test_get_contact_stats(self):
+        await self.repository.create_contact(contact_in(1, date(1990, 3, 5)), self.user)
+        await self.repository.create_contact(contact_in(2, date(1990, 3, 19)), self.user)
+        await self.repository.create_contact(contact_in(3, date(1990, 4, 20)), self.user)
+        result = get_stats(self.session, self.user.id, date(2024, 3, 3))
+        self.assertEqual(result["total"], 3)
+        self.assertEqual(result["birthdays_by_month"][3], 2)
+        self.assertEqual(result["birthdays_by_month"][4], 1)
+        self.assertEqual(result["upcoming_birthdays"], 1)
+
+    async def test_rebuild_stats(self):
+        await self.repository.create_contact(contact_in(1, date(1990, 3, 5)), self.user)
+        self.session.add(Contact(first_name="Raw", last_name="insert", email="raw@test.com", user_id=self.user.id))
+        self.session.query(ContactStat).delete()
+        self.session.commit()
+        rebuild_stats(self.session)
+        self.assertEqual(self.counters(), {(3, 5): 1, (0, 0): 1})
+        self.assertEqual(get_stats(self.session, self.user.id, date(2024, 1, 1))["total"], 2)
+
+    async def test_get_contacts_page(self):
+        for n in range(5):
+            await self.repository.create_contact(contact_in(n, date(1990, 1, n + 1)), self.user)
+        page = await self.repository.get_contacts_page(skip=2, limit=2, user=self.user)
+        self.assertEqual([c.first_name for c in page.items], ["Test2", "Test3"])
+        self.assertEqual(page.total, 5)
+        self.assertTrue(page.total_exact)
+
+    async def test_get_contacts_by_query_page(self):
+        for n in range(5):
+            await self.repository.create_contact(contact_in(n, date(1990, 1, n + 1)), self.user)
+        await self.repository.create_contact(
+            ContactIn(first_name="Other", last_name="person", email="other@example.com",
+                      phone_number="+48505606404", date_of_birth=date(1990, 1, 1)), self.user)
+        page = await self.repository.get_contacts_by_query_page("test", skip=3, limit=10, user=self.user)
+        self.assertEqual([c.first_name for c in page.items], ["Test3", "Test4"])
+        self.assertEqual(page.total, 5)
+        self.assertTrue(page.total_exact)
+
+        past_end = await self.repository.get_contacts_by_query_page("test", skip=10, limit=10, user=self.user)
+        self.assertEqual((past_end.items, past_end.total), ([], 5))
+
+        with patch.object(settings, "search_count_cap", 3, create=True):
+            capped = await self.repository.get_contacts_by_query_page("test", skip=0, limit=2, user=self.user)
+        self.assertEqual((len(capped.items), capped.total, capped.total_exact), (2, 3, False))
+
+    async def test_get_contacts_by_query_page_past_cap(self):
+        for n in range(10):
+            await self.repository.create_contact(contact_in(n, date(1990, 1, n + 1)), self.user)
+        with patch.object(settings, "search_count_cap", 4, create=True):
+            middle = await self.repository.get_contacts_by_query_page("test", skip=4, limit=2, user=self.user)
+            last = await self.repository.get_contacts_by_query_page("test", skip=8, limit=4, user=self.user)
+        self.assertEqual([c.first_name for c in middle.items], ["Test4", "Test5"])
+        self.assertEqual((middle.total, middle.total_exact), (7, False))
+        self.assertEqual([c.first_name for c in last.items], ["Test8", "Test9"])
+        self.assertEqual((last.total, last.total_exact), (10, True))
+
+    def test_upcoming_birthday_days(self):
+        self.assertEqual(upcoming_birthday_days(date(2023, 12, 30), 3), [(12, 30), (12, 31), (1, 1), (1, 2)])
+        self.assertIn((2, 29), upcoming_birthday_days(date(2023, 2, 27), 2))
+        self.assertEqual(len(upcoming_birthday_days(date(2024, 2, 27), 2)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,23 +1,27 @@
 import unittest
 from unittest.mock import MagicMock, patch
-from src.repository.users import (
-    get_user_by_email, create_user, update_token, confirm_email, update_avatar
-)
-from src.database.models import User
-from src.schemas.schemas import UserIn
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from src.database.models import Base, User
+from src.repository.users import UsersRepository
+from src.schemas.schemas import UserIn
 
 
 class TestUsersRepository(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self):
         self.session = MagicMock(spec=Session)
+        self.session.expire_on_commit = True
+        self.repository = UsersRepository(self.session)
 
     async def test_get_user_by_email(self):
         email = "test@test.com"
         user = User(email=email)
         self.session.query().filter().first.return_value = user
-        result = await get_user_by_email(email, self.session)
+        result = await self.repository.get_user_by_email(email)
         self.assertEqual(result, user)
 
     @patch("libgravatar.Gravatar.get_image", side_effect=Exception)
@@ -27,32 +31,58 @@ class TestUsersRepository(unittest.IsolatedAsyncioTestCase):
             email="test@test.com",
             password="Test123",
         )
-        with self.assertRaises(Exception):
-            await create_user(user)
-           
+        result = await self.repository.create_user(user)
+        self.assertIsNone(result.avatar)
+        self.session.add.assert_called_once_with(result)
+        self.session.commit.assert_called_once()
+
     async def test_update_token(self):
-        user = User(email="test@test.com")
+        user = User(id=1, email="test@test.com")
         token = "test"
-        await update_token(user, token, self.session)
+        await self.repository.update_token(user, token)
         self.assertEqual(user.refresh_token, token)
+        self.session.execute.assert_called_once()
         self.session.commit.assert_called_once()
 
-    async def test_confirm_email(self):
-        email = "test@test.com"
-        user = User(email=email)
-        self.session.query().filter().first.return_value = user
-        await confirm_email(email, self.session)
-        self.assertTrue(user.confirmed)
-        self.session.commit.assert_called_once()
 
-    async def test_update_avatar(self):
-        email = "test@test.com"
-        url = "https://test.com/avatar.jpg"
-        user = User(email=email)
-        self.session.query().filter().first.return_value = user
-        result = await update_avatar(email, url, self.session)
-        self.assertEqual(result.avatar, url)
-        self.session.commit.assert_called_once()
+class TestUsersRepositoryStatements(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(self.engine)
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: self.statements.append(statement.split()[0]))
+        self.session = Session(self.engine)
+        self.session.add(User(id=1, username="users", email="test@test.com", password="x"))
+        self.session.commit()
+        self.repository = UsersRepository(self.session)
+        self.statements.clear()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    async def test_confirm_email_is_one_update(self):
+        user = await self.repository.confirm_email("test@test.com")
+        self.assertEqual((user.id, user.confirmed), (1, True))
+        self.assertEqual(self.statements, ["UPDATE"])
+        self.assertIsNone(await self.repository.confirm_email("test@test.com"))
+        self.assertIsNone(await self.repository.confirm_email("unknown@test.com"))
+
+    async def test_loaded_user_is_updated_in_place(self):
+        loaded = await self.repository.get_user_by_email("test@test.com")
+        self.statements.clear()
+        user = await self.repository.update_avatar("test@test.com", "https://test.com/avatar.jpg")
+        self.assertIs(user, loaded)
+        self.assertEqual((user.avatar, user.username), ("https://test.com/avatar.jpg", "users"))
+        await self.repository.update_token(user, "token")
+        self.assertEqual(user.refresh_token, "token")
+        self.assertFalse(self.session.dirty)
+        self.assertEqual(self.statements, ["UPDATE", "UPDATE"])
+
+    async def test_update_avatar_of_unknown_user(self):
+        self.assertIsNone(await self.repository.update_avatar("unknown@test.com", "https://test.com/avatar.jpg"))
 
 
 if __name__ == '__main__':
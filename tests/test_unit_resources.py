@@ -0,0 +1,141 @@
+import asyncio
+import os
+import signal
+import socket
+import unittest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src.middleware.inflight import InFlightMiddleware
+from src.services.resources import ResourceManager
+
+
+class TestResourceManager(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.resources = ResourceManager()
+
+    async def test_drain_waits_for_in_flight_requests(self):
+        self.resources.request_started()
+        asyncio.get_running_loop().call_later(0.05, self.resources.request_finished)
+        result = await self.resources.drain(timeout=1)
+        self.assertTrue(result)
+        self.assertEqual(self.resources.in_flight, 0)
+        self.assertTrue(self.resources.draining)
+
+    async def test_drain_timeout(self):
+        self.resources.request_started()
+        result = await self.resources.drain(timeout=0.01)
+        self.assertFalse(result)
+        self.assertEqual(self.resources.in_flight, 1)
+
+    async def test_readiness_reports_draining(self):
+        self.resources.ready = True
+        self.resources.redis = AsyncMock()
+        with patch.object(ResourceManager, "_check_database", AsyncMock(return_value={"ok": True})):
+            ready, details = await self.resources.readiness()
+            self.assertTrue(ready)
+            await self.resources.drain(timeout=0)
+            ready, details = await self.resources.readiness()
+        self.assertFalse(ready)
+        self.assertEqual(details["status"], "draining")
+
+    async def test_readiness_reports_redis_latency_and_pool_size(self):
+        self.resources.ready = True
+        self.resources.redis = AsyncMock()
+        self.resources.redis.connection_pool.max_connections = 50
+        with patch.object(ResourceManager, "_check_database", AsyncMock(return_value={"ok": True})):
+            ready, details = await self.resources.readiness()
+        self.assertTrue(ready)
+        self.assertEqual(details["redis"]["pool"], {"max": 50})
+        self.assertGreaterEqual(details["redis"]["latency_ms"], 0)
+
+    async def test_readiness_without_redis(self):
+        self.resources.ready = True
+        with patch.object(ResourceManager, "_check_database", AsyncMock(return_value={"ok": True})):
+            ready, details = await self.resources.readiness()
+        self.assertFalse(ready)
+        self.assertFalse(details["redis"]["ok"])
+
+
+class TestInFlightMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        self.resources = ResourceManager()
+        app = Starlette(routes=[Route("/", lambda request: PlainTextResponse(str(self.resources.in_flight)))])
+        self.client = TestClient(InFlightMiddleware(app, resources=self.resources))
+
+    def test_counts_request(self):
+        response = self.client.get("/")
+        self.assertEqual(response.text, "1")
+        self.assertEqual(self.resources.in_flight, 0)
+
+    def test_serves_requests_while_draining(self):
+        self.resources.draining = True
+        response = self.client.get("/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["connection"], "close")
+
+    def test_refuses_requests_while_stopping(self):
+        self.resources.stopping = True
+        response = self.client.get("/")
+        self.assertEqual(response.status_code, 503)
+
+
+class TestSigtermDrain(unittest.IsolatedAsyncioTestCase):
+    """
+    Runs a real uvicorn server, so SIGTERM and the shutdown happen in uvicorn's order.
+    """
+
+    async def test_drains_before_uvicorn_stops(self):
+        import httpx
+        import uvicorn
+
+        resources = ResourceManager()
+        seen = {}
+
+        @asynccontextmanager
+        async def lifespan(app):
+            resources.ready = True
+            resources.handle_sigterm()
+            yield
+            seen["in_flight_at_shutdown"] = resources.in_flight
+            await resources.drain(0)
+
+        async def ready(request):
+            return PlainTextResponse("draining" if resources.draining else "ready")
+
+        app = InFlightMiddleware(Starlette(routes=[Route("/", ready)], lifespan=lifespan), resources=resources)
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        # uvicorn re-raises the signal it handled once it has stopped; keep it from ending the test run.
+        original = signal.signal(signal.SIGTERM, lambda signum, frame: None)
+        try:
+            with patch("src.services.resources.settings") as settings:
+                settings.shutdown_grace_period = 0.3
+                serving = asyncio.create_task(server.serve())
+                while not server.started:
+                    await asyncio.sleep(0.01)
+                async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+                    self.assertEqual((await client.get("/")).text, "ready")
+                    os.kill(os.getpid(), signal.SIGTERM)
+                    await asyncio.sleep(0.05)
+                    response = await client.get("/")
+                    self.assertEqual((response.status_code, response.text), (200, "draining"))
+                    self.assertFalse(server.should_exit)
+                await asyncio.wait_for(serving, 5)
+        finally:
+            signal.signal(signal.SIGTERM, original)
+        self.assertTrue(resources.stopping)
+        self.assertEqual(seen["in_flight_at_shutdown"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.database.models import User
+from src.dependencies import get_users_repository
+from src.routes import users
+from src.services.auth import auth_service
+
+
+class TestUpdateAvatar(unittest.TestCase):
+
+    def setUp(self):
+        self.repository = AsyncMock()
+        app = FastAPI()
+        app.include_router(users.router, prefix="/api")
+        app.dependency_overrides[auth_service.get_current_user] = lambda: User(id=1, username="gone",
+                                                                               email="gone@test.com")
+        app.dependency_overrides[get_users_repository] = lambda: self.repository
+        self.client = TestClient(app)
+
+    def test_user_deleted_meanwhile_is_not_found(self):
+        self.repository.update_avatar.return_value = None
+        with patch.object(users.avatars, "upload_avatar", return_value="https://test.com/avatar.jpg"), \
+                patch.object(auth_service, "cache_user") as cache_user:
+            response = self.client.patch("/api/users/avatar", files={"file": ("avatar.png", b"image")})
+        self.assertEqual((response.status_code, response.json()), (404, {"detail": "user not found"}))
+        cache_user.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+from datetime import date
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from src.conf.config import settings
+from src.database.models import Base, Contact, User
+from src.repository.contacts import ContactsRepository
+from src.services.scheduler import BirthdayDigestScheduler, BUILT_KEY, LOCK_KEY, compute_digests, birthday_digests
+
+try:
+    from fakeredis import FakeAsyncRedis
+except ImportError:
+    FakeAsyncRedis = None
+
+
+def make_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([User(id=1, username="first", email="first@test.com", password="x"),
+                         User(id=2, username="second", email="second@test.com", password="x")])
+        for n, (user_id, birthday) in enumerate([(1, date(1990, 12, 30)), (1, date(1985, 1, 3)),
+                                                 (1, date(1990, 1, 10)), (2, date(1970, 6, 1))]):
+            session.add(Contact(first_name=f"Test{n}", last_name="test", email=f"test{n}@test.com",
+                                phone_number="600100200", date_of_birth=birthday, user_id=user_id))
+        session.commit()
+    return engine
+
+
+class TestComputeDigests(unittest.TestCase):
+
+    def test_one_query_for_all_users(self):
+        engine = make_engine()
+        with Session(engine) as session:
+            users, digests = compute_digests(session, date(2024, 12, 28), 7)
+        engine.dispose()
+        self.assertEqual([user[0] for user in users], [1, 2])
+        self.assertEqual([c["first_name"] for c in digests[1]], ["Test0", "Test1"])
+        self.assertNotIn(2, digests)
+
+
+@unittest.skipIf(FakeAsyncRedis is None, "fakeredis is not installed")
+class TestBirthdayDigestScheduler(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = make_engine()
+        self.redis = FakeAsyncRedis(decode_responses=True)
+        self.scheduler = BirthdayDigestScheduler()
+        self.scheduler.redis = self.redis
+        patcher = patch("src.services.scheduler.get_engine", return_value=self.engine)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.redis.aclose()
+        self.engine.dispose()
+
+    async def test_builds_once_per_day(self):
+        today = date(2024, 12, 28)
+        self.assertTrue(await self.scheduler.run_once(today))
+        self.assertFalse(await self.scheduler.run_once(today))
+        self.assertEqual([c["first_name"] for c in await self.scheduler.read(1, today)], ["Test0", "Test1"])
+        self.assertEqual(await self.scheduler.read(2, today), [])
+        self.assertIsNone(await self.scheduler.read(1, date(2024, 12, 29)))
+
+        await self.scheduler.discard(1, today)
+        self.assertIsNone(await self.scheduler.read(1, today))
+
+    async def test_write_during_the_build_keeps_its_digest_out(self):
+        today = date(2024, 12, 28)
+        compute = self.scheduler._compute
+
+        async def compute_while_user_writes(func, day):
+            result = compute(day)
+            await self.scheduler.discard(1, day)
+            return result
+
+        with patch("src.services.scheduler.run_in_threadpool", compute_while_user_writes):
+            self.assertTrue(await self.scheduler.run_once(today))
+        self.assertIsNone(await self.scheduler.read(1, today))
+        self.assertEqual(await self.scheduler.read(2, today), [])
+
+    async def test_stores_in_batches_and_skips_users_written_between_them(self):
+        today = date(2024, 12, 28)
+        extend = self.scheduler._extend
+        extended = []
+
+        async def extend_while_user_writes(lock):
+            extended.append(lock)
+            if len(extended) == 2:
+                await self.scheduler.discard(2, today)
+            return await extend(lock)
+
+        with patch.object(settings, "birthday_digest_batch_size", 1), \
+                patch.object(self.scheduler, "_extend", extend_while_user_writes):
+            self.assertTrue(await self.scheduler.run_once(today))
+        self.assertEqual(len(extended), 2)
+        self.assertEqual(len(await self.scheduler.read(1, today)), 2)
+        self.assertIsNone(await self.scheduler.read(2, today))
+        self.assertTrue(await self.redis.exists(BUILT_KEY.format(day=today.isoformat())))
+
+    async def test_stops_when_the_lock_is_lost(self):
+        today = date(2024, 12, 28)
+        compute = self.scheduler._compute
+
+        async def compute_until_lock_expires(func, day):
+            result = compute(day)
+            await self.redis.set(LOCK_KEY, "other-worker", ex=60)
+            return result
+
+        with patch("src.services.scheduler.run_in_threadpool", compute_until_lock_expires):
+            self.assertFalse(await self.scheduler.run_once(today))
+        self.assertIsNone(await self.scheduler.read(1, today))
+        self.assertFalse(await self.redis.exists(BUILT_KEY.format(day=today.isoformat())))
+
+    async def test_skips_while_another_worker_holds_the_lock(self):
+        await self.redis.set(LOCK_KEY, "other-worker", ex=60)
+        self.assertFalse(await self.scheduler.run_once(date(2024, 12, 28)))
+        self.assertIsNone(await self.scheduler.read(1, date(2024, 12, 28)))
+
+    async def test_repository_reads_digest(self):
+        today = date.today()
+        await self.scheduler.run_once(today)
+        await self.redis.set(f"birthday-digest:{today.isoformat()}:1", '[{"id": 99}]')
+        with patch.object(birthday_digests, "redis", self.redis), Session(self.engine) as session:
+            result = await ContactsRepository(session).get_contacts_with_upcoming_birthdays(session.get(User, 1))
+        self.assertEqual(result, [{"id": 99}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from src.database.models import Contact, User
+from src.repository.contacts import ContactsRepository
+from src.services.auth import auth_service
+from src.services.singleflight import SingleFlight
+
+try:
+    from fakeredis import FakeAsyncRedis, FakeServer
+except ImportError:
+    FakeAsyncRedis = None
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_calls_share_one_load(self):
+        flight = SingleFlight()
+        release = asyncio.Event()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await release.wait()
+            return ["result"]
+
+        waiters = [asyncio.create_task(flight.do("key", load, json.dumps, json.loads)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [["result"]] * 5)
+        # Only the first caller gets the loaded object; the others get their own copies.
+        self.assertFalse(any(result is results[0] for result in results[1:]))
+        self.assertEqual(flight.coalesced, 4)
+
+    async def test_nothing_is_cached_after_the_load(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(await flight.do("key", load, str, int), 1)
+        self.assertEqual(await flight.do("key", load, str, int), 2)
+
+    async def test_different_keys_load_separately(self):
+        flight = SingleFlight()
+
+        async def load(value):
+            await asyncio.sleep(0)
+            return value
+
+        results = await asyncio.gather(flight.do("a", lambda: load("a"), str, str),
+                                       flight.do("b", lambda: load("b"), str, str))
+        self.assertEqual(results, ["a", "b"])
+        self.assertEqual(flight.coalesced, 0)
+
+    async def test_exception_reaches_every_caller(self):
+        flight = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(flight.do("key", load, str, str), flight.do("key", load, str, str),
+                                       return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    async def test_cancelled_caller_does_not_cancel_the_load(self):
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def load():
+            await release.wait()
+            return "done"
+
+        first = asyncio.create_task(flight.do("key", load, str, str))
+        second = asyncio.create_task(flight.do("key", load, str, str))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        self.assertEqual(await second, "done")
+
+    async def test_read_after_a_write_does_not_join_an_older_load(self):
+        flight = SingleFlight()
+        release = asyncio.Event()
+        versions = iter(["before", "after"])
+
+        async def load():
+            version = next(versions)
+            await release.wait()
+            return version
+
+        before = asyncio.create_task(flight.do("contacts:1:0", load, str, str, scope="contacts:1"))
+        await asyncio.sleep(0)
+        await flight.forget("contacts:1")
+        after = asyncio.create_task(flight.do("contacts:1:0", load, str, str, scope="contacts:1"))
+        await asyncio.sleep(0)
+        release.set()
+        self.assertEqual(await asyncio.gather(before, after), ["before", "after"])
+        self.assertEqual(flight.coalesced, 0)
+        self.assertEqual(flight._calls, {})
+        self.assertEqual(flight._scopes, {})
+
+    async def test_contact_writes_forget_the_reads_of_their_user(self):
+        session = MagicMock()
+        session.query().filter().first.return_value = Contact(id=3, user_id=1)
+        with patch("src.repository.contacts.singleflight.forget") as forget, \
+                patch("src.repository.contacts.contact_events.publish"), \
+                patch("src.repository.contacts.birthday_digests.discard"):
+            await ContactsRepository(session).remove_contact(3, User(id=1))
+        forget.assert_awaited_once_with("contacts:1")
+
+    async def test_repository_reads_are_coalesced(self):
+        session = MagicMock()
+        contact = Contact(id=1, first_name="Anna", last_name="Nowak", email="anna@example.com",
+                          phone_number="+48600100200", date_of_birth=date(1990, 5, 17))
+        session.query().filter().offset().limit().all.return_value = [contact]
+        session.query.reset_mock()
+        repository = ContactsRepository(session)
+        user = User(id=1)
+        first, second = await asyncio.gather(repository.get_contacts(0, 10, user),
+                                             repository.get_contacts(0, 10, user))
+        self.assertEqual(first, [contact])
+        self.assertEqual([item.model_dump() for item in second],
+                         [{"id": 1, "first_name": "Anna", "last_name": "Nowak", "email": "anna@example.com",
+                           "phone_number": "+48600100200", "date_of_birth": date(1990, 5, 17)}])
+        self.assertEqual(session.query.call_count, 1)
+
+    async def test_joined_user_is_a_detached_copy(self):
+        session = MagicMock()
+        user = User(id=7, username="shared", email="shared@example.com", password="hash", confirmed=True,
+                    avatar=None, refresh_token=None)
+        with patch("src.services.auth.UsersRepository.get_user_by_email", return_value=user), \
+                patch.object(auth_service, "access_token_subject", return_value="shared@example.com"):
+            first, second = await asyncio.gather(auth_service.get_current_user("token", session),
+                                                 auth_service.get_current_user("token", session))
+        self.assertIs(first, user)
+        self.assertIsNot(second, user)
+        self.assertEqual((second.id, second.email, second.password), (7, "shared@example.com", "hash"))
+
+
+@unittest.skipIf(FakeAsyncRedis is None, "fakeredis is not installed")
+class TestSharedSingleFlight(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        server = FakeServer()
+        self.redis = [FakeAsyncRedis(server=server, decode_responses=True) for _ in range(2)]
+        self.workers = [SingleFlight(), SingleFlight()]
+        for worker, redis in zip(self.workers, self.redis):
+            worker.bind(redis)
+        patcher = patch("src.services.singleflight.settings")
+        self.addCleanup(patcher.stop)
+        settings = patcher.start()
+        settings.singleflight_shared = True
+        settings.singleflight_lock_ms = 1000
+        settings.singleflight_result_ms = 1000
+        settings.singleflight_poll_ms = 1
+
+    async def asyncTearDown(self):
+        for redis in self.redis:
+            await redis.aclose()
+
+    async def test_workers_share_one_load(self):
+        release = asyncio.Event()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await release.wait()
+            return {"total": 3}
+
+        leader = asyncio.create_task(self.workers[0].do("stats", load, json.dumps, json.loads))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(self.workers[1].do("stats", load, json.dumps, json.loads))
+        await asyncio.sleep(0.01)
+        release.set()
+        self.assertEqual(await asyncio.gather(leader, follower), [{"total": 3}, {"total": 3}])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.workers[1].coalesced, 1)
+        self.assertIsNone(await self.redis[0].get("singleflight:stats"))
+
+    async def test_workers_do_not_join_a_load_older_than_a_write(self):
+        release = asyncio.Event()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            version = str(len(calls))
+            await release.wait()
+            return version
+
+        before = asyncio.create_task(self.workers[0].do("contacts:1:0", load, str, str, scope="contacts:1"))
+        await asyncio.sleep(0.01)
+        await self.workers[0].forget("contacts:1")
+        after = asyncio.create_task(self.workers[1].do("contacts:1:0", load, str, str, scope="contacts:1"))
+        await asyncio.sleep(0.01)
+        release.set()
+        self.assertEqual(await asyncio.gather(before, after), ["1", "2"])
+        self.assertEqual(self.workers[1].coalesced, 0)
+        self.assertGreater(await self.redis[1].pttl("singleflight-generation:contacts:1"), 0)
+
+    async def test_slow_leader_keeps_the_lock_of_the_next_one(self):
+        release = asyncio.Event()
+
+        async def load():
+            await release.wait()
+            return "slow"
+
+        leader = asyncio.create_task(self.workers[0].do("stats", load, str, str))
+        await asyncio.sleep(0.01)
+        await self.redis[1].set("singleflight:stats", "next-leader", px=1000)
+        release.set()
+        self.assertEqual(await leader, "slow")
+        self.assertEqual(await self.redis[1].get("singleflight:stats"), "next-leader")
+
+    async def test_follower_loads_itself_when_the_leader_fails(self):
+        release = asyncio.Event()
+
+        async def fail():
+            await release.wait()
+            raise RuntimeError("leader failed")
+
+        async def load():
+            return "own"
+
+        leader = asyncio.create_task(self.workers[0].do("stats", fail, str, str))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(self.workers[1].do("stats", load, str, str))
+        await asyncio.sleep(0.01)
+        release.set()
+        with self.assertRaises(RuntimeError):
+            await leader
+        self.assertEqual(await follower, "own")
+
+
+if __name__ == '__main__':
+    unittest.main()